@@ -0,0 +1,233 @@
+import asyncio
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional, Tuple
+
+MAX_INSPECTED_BODY = 16 * 1024  # only small JSON bodies are parsed for a user_id
+
+
+class TokenBucketLimiter:
+    """Token bucket per key (user id, IP) with a bounded number of keys.
+
+    Buckets are kept in LRU order: each request moves its key to the end,
+    so the front holds the idlest buckets. A bucket idle long enough to
+    have refilled is indistinguishable from a new one and is dropped; when
+    ``max_keys`` is reached the least recently used bucket is evicted. Every
+    call is O(1).
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 100000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.refill_seconds = burst / rate
+        self.rejected = 0
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def acquire(self, key: str, now: Optional[float] = None) -> Tuple[bool, float]:
+        """Take one token for ``key``; returns (allowed, seconds until a token is available)"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._evict_idle(now)
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    self._buckets.popitem(last=False)
+                bucket = self._buckets[key] = [self.burst, now]
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return True, 0.0
+            self.rejected += 1
+            return False, (1 - bucket[0]) / self.rate
+
+    def _evict_idle(self, now: float, limit: int = 2):
+        for _ in range(limit):
+            if not self._buckets:
+                return
+            key, (tokens, last) = next(iter(self._buckets.items()))
+            if now - last < self.refill_seconds:
+                return
+            del self._buckets[key]
+
+
+class LoadShedder:
+    """Global overload signal: notification backlog and event-loop lag.
+
+    ``notification_queued``/``notification_done`` bracket every background
+    notification; ``monitor_loop_lag`` runs on the server's loop and keeps
+    a decaying peak of how late its own wake-ups are. ``retry_after``
+    returns a Retry-After (seconds) while either exceeds its limit.
+    """
+
+    def __init__(self, max_pending_notifications: int = 1000, max_loop_lag: float = 0.25,
+                 retry_after: int = 5, lag_interval: float = 0.1, lag_decay: float = 0.8):
+        self.max_pending_notifications = max_pending_notifications
+        self.max_loop_lag = max_loop_lag
+        self.retry_seconds = retry_after
+        self.lag_interval = lag_interval
+        self.lag_decay = lag_decay
+        self.pending_notifications = 0
+        self.loop_lag = 0.0
+        self.shed = 0
+        self._lock = threading.Lock()
+
+    def notification_queued(self):
+        with self._lock:
+            self.pending_notifications += 1
+
+    def notification_done(self):
+        with self._lock:
+            self.pending_notifications -= 1
+
+    def overloaded(self) -> Optional[str]:
+        if self.pending_notifications > self.max_pending_notifications:
+            return f"{self.pending_notifications} notifications pending"
+        if self.loop_lag > self.max_loop_lag:
+            return f"event loop lagging {self.loop_lag * 1000:.0f} ms"
+        return None
+
+    def retry_after(self) -> Optional[int]:
+        if self.overloaded() is None:
+            return None
+        self.shed += 1
+        return max(self.retry_seconds, math.ceil(self.loop_lag))
+
+    async def monitor_loop_lag(self, on_lag: Optional[Callable[[float], None]] = None):
+        """Measure how late each wake-up is; ``on_lag`` also gets every measurement"""
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.lag_interval)
+            lag = max(0.0, loop.time() - started - self.lag_interval)
+            self.loop_lag = max(lag, self.loop_lag * self.lag_decay)
+            if on_lag is not None:
+                on_lag(lag)
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying load shedding (503) and per-IP / per-user rate limits (429).
+
+    The user id is read from the ``user_id`` field of small JSON request
+    bodies; the buffered body is then replayed to the application
+    unchanged. Paths in ``exempt_from_shedding`` (entries ending in "/"
+    are prefixes) are still rate limited.
+    """
+
+    def __init__(self, app, shedder: Optional[LoadShedder] = None,
+                 ip_limiter: Optional[TokenBucketLimiter] = None,
+                 user_limiter: Optional[TokenBucketLimiter] = None,
+                 exempt_from_shedding: Iterable[str] = (), trust_forwarded: bool = False):
+        self.app = app
+        self.shedder = shedder
+        self.ip_limiter = ip_limiter
+        self.user_limiter = user_limiter
+        self.exempt_from_shedding = frozenset(exempt_from_shedding)
+        self._exempt_prefixes = tuple(path for path in self.exempt_from_shedding if path.endswith("/"))
+        self.trust_forwarded = trust_forwarded
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if (self.shedder is not None and scope["path"] not in self.exempt_from_shedding
+                and not scope["path"].startswith(self._exempt_prefixes)):
+            retry = self.shedder.retry_after()
+            if retry is not None:
+                await _reject(send, 503, retry, f"Server overloaded ({self.shedder.overloaded()}), retry later")
+                return
+        if self.ip_limiter is not None:
+            allowed, wait = self.ip_limiter.acquire(client_ip(scope, self.trust_forwarded))
+            if not allowed:
+                await _reject(send, 429, wait, "Too many requests from this address")
+                return
+        if self.user_limiter is not None and scope["method"] == "POST" and is_json(scope):
+            body, more_body = await read_body_prefix(receive)
+            receive = replay_body(body, more_body, receive)
+            user_id = body_user_id(body) if not more_body else None
+            if user_id is not None:
+                allowed, wait = self.user_limiter.acquire(user_id)
+                if not allowed:
+                    await _reject(send, 429, wait, "Too many requests for this user")
+                    return
+        await self.app(scope, receive, send)
+
+
+
+def client_ip(scope, trust_forwarded: bool = False) -> str:
+    """The address rate limits are keyed on"""
+    if trust_forwarded:
+        for name, value in scope.get("headers", []):
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def is_json(scope) -> bool:
+    for name, value in scope.get("headers", []):
+        if name == b"content-type":
+            return value.startswith(b"application/json")
+    return False
+
+
+async def read_body_prefix(receive) -> Tuple[bytes, bool]:
+    """Body chunks up to MAX_INSPECTED_BODY; ``more_body`` is True if the request continues"""
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            return b"".join(chunks), False
+        chunk = message.get("body", b"")
+        chunks.append(chunk)
+        size += len(chunk)
+        if not message.get("more_body", False):
+            return b"".join(chunks), False
+        if size > MAX_INSPECTED_BODY:
+            return b"".join(chunks), True
+
+
+def replay_body(body: bytes, more_body: bool, receive):
+    replayed = False
+
+    async def replay_receive():
+        nonlocal replayed
+        if not replayed:
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": more_body}
+        return await receive()
+    return replay_receive
+
+
+def body_user_id(body: bytes) -> Optional[str]:
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return None
+    user_id = data.get("user_id") if isinstance(data, dict) else None
+    return user_id if isinstance(user_id, str) else None
+
+
+async def _reject(send, status: int, retry_after: float, detail: str):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,101 @@
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional
+
+
+@dataclass
+class Alert:
+    key: str  # dedupe key, e.g. the sender's aadhaar_id
+    title: str
+    detail: str = ""
+    count: int = 1  # repeats folded into this alert
+    first_seen: float = 0.0
+    last_seen: float = 0.0
+
+
+@dataclass
+class Notification:
+    """What the UI should announce: one alert, or a summary of a burst"""
+    title: str
+    alerts: List[Alert] = field(default_factory=list)
+
+    @property
+    def is_summary(self) -> bool:
+        return len(self.alerts) > 1
+
+
+class AlertThrottle:
+    """Dedupes, groups and rate-limits alerts; the UI decides how to show them.
+
+    ``offer`` is cheap and never blocks: repeats of the same key within
+    ``dedupe_window`` seconds only bump the existing alert's count. ``flush``
+    is called from the UI's scheduler and returns at most one notification:
+    alerts that arrived within ``burst_window`` of each other are grouped into
+    a single summary (a steady stream is still flushed every ``max_delay``
+    seconds), and notifications are limited to ``max_per_minute``
+    (token bucket) - anything beyond that keeps accumulating into the next
+    summary instead of being dropped.
+    """
+
+    def __init__(self, dedupe_window: float = 60.0, burst_window: float = 2.0,
+                 max_delay: float = 10.0, max_per_minute: int = 6, history_size: int = 200,
+                 clock: Callable[[], float] = time.monotonic):
+        self.dedupe_window = dedupe_window
+        self.burst_window = burst_window
+        self.max_delay = max_delay
+        self.max_per_minute = max_per_minute
+        self.clock = clock
+        self.history: Deque[Alert] = deque(maxlen=history_size)
+        self._recent: Dict[str, Alert] = {}
+        self._pending: List[Alert] = []
+        self._tokens = float(max_per_minute)
+        self._refilled_at = clock()
+        self.suppressed = 0  # repeats folded by dedupe
+
+    def offer(self, key: str, title: str, detail: str = "") -> Optional[Alert]:
+        """Queue an alert; returns it, or None when it was a duplicate"""
+        now = self.clock()
+        existing = self._recent.get(key)
+        if existing is not None and now - existing.last_seen < self.dedupe_window:
+            existing.count += 1
+            existing.last_seen = now
+            self.suppressed += 1
+            return None
+        alert = Alert(key, title, detail, first_seen=now, last_seen=now)
+        self._recent[key] = alert
+        self._pending.append(alert)
+        self.history.appendleft(alert)
+        if len(self._recent) > 4 * self.history.maxlen:
+            self._expire(now)
+        return alert
+
+    def flush(self) -> Optional[Notification]:
+        if not self._pending:
+            return None
+        now = self.clock()
+        # Wait for a burst to settle so it becomes one notification
+        if (now - self._pending[-1].first_seen < self.burst_window and
+                now - self._pending[0].first_seen < self.max_delay):
+            return None
+        self._refill(now)
+        if self._tokens < 1:
+            return None
+        self._tokens -= 1
+        alerts, self._pending = self._pending, []
+        if len(alerts) == 1:
+            return Notification(alerts[0].title, alerts)
+        return Notification(f"{len(alerts)} new alerts", alerts)
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def _refill(self, now: float):
+        rate = self.max_per_minute / 60.0
+        self._tokens = min(float(self.max_per_minute), self._tokens + (now - self._refilled_at) * rate)
+        self._refilled_at = now
+
+    def _expire(self, now: float):
+        self._recent = {key: alert for key, alert in self._recent.items()
+                        if now - alert.last_seen < self.dedupe_window}
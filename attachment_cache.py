@@ -0,0 +1,130 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from attachment_store import is_valid_hash, sniff_content_type
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+
+class AttachmentCache:
+    """On-disk LRU cache of content-addressed attachments, with thumbnails.
+
+    Blobs are fetched from ``{base_url}/attachments/<hash>`` only when first
+    needed, verified against their hash and kept under ``cache_dir`` until the
+    total size passes ``max_bytes``, at which point the least recently used
+    blobs (and their thumbnails) are evicted. Safe to call from worker threads.
+    """
+
+    def __init__(self, base_url: str, cache_dir: str = "attachment_cache",
+                 max_bytes: int = 200 * 1024 * 1024, thumbnail_size=(240, 240), timeout=(3.05, 30)):
+        self.base_url = base_url.rstrip("/")
+        self.blob_dir = os.path.join(cache_dir, "blobs")
+        self.thumb_dir = os.path.join(cache_dir, "thumbs")
+        self.max_bytes = max_bytes
+        self.thumbnail_size = thumbnail_size
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._session = None
+        os.makedirs(self.blob_dir, exist_ok=True)
+        os.makedirs(self.thumb_dir, exist_ok=True)
+
+        # Rebuild LRU order from access times left by previous runs
+        entries = []
+        for name in os.listdir(self.blob_dir):
+            if is_valid_hash(name):
+                stat = os.stat(os.path.join(self.blob_dir, name))
+                entries.append((stat.st_mtime, name, stat.st_size))
+        self._index: "OrderedDict[str, int]" = OrderedDict(
+            (name, size) for _, name, size in sorted(entries)
+        )
+        self._total = sum(self._index.values())
+
+    def blob_path(self, digest: str) -> str:
+        return os.path.join(self.blob_dir, digest)
+
+    def thumbnail_path(self, digest: str) -> str:
+        width, height = self.thumbnail_size
+        return os.path.join(self.thumb_dir, f"{digest}_{width}x{height}.png")
+
+    def get(self, digest: str) -> str:
+        """Return a local path for ``digest``, downloading it on a miss."""
+        if not is_valid_hash(digest):
+            raise ValueError(f"Invalid attachment hash: {digest!r}")
+        path = self.blob_path(digest)
+        with self._lock:
+            if digest in self._index:
+                self._index.move_to_end(digest)
+                os.utime(path)
+                return path
+        size = self._download(digest, path)
+        with self._lock:
+            if digest not in self._index:
+                self._index[digest] = size
+                self._total += size
+            self._evict()
+        return path
+
+    def thumbnail(self, digest: str) -> Optional[str]:
+        """PNG thumbnail for image attachments; None without Pillow or for non-images."""
+        thumb_path = self.thumbnail_path(digest)
+        if os.path.exists(thumb_path):
+            return thumb_path
+        path = self.get(digest)
+        try:
+            from PIL import Image
+        except ImportError:
+            return None
+        try:
+            with Image.open(path) as image:
+                image.thumbnail(self.thumbnail_size)
+                image.save(thumb_path, "PNG")
+        except OSError:
+            return None
+        return thumb_path
+
+    def content_type(self, digest: str) -> str:
+        with open(self.blob_path(digest), "rb") as f:
+            return sniff_content_type(f.read(16))
+
+    def _download(self, digest: str, path: str) -> int:
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+        hasher = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.blob_dir, prefix=".download-")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                with self._session.get(f"{self.base_url}/attachments/{digest}", stream=True,
+                                       timeout=self.timeout) as response:
+                    response.raise_for_status()
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        hasher.update(chunk)
+                        size += len(chunk)
+                        tmp.write(chunk)
+            if hasher.hexdigest() != digest:
+                raise ValueError(f"Attachment {digest[:12]}... failed hash verification")
+            os.replace(tmp_path, path)
+            tmp_path = None
+            return size
+        finally:
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _evict(self):
+        while self._total > self.max_bytes and len(self._index) > 1:
+            digest, size = self._index.popitem(last=False)
+            self._total -= size
+            for path in (self.blob_path(digest), self.thumbnail_path(digest)):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            logger.info(f"Evicted attachment {digest[:12]}... from cache")
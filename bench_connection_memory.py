@@ -0,0 +1,92 @@
+"""Memory per tracked connection: dict records vs ConnectionRecord/ConnectionLog.
+
+Simulates ``--users`` users each connecting and disconnecting ``--cycles``
+times, stored the way server.py stores them, and reports total bytes per
+tracked user (``active_connections`` plus that user's history) and bytes per
+``connection_history`` event. Dict records are shared between the two
+structures, so they are only separable by totals.
+
+    python bench_connection_memory.py [--users 20000] [--cycles 5]
+"""
+import argparse
+import gc
+import tracemalloc
+import uuid
+from datetime import datetime
+
+from connection_records import CONNECT, DISCONNECT, ActiveConnections, ConnectionLog, ConnectionRecord
+
+
+def fresh(value):
+    # Ids and names arrive as new string objects in every request body
+    return "".join(list(value))
+
+
+def dict_record(user_id, user_name, action, connection_id=None):
+    return {
+        "connection_id": connection_id or str(uuid.uuid4()),
+        "user_id": fresh(user_id),
+        "user_name": fresh(user_name),
+        "action": action,
+        "timestamp": datetime.now().isoformat(),
+    }
+
+
+def build_dicts(users, cycles):
+    active, history = {}, []
+    for cycle in range(cycles):
+        for user_id, user_name in users:
+            record = dict_record(user_id, user_name, "connect")
+            active[record["user_id"]] = record
+            history.append(record)
+            if cycle < cycles - 1:
+                history.append(dict_record(user_id, user_name, "disconnect", record["connection_id"]))
+                del active[record["user_id"]]
+    return active, history
+
+
+def build_compact(users, cycles):
+    history = ConnectionLog()
+    active = ActiveConnections(history)
+    for cycle in range(cycles):
+        for user_id, user_name in users:
+            record = ConnectionRecord.new(fresh(user_id), fresh(user_name), CONNECT)
+            active[record.user_id] = history.append(record)
+            if cycle < cycles - 1:
+                history.append(ConnectionRecord.new(fresh(user_id), fresh(user_name), DISCONNECT,
+                                                    connection_id=record.connection_id))
+                del active[record.user_id]
+    return active, history
+
+
+def measure(build, users, cycles):
+    gc.collect()
+    tracemalloc.start()
+    active, history = build(users, cycles)
+    total = tracemalloc.get_traced_memory()[0]
+    del active
+    gc.collect()
+    history_only = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return total / len(users), history_only / len(history)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--cycles", type=int, default=5)
+    args = parser.parse_args()
+
+    users = [(f"user-{i:08d}", f"Tourist {i}") for i in range(args.users)]
+    print(f"{args.users} users x {args.cycles} sessions "
+          f"({args.users * (2 * args.cycles - 1)} history events)")
+    print(f"{'':>16} {'bytes/user':>13} {'bytes/event':>12}")
+    old_active, old_event = measure(build_dicts, users, args.cycles)
+    new_active, new_event = measure(build_compact, users, args.cycles)
+    print(f"{'dict records':>16} {old_active:>13.0f} {old_event:>12.0f}")
+    print(f"{'compact records':>16} {new_active:>13.0f} {new_event:>12.0f}")
+    print(f"{'ratio':>16} {new_active / old_active:>13.0%} {new_event / old_event:>12.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Compare dashboard payload size and decode cost: JSON vs the wire_codec formats.
+
+    python bench_wire_format.py [--users 500] [--sos 200] [--repeat 200]
+"""
+import argparse
+import json
+import random
+import time
+import uuid
+import zlib
+from datetime import datetime, timedelta
+
+import msgpack
+
+from wire_codec import WireCodec
+
+HELP_TYPES = ["police", "ambulance", "fire", "rescue", "general"]
+CITIES = ["Mumbai", "Delhi", "Goa", "Jaipur", "Agra", "Kochi"]
+
+
+def make_users(count):
+    now = datetime.now()
+    return [{
+        "socket_id": uuid.uuid4().hex[:20],
+        "aadhaar_id": f"{random.randint(10**11, 10**12 - 1)}",
+        "name": f"Tourist {i}",
+        "location": random.choice(CITIES),
+        "phone": f"+91{random.randint(10**9, 10**10 - 1)}",
+        "client_type": "user",
+        "connected_at": (now - timedelta(minutes=random.randint(0, 600))).isoformat(),
+        "last_seen": now.isoformat(),
+        "version": "3.0",
+        "language": random.choice(["en", "hi"]),
+        "coordinates": {"lat": 19 + random.random(), "lng": 72 + random.random()},
+    } for i in range(count)]
+
+
+def make_sos(count):
+    now = datetime.now()
+    return [{
+        "sos_id": str(uuid.uuid4()),
+        "aadhaar_id": f"{random.randint(10**11, 10**12 - 1)}",
+        "name": f"Tourist {i}",
+        "location": random.choice(CITIES),
+        "phone": f"+91{random.randint(10**9, 10**10 - 1)}",
+        "help_type": random.choice(HELP_TYPES),
+        "sos_time": (now - timedelta(minutes=random.randint(0, 60))).isoformat(),
+        "status": "active",
+        "eta": random.randint(5, 20),
+        "image_hash": None,
+        "coordinates": {"lat": 19 + random.random(), "lng": 72 + random.random()},
+    } for i in range(count)]
+
+
+def timed(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--sos", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    codec = WireCodec()
+    plain = WireCodec(fields=())
+    formats = {
+        "json": (lambda p: json.dumps(p).encode(), lambda b: json.loads(b)),
+        "json+zlib": (lambda p: zlib.compress(json.dumps(p).encode(), 1), lambda b: json.loads(zlib.decompress(b))),
+        "msgpack": (lambda p: msgpack.packb(p), lambda b: msgpack.unpackb(b)),
+        "msgpack+zlib": (plain.encode, plain.decode),
+        "msgpack+zlib+dict": (codec.encode, codec.decode),
+    }
+    for event, payload in (("users_update", make_users(args.users)), ("sos_update", make_sos(args.sos))):
+        print(f"\n{event} ({len(payload)} records)")
+        print(f"{'format':>20} {'bytes':>10} {'vs json':>8} {'encode µs':>10} {'decode µs':>10}")
+        baseline = None
+        for name, (encode, decode) in formats.items():
+            data = encode(payload)
+            assert decode(data) == payload
+            baseline = baseline or len(data)
+            print(f"{name:>20} {len(data):>10} {len(data) / baseline:>7.0%} "
+                  f"{timed(lambda: encode(payload), args.repeat):>10.0f} {timed(lambda: decode(data), args.repeat):>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
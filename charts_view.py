@@ -0,0 +1,145 @@
+import time
+import tkinter as tk
+from tkinter import ttk
+from typing import Callable, List, Optional
+
+BACKGROUND = "white"
+GRID = "#e2e8f0"
+CONNECT_COLOUR = "#16a34a"
+DISCONNECT_COLOUR = "#dc2626"
+UNIQUE_COLOUR = "#2563eb"
+MARGIN = 50
+
+# resolution -> (label, buckets requested)
+WINDOWS = {
+    'minute': ("Last hour (per minute)", 60),
+    'hour': ("Last 24 hours (per hour)", 24),
+}
+
+
+def summarize(series: dict) -> dict:
+    """Totals and the busiest bucket of a /stats/timeseries response"""
+    connects = series.get('connects', [])
+    timestamps = series.get('timestamps', [])
+    peak = max(range(len(connects)), key=connects.__getitem__, default=None)
+    return {
+        'connects': sum(connects),
+        'disconnects': sum(series.get('disconnects', [])),
+        'unique_users': series.get('unique_users_total', 0),
+        'active_connections': series.get('active_connections', 0),
+        'peak_at': timestamps[peak] if peak is not None and connects[peak] else None,
+        'peak_connects': connects[peak] if peak is not None else 0,
+    }
+
+
+class ChartsView:
+    """Connection activity charts in their own window.
+
+    Draws the server's precomputed ``/stats/timeseries`` arrays: connects and
+    disconnects as bars, unique users as a line. ``on_refresh(resolution,
+    buckets)`` is called whenever new data is wanted; the caller fetches it
+    off the Tk thread and hands it back through ``set_series``.
+    """
+
+    def __init__(self, root, on_refresh: Callable[[str, int], None], on_close: Optional[Callable[[], None]] = None):
+        self.on_refresh = on_refresh
+        self.on_close = on_close
+        self.series: Optional[dict] = None
+        self.window = tk.Toplevel(root)
+        self.window.title("📈 Connection Charts")
+        self.window.geometry("1000x600")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        toolbar = ttk.Frame(self.window, padding="5")
+        toolbar.pack(fill=tk.X)
+        self.resolution = tk.StringVar(value='minute')
+        for i, (name, (title, _)) in enumerate(WINDOWS.items()):
+            ttk.Radiobutton(toolbar, text=title, value=name, variable=self.resolution,
+                            command=self.refresh).grid(row=0, column=i, padx=(0, 10))
+        ttk.Button(toolbar, text="🔄 Refresh", command=self.refresh).grid(row=0, column=2, padx=(0, 10))
+        self.status = ttk.Label(toolbar, text="")
+        self.status.grid(row=0, column=3, sticky=tk.W)
+
+        self.canvas = tk.Canvas(self.window, bg=BACKGROUND, highlightthickness=0)
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+        self.canvas.bind('<Configure>', lambda e: self.redraw())
+        self.refresh()
+
+    def alive(self) -> bool:
+        return self.window is not None and bool(self.window.winfo_exists())
+
+    def close(self):
+        self.window.destroy()
+        self.window = None
+        if self.on_close:
+            self.on_close()
+
+    def refresh(self):
+        resolution = self.resolution.get()
+        self.status.config(text="⏳ Loading...")
+        self.on_refresh(resolution, WINDOWS[resolution][1])
+
+    def set_series(self, series: dict):
+        if series.get('resolution') != self.resolution.get():
+            return  # a reply for the resolution the operator just switched away from
+        self.series = series
+        self.redraw()
+
+    def set_error(self, error: str):
+        self.status.config(text=f"⚠️ Statistics unavailable: {error}")
+
+    def redraw(self):
+        if not self.alive() or self.series is None:
+            return
+        self.canvas.delete('all')
+        width = max(self.canvas.winfo_width(), 1)
+        height = max(self.canvas.winfo_height(), 1)
+        series = self.series
+        connects, disconnects = series['connects'], series['disconnects']
+        unique = series['unique_users']
+        count = len(connects)
+        if not count:
+            return
+        top, bottom = MARGIN / 2, height - MARGIN
+        left, right = MARGIN, width - MARGIN / 2
+        peak = max(max(connects), max(disconnects), max(unique), 1)
+        scale = (bottom - top) / peak
+        slot = (right - left) / count
+
+        for step in range(5):
+            value = peak * step / 4
+            y = bottom - value * scale
+            self.canvas.create_line(left, y, right, y, fill=GRID)
+            self.canvas.create_text(left - 6, y, text=f"{value:.0f}", anchor=tk.E, fill="#64748b")
+
+        bar = max(1.0, slot * 0.4)
+        line: List[float] = []
+        label_every = max(1, count // 12)
+        time_format = "%H:%M" if series['bucket_seconds'] < 3600 else "%d %H:00"
+        for i in range(count):
+            x = left + i * slot + slot / 2
+            if connects[i]:
+                self.canvas.create_rectangle(x - bar, bottom - connects[i] * scale, x, bottom,
+                                             fill=CONNECT_COLOUR, width=0)
+            if disconnects[i]:
+                self.canvas.create_rectangle(x, bottom - disconnects[i] * scale, x + bar, bottom,
+                                             fill=DISCONNECT_COLOUR, width=0)
+            line.extend((x, bottom - unique[i] * scale))
+            if i % label_every == 0:
+                self.canvas.create_text(x, bottom + 12, text=time.strftime(time_format, time.localtime(series['timestamps'][i])),
+                                        fill="#64748b")
+        if count > 1:
+            self.canvas.create_line(*line, fill=UNIQUE_COLOUR, width=2)
+
+        legend_x = left + 10
+        for colour, text in ((CONNECT_COLOUR, "Connects"), (DISCONNECT_COLOUR, "Disconnects"),
+                             (UNIQUE_COLOUR, "Unique users")):
+            self.canvas.create_rectangle(legend_x, top, legend_x + 10, top + 10, fill=colour, width=0)
+            self.canvas.create_text(legend_x + 14, top + 5, text=text, anchor=tk.W)
+            legend_x += 110
+
+        summary = summarize(series)
+        self.status.config(text=(
+            f"{summary['connects']} connects · {summary['disconnects']} disconnects · "
+            f"≈{summary['unique_users']} unique users · {summary['active_connections']} online now"
+        ))
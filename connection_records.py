@@ -0,0 +1,171 @@
+import sys
+import time
+import uuid
+from array import array
+from datetime import datetime
+from typing import Dict, List, Optional
+
+CONNECT = sys.intern("connect")
+DISCONNECT = sys.intern("disconnect")
+_ACTIONS = (CONNECT, DISCONNECT)
+_ACTION_CODES = {CONNECT: 0, DISCONNECT: 1}
+
+
+def now_us() -> int:
+    return time.time_ns() // 1000
+
+
+def isoformat_us(timestamp_us: int) -> str:
+    """Epoch microseconds -> the local ISO string ``datetime.now().isoformat()`` gives"""
+    seconds, micros = divmod(timestamp_us, 1_000_000)
+    return datetime.fromtimestamp(seconds).replace(microsecond=micros).isoformat()
+
+
+class ConnectionRecord:
+    """One connect/disconnect event in compact form.
+
+    The connection id is the 16 raw UUID bytes and the timestamp is epoch
+    microseconds; appending to a ``ConnectionLog`` swaps the user id and name
+    for the log's shared copies. ``to_dict`` produces the public 5-key JSON
+    shape and is only called at the edges (API responses, notifications,
+    persistence).
+    """
+
+    __slots__ = ("connection_id", "user_id", "user_name", "action", "timestamp_us")
+
+    def __init__(self, connection_id: bytes, user_id: str, user_name: str, action: str, timestamp_us: int):
+        self.connection_id = connection_id
+        self.user_id = user_id
+        self.user_name = user_name
+        self.action = sys.intern(action)
+        self.timestamp_us = timestamp_us
+
+    @classmethod
+    def new(cls, user_id: str, user_name: str, action: str = CONNECT,
+            connection_id: Optional[bytes] = None) -> "ConnectionRecord":
+        return cls(connection_id or uuid.uuid4().bytes, user_id, user_name, action, now_us())
+
+    @property
+    def connection_uuid(self) -> str:
+        return str(uuid.UUID(bytes=self.connection_id))
+
+    @property
+    def timestamp(self) -> str:
+        return isoformat_us(self.timestamp_us)
+
+    def to_dict(self) -> dict:
+        return {
+            "connection_id": self.connection_uuid,
+            "user_id": self.user_id,
+            "user_name": self.user_name,
+            "action": self.action,
+            "timestamp": self.timestamp,
+        }
+
+
+class ConnectionLog:
+    """Append-only connection history stored as columns (struct of arrays).
+
+    Per event it keeps 16 bytes of UUID, an 8-byte timestamp, a 1-byte action
+    and two 4-byte indexes into a shared string table - about 33 bytes instead
+    of a dict with five string values. Indexing and slicing materialise
+    ``ConnectionRecord`` objects on demand.
+    """
+
+    def __init__(self):
+        self._ids = bytearray()
+        self._timestamps = array("q")
+        self._actions = array("b")
+        self._users = array("I")
+        self._names = array("I")
+        self._strings: List[str] = []
+        self._string_index: Dict[str, int] = {}
+
+    def __len__(self):
+        return len(self._timestamps)
+
+    def append(self, record: ConnectionRecord) -> int:
+        """Store a record; returns its row number (its position in the log)"""
+        user, name = self._intern(record.user_id), self._intern(record.user_name)
+        record.user_id, record.user_name = self._strings[user], self._strings[name]
+        self._ids += record.connection_id
+        self._timestamps.append(record.timestamp_us)
+        self._actions.append(_ACTION_CODES[record.action])
+        self._users.append(user)
+        self._names.append(name)
+        return len(self._timestamps) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._record(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("connection log index out of range")
+        return self._record(index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._record(i)
+
+    def timestamps(self) -> array:
+        """The raw epoch-microsecond column (for scans that need no records)"""
+        return self._timestamps
+
+    def _record(self, i: int) -> ConnectionRecord:
+        record = ConnectionRecord.__new__(ConnectionRecord)
+        record.connection_id = bytes(self._ids[i * 16:(i + 1) * 16])
+        record.user_id = self._strings[self._users[i]]
+        record.user_name = self._strings[self._names[i]]
+        record.action = _ACTIONS[self._actions[i]]
+        record.timestamp_us = self._timestamps[i]
+        return record
+
+    def _intern(self, value: str) -> int:
+        index = self._string_index.get(value)
+        if index is None:
+            index = self._string_index[value] = len(self._strings)
+            self._strings.append(value)
+        return index
+
+
+class ActiveConnections:
+    """user_id -> open connection, kept as the row of its connect event.
+
+    The connect record already lives in the ``ConnectionLog``, so tracking a
+    session costs one dict entry instead of a second copy of the record.
+    Reads materialise the ``ConnectionRecord`` from the log.
+    """
+
+    def __init__(self, log: ConnectionLog):
+        self.log = log
+        self._rows: Dict[str, int] = {}
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, user_id):
+        return user_id in self._rows
+
+    def __setitem__(self, user_id: str, row: int):
+        self._rows[user_id] = row
+
+    def __getitem__(self, user_id: str) -> ConnectionRecord:
+        return self.log[self._rows[user_id]]
+
+    def __delitem__(self, user_id: str):
+        del self._rows[user_id]
+
+    def get(self, user_id: str) -> Optional[ConnectionRecord]:
+        row = self._rows.get(user_id)
+        return None if row is None else self.log[row]
+
+    def pop(self, user_id: str, default=None) -> Optional[ConnectionRecord]:
+        row = self._rows.pop(user_id, None)
+        return default if row is None else self.log[row]
+
+    def keys(self):
+        return self._rows.keys()
+
+    def values(self):
+        return [self.log[row] for row in self._rows.values()]
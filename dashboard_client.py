@@ -0,0 +1,220 @@
+import asyncio
+import logging
+import queue
+import random
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Optional
+
+import wire_codec
+
+logger = logging.getLogger(__name__)
+
+# Kinds of model updates handed to the UI thread
+STATUS = "status"
+USERS = "users"
+SOS = "sos"
+STATS = "stats"
+SOS_ALERT = "sos_alert"
+EFIR = "efir"
+CONNECT_FAILED = "connect_failed"
+LATENCY = "latency"
+ATTACHMENT = "attachment"
+DANGER_ZONES = "danger_zones"
+TIMESERIES = "timeseries"
+
+
+@dataclass
+class ModelUpdate:
+    kind: str
+    payload: Any
+    region: str = "local"
+    received_at: datetime = field(default_factory=datetime.now)
+
+
+def _new_event_loop() -> asyncio.AbstractEventLoop:
+    # Imported here so uvloop loads on the client thread, not during UI startup
+    try:
+        import uvloop
+        return uvloop.new_event_loop()
+    except ImportError:
+        return asyncio.new_event_loop()
+
+
+class DashboardSocketClient:
+    """Socket.IO client running on one background asyncio loop.
+
+    The loop owns the connection, the heartbeat, reconnection (exponential
+    backoff with full jitter) and event decoding. The UI thread never touches
+    the socket: it calls the thread-safe ``connect``/``disconnect``/``emit``
+    methods and drains ``updates``, a single queue of ``ModelUpdate`` objects.
+    The event loop, uvloop and socketio are all created on the client thread,
+    so none of them delay the first paint of the window.
+
+    With ``wire_format`` (and msgpack installed) the client offers the binary
+    ``wire_codec`` encoding on connect; servers that accept it send the
+    ``*_bin`` variants of the update events, decoded here off the UI thread.
+    """
+
+    def __init__(self, server_url: str, identity: dict, heartbeat_interval: float = 10.0,
+                 backoff_base: float = 1.0, backoff_max: float = 30.0, region: str = "local",
+                 updates: Optional["queue.SimpleQueue[ModelUpdate]"] = None, wire_format: bool = True):
+        self.server_url = server_url
+        self.region = region
+        self.identity = identity
+        self.heartbeat_interval = heartbeat_interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # Several clients (one per region) may share one updates queue
+        self.updates: "queue.SimpleQueue[ModelUpdate]" = updates if updates is not None else queue.SimpleQueue()
+        self.connected = False
+        self.codec = wire_codec.default_codec() if wire_format else None
+        self.encoding = "json"
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, name=f"dashboard-socket-{region}", daemon=True)
+        self._socketio = None
+        self._sio = None
+        self._supervisor: Optional[asyncio.Task] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._heartbeat_sent: Optional[float] = None
+
+    # Thread-safe API for the UI thread
+    def start(self):
+        self._thread.start()
+
+    def connect(self):
+        self._loop_ready.wait()
+        self._loop.call_soon_threadsafe(self._start_supervisor)
+
+    def disconnect(self):
+        self._loop_ready.wait()
+        asyncio.run_coroutine_threadsafe(self._stop_supervisor(), self._loop)
+
+    def emit(self, event: str, data: Any):
+        if self.connected:
+            asyncio.run_coroutine_threadsafe(self._emit(event, data), self._loop)
+
+    def stop(self, timeout: float = 5.0):
+        if not self._loop_ready.is_set():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._stop_supervisor(), self._loop).result(timeout)
+        except Exception as e:
+            logger.error(f"Error during disconnect: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    # Everything below runs on the client thread
+    def _run_loop(self):
+        self._loop = _new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._loop_ready.set()
+        self._loop.run_forever()
+
+    def _setup(self):
+        import socketio
+        self._socketio = socketio
+        self._sio = socketio.AsyncClient(reconnection=False, logger=False, engineio_logger=False)
+        self._sio.on('connect', self._on_connect)
+        self._sio.on('disconnect', self._on_disconnect)
+        self._sio.on('users_update', lambda data: self._publish(USERS, data))
+        self._sio.on('sos_update', lambda data: self._publish(SOS, data))
+        self._sio.on('stats_update', lambda data: self._publish(STATS, data))
+        self._sio.on('new_sos_alert', lambda data: self._publish(SOS_ALERT, data))
+        self._sio.on('new_efir', lambda data: self._publish(EFIR, data))
+        self._sio.on('heartbeat_ack', self._on_heartbeat_ack)
+        if self.codec is not None:
+            for event, kind in (('users_update', USERS), ('sos_update', SOS), ('stats_update', STATS),
+                                ('new_sos_alert', SOS_ALERT), ('new_efir', EFIR)):
+                self._sio.on(f'{event}_bin', lambda data, kind=kind: self._publish(kind, self.codec.decode(data)))
+            self._sio.on('wire_encoding', self._on_wire_encoding)
+
+    def _publish(self, kind: str, payload: Any):
+        self.updates.put(ModelUpdate(kind, payload, self.region))
+
+    def _status(self, text: str, color: str):
+        self._publish(STATUS, (text, color, self.connected))
+
+    async def _on_connect(self):
+        self.connected = True
+        logger.info("Dashboard connected to server")
+        self._status("🟢 Connected", "green")
+        self.encoding = "json"
+        identity = self.identity
+        if self.codec is not None:
+            identity = {**identity, 'wire': {'encodings': [wire_codec.ENCODING], 'fields': list(self.codec.fields)}}
+        await self._sio.emit('user_connect', identity)
+        self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+
+    async def _on_disconnect(self, reason=None):
+        self.connected = False
+        logger.warning(f"Dashboard disconnected: {reason}")
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+        self._status("🔴 Disconnected", "red")
+
+    async def _heartbeat_loop(self):
+        while self.connected:
+            try:
+                self._heartbeat_sent = self._loop.time()
+                await self._sio.emit('heartbeat', {'type': 'dashboard', 'timestamp': datetime.now().isoformat()})
+            except Exception as e:
+                logger.error(f"Heartbeat error: {e}")
+            await asyncio.sleep(self.heartbeat_interval)
+
+    def _on_wire_encoding(self, data=None):
+        self.encoding = (data or {}).get('encoding', 'json')
+        logger.info(f"Server for {self.region} switched to {self.encoding} updates")
+
+    def _on_heartbeat_ack(self, data=None):
+        if self._heartbeat_sent is not None:
+            self._publish(LATENCY, (self._loop.time() - self._heartbeat_sent) * 1000)
+            self._heartbeat_sent = None
+
+    async def _emit(self, event: str, data: Any):
+        try:
+            await self._sio.emit(event, data)
+        except Exception as e:
+            logger.error(f"Failed to send {event}: {e}")
+
+    def _start_supervisor(self):
+        if self._supervisor is None or self._supervisor.done():
+            self._supervisor = asyncio.create_task(self._supervise())
+
+    async def _stop_supervisor(self):
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            self._supervisor = None
+        if self._sio is not None and self._sio.connected:
+            await self._sio.disconnect()
+
+    async def _supervise(self):
+        if self._sio is None:
+            self._setup()
+        attempt = 0
+        first_attempt = True
+        while True:
+            try:
+                await self._sio.connect(self.server_url)
+                attempt = 0
+                first_attempt = False
+                await self._sio.wait()
+            except self._socketio.exceptions.ConnectionError as e:
+                logger.error(f"Cannot connect to server: {e}")
+                if first_attempt:
+                    # Only the initial attempt is surfaced as a dialog
+                    self._publish(CONNECT_FAILED, str(e))
+                    first_attempt = False
+                self._status("🔴 Connection Error", "red")
+            except Exception as e:
+                # Anything else must not end the supervisor: log it and keep retrying
+                logger.exception(f"Connection to server failed: {e}")
+                self._status("🔴 Connection Error", "red")
+            # The exponent is capped so long outages cannot overflow the float conversion
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** min(attempt, 16)))
+            attempt += 1
+            self._status(f"🟡 Reconnecting in {delay:.0f}s", "orange")
+            await asyncio.sleep(delay)
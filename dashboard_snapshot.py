@@ -0,0 +1,39 @@
+import json
+import mmap
+import os
+from datetime import datetime
+from typing import Optional
+
+SNAPSHOT_VERSION = 1
+
+
+def save_snapshot(path: str, connected_users: list, sos_signals: list, efir_reports: list,
+                  connection_stats: dict):
+    """Atomically write the dashboard's last known state to ``path``."""
+    data = {
+        'version': SNAPSHOT_VERSION,
+        'saved_at': datetime.now().isoformat(),
+        'connected_users': connected_users,
+        'sos_signals': sos_signals,
+        'efir_reports': efir_reports,
+        'connection_stats': connection_stats,
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path: str) -> Optional[dict]:
+    """Read a snapshot through a read-only memory map; None if missing or unusable."""
+    try:
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                data = json.loads(mm[:])
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get('version') != SNAPSHOT_VERSION:
+        return None
+    return data
@@ -5,6 +5,19 @@ const cors = require('cors');
 const { v4: uuidv4 } = require('uuid');
 const fs = require('fs');
 const path = require('path');
+const zlib = require('zlib');
+
+// Optional binary wire format for dashboards (see wire_codec.py)
+let msgpack = null;
+try {
+    msgpack = require('@msgpack/msgpack');
+} catch (e) {
+    // Dashboards fall back to JSON events
+}
+const WIRE_ENCODING = 'msgpack+zlib+dict/1';
+const WIRE_FLAG_COMPRESSED = 0x01;
+const WIRE_FLAG_DICTIONARY = 0x02;
+const WIRE_COMPRESS_THRESHOLD = 256;
 
 const app = express();
 const server = http.createServer(app);
@@ -285,9 +298,48 @@ function findUserSocket(userId) {
     return null;
 }
 
+// socket id -> encoder for dashboards that negotiated the binary format;
+// dashboards sending the same field list share one encoder
+const wireEncoders = new Map();
+const wireEncoderCache = new Map();
+
+function makeWireEncoder(fields) {
+    const codes = new Map(fields.map((name, i) => [name, i]));
+    const packKeys = (value) => {
+        if (Array.isArray(value)) return value.map(packKeys);
+        if (value && typeof value === 'object' && !(value instanceof Date) && !Buffer.isBuffer(value)) {
+            const map = new Map();
+            for (const [key, v] of Object.entries(value)) {
+                if (v !== undefined) map.set(codes.has(key) ? codes.get(key) : key, packKeys(v));
+            }
+            return map;
+        }
+        return value instanceof Date ? value.toISOString() : value;
+    };
+    return (data) => {
+        let body = Buffer.from(msgpack.encode(packKeys(data)));
+        let flags = WIRE_FLAG_DICTIONARY;
+        if (body.length >= WIRE_COMPRESS_THRESHOLD) {
+            const compressed = zlib.deflateSync(body, { level: 1 });
+            if (compressed.length < body.length) {
+                body = compressed;
+                flags |= WIRE_FLAG_COMPRESSED;
+            }
+        }
+        return Buffer.concat([Buffer.from([flags]), body]);
+    };
+}
+
 function broadcastToDashboards(event, data) {
+    // Encode once per distinct encoder, however many dashboards share it
+    const encoded = new Map();
     for (const [id, user] of connectedUsers.entries()) {
-        if (user.client_type === 'dashboard') {
+        if (user.client_type !== 'dashboard') continue;
+        const encoder = wireEncoders.get(id);
+        if (encoder) {
+            if (!encoded.has(encoder)) encoded.set(encoder, encoder(data));
+            io.to(id).emit(`${event}_bin`, encoded.get(encoder));
+        } else {
             io.to(id).emit(event, data);
         }
     }
@@ -306,6 +358,25 @@ function generateETA(helpType, userLocation) {
     return Math.round((baseTime[helpType] || 10) + randomFactor);
 }
 
+// SOS lifecycle states in order, as in sos_lifecycle.py. Operators may move an
+// SOS forward or repeat its state (to change the ETA); resolved is final.
+const SOS_STATUS_ORDER = ['active', 'dispatched', 'en_route', 'arrived', 'resolved'];
+const MAX_ETA_MINUTES = 24 * 60;
+
+function isAllowedSOSTransition(from, to) {
+    const toIndex = SOS_STATUS_ORDER.indexOf(to);
+    if (toIndex < 0 || from === 'resolved') return false;
+    return toIndex >= SOS_STATUS_ORDER.indexOf(from);
+}
+
+function parseETAMinutes(value) {
+    // undefined when no ETA was sent, NaN when it is not a usable number of minutes
+    if (value === undefined || value === null) return undefined;
+    const minutes = typeof value === 'number' ? value : (typeof value === 'string' && value.trim() !== '' ? Number(value) : NaN);
+    if (!Number.isFinite(minutes) || minutes < 0 || minutes > MAX_ETA_MINUTES) return NaN;
+    return Math.round(minutes);
+}
+
 // Socket.IO connection handling
 io.on('connection', (socket) => {
     log(`New client connected: ${socket.id}`, 'INFO');
@@ -325,7 +396,7 @@ io.on('connection', (socket) => {
 
     // User connection
     socket.on('user_connect', (data) => {
-        const { aadhaar_id, client_type, name, version, language } = data;
+        const { aadhaar_id, client_type, name, version, language, wire } = data;
         const user = users[aadhaar_id];
         
         if (user || client_type === 'dashboard') {
@@ -344,6 +415,15 @@ io.on('connection', (socket) => {
             
             connectedUsers.set(socket.id, userData);
             
+            // Dashboards may offer the binary encoding along with their field dictionary
+            if (client_type === 'dashboard' && msgpack && wire &&
+                Array.isArray(wire.encodings) && wire.encodings.includes(WIRE_ENCODING) && Array.isArray(wire.fields)) {
+                const fields = wire.fields.join('\n');
+                if (!wireEncoderCache.has(fields)) wireEncoderCache.set(fields, makeWireEncoder(wire.fields));
+                wireEncoders.set(socket.id, wireEncoderCache.get(fields));
+                socket.emit('wire_encoding', { encoding: WIRE_ENCODING });
+            }
+            
             socket.emit('connection_ack', { 
                 status: 'connected', 
                 name: userData.name,
@@ -379,7 +459,9 @@ io.on('connection', (socket) => {
                 location: data.location || user.location,
                 message: data.message || 'Emergency SOS activated',
                 coordinates: data.coordinates || null,
-                image: data.image || null,
+                // Prefer a content hash from the attachment store; inline images are legacy
+                image_hash: data.image_hash || null,
+                image: data.image_hash ? null : (data.image || null),
                 help_type: data.help_type || 'general'
             };
             
@@ -422,12 +504,52 @@ io.on('connection', (socket) => {
                 eta_minutes: eta,
                 help_type: sosData.help_type
             });
-            
-            // Start ETA updates
-            startETAUpdates(socket.id, sosData.sos_id);
         }
     });
 
+    // SOS lifecycle changes made by dashboard operators
+    socket.on('sos_status', (data) => {
+        const operator = connectedUsers.get(socket.id);
+        if (!operator || operator.client_type !== 'dashboard') return;
+
+        const sos = data && sosSignals.find(s => s.sos_id === data.sos_id);
+        if (!sos) return;
+
+        const eta = parseETAMinutes(data.eta_minutes);
+        const error = !isAllowedSOSTransition(sos.status, data.status) ? 'Invalid status transition'
+            : Number.isNaN(eta) ? 'Invalid ETA' : null;
+        if (error) {
+            log(`Rejected SOS ${sos.sos_id} update from ${operator.name}: ${error} (${sos.status} -> ${String(data.status).slice(0, 32)})`, 'WARN');
+            socket.emit('sos_status_rejected', { sos_id: sos.sos_id, status: sos.status, eta_minutes: sos.eta, error });
+            return;
+        }
+
+        sos.status = data.status;
+        if (eta !== undefined) {
+            sos.eta = eta;
+        }
+
+        if (data.status === 'resolved') {
+            activeHelp.delete(sos.sos_id);
+            io.to(sos.socket_id).emit('sos_resolved', { sos_id: sos.sos_id });
+        } else if (data.status === 'dispatched' || data.status === 'en_route') {
+            activeHelp.set(sos.sos_id, {
+                ...sos,
+                eta_minutes: sos.eta,
+                start_time: new Date(),
+                status: 'dispatched'
+            });
+            io.to(sos.socket_id).emit('eta_update', {
+                sos_id: sos.sos_id,
+                eta_minutes: sos.eta,
+                status: data.status
+            });
+        }
+
+        log(`SOS ${sos.sos_id} marked ${data.status} by ${operator.name}`, 'INFO');
+        broadcastToDashboards('sos_update', sosSignals);
+    });
+
     // Location update with geofencing
     socket.on('location_update', (data) => {
         const user = connectedUsers.get(socket.id);
@@ -557,6 +679,7 @@ io.on('connection', (socket) => {
     // Disconnect handling
     socket.on('disconnect', (reason) => {
         const user = connectedUsers.get(socket.id);
+        wireEncoders.delete(socket.id);
         if (user) {
             connectedUsers.delete(socket.id);
             heartbeats.delete(socket.id);
@@ -570,33 +693,30 @@ io.on('connection', (socket) => {
     });
 });
 
-// ETA update system
-function startETAUpdates(socketId, sosId) {
-    const helpData = activeHelp.get(sosId);
-    if (!helpData) return;
-    
-    const updateInterval = setInterval(() => {
-        const elapsed = Math.floor((new Date() - helpData.start_time) / 60000); // minutes
+// ETA update system: a single tick recomputes every active ETA
+setInterval(() => {
+    const now = new Date();
+    for (const [sosId, helpData] of activeHelp.entries()) {
+        const elapsed = Math.floor((now - helpData.start_time) / 60000); // minutes
         const remainingETA = Math.max(0, helpData.eta_minutes - elapsed);
         
         if (remainingETA <= 0) {
             // Help has arrived
-            io.to(socketId).emit('help_arrived', {
+            io.to(helpData.socket_id).emit('help_arrived', {
                 sos_id: sosId,
                 message: 'Help has arrived at your location'
             });
             activeHelp.delete(sosId);
-            clearInterval(updateInterval);
         } else {
             // Send ETA update
-            io.to(socketId).emit('eta_update', {
+            io.to(helpData.socket_id).emit('eta_update', {
                 sos_id: sosId,
                 eta_minutes: remainingETA,
                 status: 'en_route'
             });
         }
-    }, 30000); // Update every 30 seconds
-}
+    }
+}, 30000); // Update every 30 seconds
 
 // Connection health monitoring
 setInterval(() => {
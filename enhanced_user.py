@@ -1,11 +1,13 @@
 import streamlit as st
-import requests
-import pandas as pd
 from datetime import datetime
-import time
+from monitor_frames import history_view
+from monitor_poller import UpstreamPoller
 
 # Configuration
 SERVER_URL = "https://dadusecurity-2.onrender.com"  # Replace with your actual server URL
+POLL_INTERVAL_SECONDS = 2
+HISTORY_LIMIT = 50
+RENDER_ROW_LIMIT = 200
 
 st.set_page_config(page_title="Police Monitor", page_icon="👮", layout="wide")
 st.title("👮 Police Connection Monitor")
@@ -17,21 +19,26 @@ if 'last_update' not in st.session_state:
 if 'notifications' not in st.session_state:
     st.session_state.notifications = []
 
+# One upstream poller per Streamlit process, shared by every browser session
+@st.cache_resource
+def get_poller():
+    return UpstreamPoller(SERVER_URL, interval=POLL_INTERVAL_SECONDS, history_limit=HISTORY_LIMIT)
+
 # Function to fetch connection data
-def fetch_connection_data():
-    try:
-        # Get active connections
-        active_response = requests.get(f"{SERVER_URL}/active-connections")
-        active_data = active_response.json().get('active_connections', []) if active_response.status_code == 200 else []
-        
-        # Get connection history
-        history_response = requests.get(f"{SERVER_URL}/connection-history?limit=50")
-        history_data = history_response.json().get('connection_history', []) if history_response.status_code == 200 else []
-        
-        return active_data, history_data
-    except requests.exceptions.RequestException as e:
-        st.error(f"Error fetching data: {e}")
-        return [], []
+def fetch_connection_data(refresh=False):
+    poller = get_poller()
+    if refresh:
+        poller.request_refresh()
+    snapshot = poller.snapshot()
+    if snapshot.version == 0:
+        # First viewer in this process: wait briefly for the initial poll
+        snapshot = poller.wait_for_update(0, timeout=5)
+    if snapshot.error:
+        st.error(f"Error fetching data: {snapshot.error}")
+    return snapshot
+
+# Timestamps stay datetime64; Streamlit formats them client-side
+TIMESTAMP_COLUMN = st.column_config.DatetimeColumn("timestamp", format="YYYY-MM-DD HH:mm:ss")
 
 # Create layout
 col1, col2 = st.columns([1, 2])
@@ -40,17 +47,18 @@ with col1:
     st.subheader("Active Connections")
     refresh_btn = st.button("🔄 Refresh Data")
     
-    # Fetch data
-    active_connections, connection_history = fetch_connection_data()
+    # Read the shared snapshot (no per-session upstream requests)
+    snapshot = fetch_connection_data(refresh=refresh_btn)
+    connection_history = snapshot.connection_history
     
     # Display active connections
-    if active_connections:
-        active_df = pd.DataFrame(active_connections)
-        # Format timestamp
-        if 'timestamp' in active_df.columns:
-            active_df['timestamp'] = pd.to_datetime(active_df['timestamp']).dt.strftime('%Y-%m-%d %H:%M:%S')
-        st.dataframe(active_df[['user_name', 'timestamp']], use_container_width=True)
-        st.metric("Active Users", len(active_connections))
+    if not snapshot.active_frame.empty:
+        st.dataframe(
+            snapshot.active_frame[['user_name', 'timestamp']].head(RENDER_ROW_LIMIT),
+            column_config={"timestamp": TIMESTAMP_COLUMN},
+            use_container_width=True,
+        )
+        st.metric("Active Users", len(snapshot.active_frame))
     else:
         st.info("No active connections")
         st.metric("Active Users", 0)
@@ -58,21 +66,14 @@ with col1:
 with col2:
     st.subheader("Recent Connection History")
     
-    if connection_history:
-        history_df = pd.DataFrame(connection_history)
-        # Format timestamp
-        if 'timestamp' in history_df.columns:
-            history_df['timestamp'] = pd.to_datetime(history_df['timestamp']).dt.strftime('%Y-%m-%d %H:%M:%S')
-        
-        # Color code actions
-        def color_action(action):
-            return "color: green;" if action == "connect" else "color: red;"
-        
-        styled_df = history_df[['user_name', 'action', 'timestamp']].style.applymap(
-            color_action, subset=['action']
+    if not snapshot.history_frame.empty:
+        # Newest rows first, capped; action colour comes from category labels
+        st.dataframe(
+            history_view(snapshot.history_frame, RENDER_ROW_LIMIT),
+            column_config={"timestamp": TIMESTAMP_COLUMN},
+            use_container_width=True,
+            height=400,
         )
-        
-        st.dataframe(styled_df, use_container_width=True, height=400)
     else:
         st.info("No connection history available")
 
@@ -104,7 +105,8 @@ else:
 # Auto-refresh
 if st.checkbox("Auto-refresh every 10 seconds"):
     st.write("Auto-refresh enabled")
-    time.sleep(10)
+    # Wake as soon as the shared poller sees a change, at most every 10 seconds
+    get_poller().wait_for_update(get_poller().snapshot().version, timeout=10)
     st.rerun()
 
 # Instructions
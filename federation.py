@@ -0,0 +1,134 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_REGION = "local"
+KEY_SEPARATOR = "/"
+
+
+def parse_regions(spec: str) -> Dict[str, str]:
+    """Parse ``"mumbai=http://a:3000,delhi=http://b:3000"`` into {region: url}."""
+    regions = {}
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        region, sep, url = entry.partition("=")
+        if not sep or not region.strip() or not url.strip():
+            raise ValueError(f"Invalid region entry {entry!r}, expected name=url")
+        if KEY_SEPARATOR in region:
+            raise ValueError(f"Region name {region!r} must not contain {KEY_SEPARATOR!r}")
+        regions[region.strip()] = url.strip()
+    return regions
+
+
+def make_key(region: str, record_id: str) -> str:
+    return f"{region}{KEY_SEPARATOR}{record_id}"
+
+
+def split_key(key: str) -> Tuple[str, str]:
+    region, _, record_id = key.partition(KEY_SEPARATOR)
+    return region, record_id
+
+
+@dataclass
+class RegionHealth:
+    region: str
+    url: str
+    status: str = "🔴 Not Connected"
+    connected: bool = False
+    last_message: Optional[datetime] = None
+    rtt_ms: Optional[float] = None
+
+    def lag_seconds(self, now: Optional[datetime] = None) -> Optional[float]:
+        if self.last_message is None:
+            return None
+        return ((now or datetime.now()) - self.last_message).total_seconds()
+
+    def summary(self) -> str:
+        icon = "🟢" if self.connected else "🔴"
+        parts = [f"{icon} {self.region}"]
+        if self.rtt_ms is not None:
+            parts.append(f"rtt {self.rtt_ms:.0f}ms")
+        lag = self.lag_seconds()
+        parts.append(f"lag {lag:.0f}s" if lag is not None else "no data")
+        return " · ".join(parts)
+
+
+class FederatedModel:
+    """Merges user/SOS/E-FIR streams from several regional servers.
+
+    Each region's latest lists are kept separately and replaced wholesale by
+    that region's updates, so a slow or disconnected region never blocks or
+    clobbers the others. Merged views tag every record with its ``region``
+    and a ``key`` of ``region/id`` that is unique across servers.
+    """
+
+    def __init__(self, regions: Dict[str, str]):
+        self.regions = dict(regions)
+        self.health = {region: RegionHealth(region, url) for region, url in regions.items()}
+        self.users: Dict[str, List[dict]] = {region: [] for region in regions}
+        self.sos: Dict[str, List[dict]] = {region: [] for region in regions}
+        self.stats: Dict[str, dict] = {region: {} for region in regions}
+        self.efir: List[dict] = []
+
+    def touch(self, region: str, received_at: datetime):
+        self.health[region].last_message = received_at
+
+    def set_users(self, region: str, users: List[dict]):
+        self.users[region] = [self._tag(region, u, u.get('socket_id') or u.get('aadhaar_id')) for u in users]
+
+    def set_sos(self, region: str, signals: List[dict]):
+        self.sos[region] = [self._tag(region, s, s.get('sos_id')) for s in signals]
+
+    def set_stats(self, region: str, stats: dict):
+        self.stats[region] = stats
+
+    def add_efir(self, region: str, efir: dict):
+        self.efir.append(self._tag(region, efir, efir.get('efir_id')))
+
+    def merged_users(self) -> List[dict]:
+        return [user for region in self.regions for user in self.users[region]]
+
+    def merged_sos(self) -> List[dict]:
+        signals = [signal for region in self.regions for signal in self.sos[region]]
+        signals.sort(key=lambda s: s.get('sos_time') or '', reverse=True)
+        return signals
+
+    def merged_stats(self) -> dict:
+        merged = {}
+        for stats in self.stats.values():
+            for name in ('activeConnections', 'totalConnections', 'totalSOS'):
+                merged[name] = merged.get(name, 0) + stats.get(name, 0)
+        return merged
+
+    def load(self, users: List[dict], signals: List[dict], efir_reports: List[dict], stats: dict):
+        """Restore merged lists (e.g. from a snapshot), regrouping them by region."""
+        for region in self.regions:
+            self.users[region] = []
+            self.sos[region] = []
+        for user in users:
+            region = self._region_of(user)
+            if region:
+                self.users[region].append(self._tag(region, user, user.get('socket_id') or user.get('aadhaar_id')))
+        for signal in signals:
+            region = self._region_of(signal)
+            if region:
+                self.sos[region].append(self._tag(region, signal, signal.get('sos_id')))
+        self.efir = [self._tag(self._region_of(e) or e.get('region', DEFAULT_REGION), e, e.get('efir_id'))
+                     for e in efir_reports]
+        if len(self.regions) == 1:
+            self.stats[next(iter(self.regions))] = stats
+
+    def _region_of(self, record: dict) -> Optional[str]:
+        region = record.get('region')
+        if region is None and len(self.regions) == 1:
+            return next(iter(self.regions))
+        return region if region in self.regions else None
+
+    @staticmethod
+    def _tag(region: str, record: dict, record_id) -> dict:
+        tagged = dict(record)
+        tagged['region'] = region
+        tagged['key'] = make_key(region, str(record_id))
+        return tagged
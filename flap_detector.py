@@ -0,0 +1,134 @@
+import logging
+from typing import Dict, List, Optional, Set
+
+from connection_records import ConnectionRecord, isoformat_us
+from timing_wheel import HierarchicalTimingWheel
+
+logger = logging.getLogger(__name__)
+
+
+class _UserWindow:
+    """Sliding event count over ``slots`` sub-buckets (a ring); updates touch at most ``slots`` cells"""
+
+    __slots__ = ("counts", "head", "total", "flapping_since_us", "suppressed", "last_record")
+
+    def __init__(self, slots: int, head: int):
+        self.counts = [0] * slots
+        self.head = head
+        self.total = 0
+        self.flapping_since_us: Optional[int] = None
+        self.suppressed = 0
+        self.last_record: Optional[ConnectionRecord] = None
+
+    def roll(self, slot: int):
+        elapsed = slot - self.head
+        if elapsed <= 0:
+            return
+        size = len(self.counts)
+        for step in range(1, min(elapsed, size) + 1):
+            index = (self.head + step) % size
+            self.total -= self.counts[index]
+            self.counts[index] = 0
+        self.head = slot
+
+    def add(self):
+        self.counts[self.head % len(self.counts)] += 1
+        self.total += 1
+
+
+class FlapDetector:
+    """Marks users whose connect/disconnect rate exceeds ``threshold`` events per ``window`` seconds.
+
+    ``record`` counts an event in O(1) and says whether its notification
+    should go out: while a user is flapping their notifications are held
+    back, and ``advance`` returns one coalesced notification per user once
+    the rate falls to ``clear_threshold`` (hysteresis, so a user hovering
+    at the threshold does not toggle). A timing wheel re-checks flapping
+    users and forgets idle ones, so nothing scans all tracked users.
+    Not thread-safe: server.py drives it from the event loop.
+    """
+
+    def __init__(self, window: float = 60.0, threshold: int = 6, clear_threshold: int = 2,
+                 slots: int = 6, now: float = 0.0):
+        self.window = window
+        self.threshold = threshold
+        self.clear_threshold = clear_threshold
+        self.slots = slots
+        self.slot_seconds = window / slots
+        self.suppressed_total = 0
+        self._users: Dict[str, _UserWindow] = {}
+        self._flapping: Set[str] = set()
+        self._checks = HierarchicalTimingWheel(tick=self.slot_seconds, now=now)
+
+    def __len__(self):
+        return len(self._users)
+
+    def record(self, record: ConnectionRecord, now: float) -> bool:
+        """Count one event; True if its notification should be sent now"""
+        slot = int(now / self.slot_seconds)
+        state = self._users.get(record.user_id)
+        if state is None:
+            state = self._users[record.user_id] = _UserWindow(self.slots, slot)
+        state.roll(slot)
+        state.add()
+        state.last_record = record
+
+        if state.flapping_since_us is None and state.total >= self.threshold:
+            state.flapping_since_us = record.timestamp_us
+            self._flapping.add(record.user_id)
+            logger.warning(f"User {record.user_id} is flapping ({state.total} events in {self.window:g}s)")
+        if state.flapping_since_us is not None:
+            state.suppressed += 1
+            self.suppressed_total += 1
+            self._checks.schedule(record.user_id, now + self.slot_seconds)
+            return False
+        self._checks.schedule(record.user_id, now + self.window)
+        return True
+
+    def advance(self, now: float) -> List[dict]:
+        """Expire idle users and end flapping that has calmed down; returns coalesced notifications"""
+        notifications = []
+        slot = int(now / self.slot_seconds)
+        for user_id in self._checks.advance(now):
+            state = self._users.get(user_id)
+            if state is None:
+                continue
+            state.roll(slot)
+            if state.flapping_since_us is not None:
+                if state.total > self.clear_threshold:
+                    self._checks.schedule(user_id, now + self.slot_seconds)
+                    continue
+                notifications.append(self._summary(state))
+                logger.info(f"User {user_id} stopped flapping after {state.suppressed} suppressed notifications")
+                state.flapping_since_us = None
+                state.suppressed = 0
+                self._flapping.discard(user_id)
+            if state.total == 0:
+                del self._users[user_id]
+            else:
+                self._checks.schedule(user_id, now + self.window)
+        return notifications
+
+    def flapping(self, now: float) -> List[dict]:
+        slot = int(now / self.slot_seconds)
+        users = []
+        for user_id in self._flapping:
+            state = self._users[user_id]
+            state.roll(slot)
+            users.append({
+                "user_id": user_id,
+                "user_name": state.last_record.user_name,
+                "events_in_window": state.total,
+                "suppressed_notifications": state.suppressed,
+                "flapping_since": isoformat_us(state.flapping_since_us),
+                "last_action": state.last_record.action,
+            })
+        return users
+
+    def _summary(self, state: _UserWindow) -> dict:
+        """The last suppressed event, annotated with how many notifications it stands for"""
+        return {
+            **state.last_record.to_dict(),
+            "flap_events": state.suppressed,
+            "flapping_since": isoformat_us(state.flapping_since_us),
+        }
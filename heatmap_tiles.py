@@ -0,0 +1,116 @@
+import math
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+TILE_SIZE = 256  # pixels, as in web map tiles
+MAX_LATITUDE = 85.05112878
+
+
+def project(lats: np.ndarray, lngs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Web Mercator: lat/lng degrees -> world coordinates in [0, 1)"""
+    lats = np.clip(lats, -MAX_LATITUDE, MAX_LATITUDE)
+    x = (lngs + 180.0) / 360.0
+    sin_lat = np.sin(np.radians(lats))
+    y = 0.5 - np.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)
+    return np.clip(x, 0, 1 - 1e-12), np.clip(y, 0, 1 - 1e-12)
+
+
+def unproject(x: float, y: float) -> Tuple[float, float]:
+    lng = x * 360.0 - 180.0
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y))))
+    return lat, lng
+
+
+class _ZoomIndex:
+    """Sparse per-cell counts at one zoom level.
+
+    Keys are ``tile * cells² + cell`` so every tile's cells are contiguous in
+    the sorted key array and a tile is one ``searchsorted`` slice.
+    """
+
+    def __init__(self, keys: np.ndarray, levels: np.ndarray):
+        self.keys = keys
+        self.levels = levels
+
+
+class DensityTiles:
+    """Point density binned into tiles of ``cells`` x ``cells`` cells per zoom.
+
+    Counts are mapped to a fixed logarithmic scale of ``levels`` colour
+    steps (saturating at ``saturation`` points per cell), so a change in one
+    area never recolours the rest of the map. ``set_points`` rebins every
+    zoom level that has been viewed and reports, per zoom, only the cells
+    whose level changed; renderers patch those cells in their cached tiles.
+    """
+
+    def __init__(self, cells: int = 32, levels: int = 16, saturation: int = 50):
+        self.cells = cells
+        self.levels = levels
+        self.saturation = saturation
+        self._x = np.empty(0)
+        self._y = np.empty(0)
+        self._zooms: Dict[int, _ZoomIndex] = {}
+
+    def __len__(self):
+        return len(self._x)
+
+    def set_points(self, lats: Iterable[float], lngs: Iterable[float]) -> Dict[int, Dict[Tuple[int, int], np.ndarray]]:
+        """Replace all points; returns {zoom: {(tx, ty): changed cell indices}}"""
+        self._x, self._y = project(np.asarray(lats, dtype=np.float64), np.asarray(lngs, dtype=np.float64))
+        dirty = {}
+        for zoom, old in list(self._zooms.items()):
+            new = self._bin(zoom)
+            dirty[zoom] = self._diff(zoom, old, new)
+            self._zooms[zoom] = new
+        return dirty
+
+    def tile(self, zoom: int, tx: int, ty: int) -> np.ndarray:
+        """Colour level (0 = empty) of each cell, shape (cells, cells) as [row, col]"""
+        index = self._index(zoom)
+        per_tile = self.cells * self.cells
+        base = (ty * (1 << zoom) + tx) * per_tile
+        lo, hi = np.searchsorted(index.keys, [base, base + per_tile])
+        grid = np.zeros(per_tile, dtype=np.uint8)
+        grid[index.keys[lo:hi] - base] = index.levels[lo:hi]
+        return grid.reshape(self.cells, self.cells)
+
+    def bounds(self) -> Optional[Tuple[float, float, float, float]]:
+        """World-coordinate bounding box (x0, y0, x1, y1) of all points"""
+        if not len(self._x):
+            return None
+        return float(self._x.min()), float(self._y.min()), float(self._x.max()), float(self._y.max())
+
+    def _index(self, zoom: int) -> _ZoomIndex:
+        index = self._zooms.get(zoom)
+        if index is None:
+            index = self._zooms[zoom] = self._bin(zoom)
+        return index
+
+    def _bin(self, zoom: int) -> _ZoomIndex:
+        cells_per_axis = (1 << zoom) * self.cells
+        cx = (self._x * cells_per_axis).astype(np.int64)
+        cy = (self._y * cells_per_axis).astype(np.int64)
+        tile = (cy // self.cells) * (1 << zoom) + cx // self.cells
+        keys = tile * (self.cells * self.cells) + (cy % self.cells) * self.cells + cx % self.cells
+        keys, counts = np.unique(keys, return_counts=True)
+        return _ZoomIndex(keys, self._levels(counts))
+
+    def _levels(self, counts: np.ndarray) -> np.ndarray:
+        scaled = np.log1p(counts) / math.log1p(self.saturation) * (self.levels - 1)
+        return np.clip(np.ceil(scaled), 1, self.levels - 1).astype(np.uint8)
+
+    def _diff(self, zoom: int, old: _ZoomIndex, new: _ZoomIndex) -> Dict[Tuple[int, int], np.ndarray]:
+        keys, inverse = np.unique(np.concatenate([old.keys, new.keys]), return_inverse=True)
+        before = np.zeros(len(keys), dtype=np.uint8)
+        after = np.zeros(len(keys), dtype=np.uint8)
+        before[inverse[:len(old.keys)]] = old.levels
+        after[inverse[len(old.keys):]] = new.levels
+        changed = keys[before != after]
+        per_tile = self.cells * self.cells
+        tiles, cells = np.divmod(changed, per_tile)
+        side = 1 << zoom
+        dirty = {}
+        for tile in np.unique(tiles):
+            dirty[(int(tile % side), int(tile // side))] = cells[tiles == tile]
+        return dirty
@@ -0,0 +1,149 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS connection_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    connection_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    user_name TEXT NOT NULL,
+    action TEXT NOT NULL,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_user_ts ON connection_events (user_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_events_ts ON connection_events (timestamp);
+"""
+
+_INSERT = (
+    "INSERT INTO connection_events (connection_id, user_id, user_name, action, timestamp) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+
+_COLUMNS = ("connection_id", "user_id", "user_name", "action", "timestamp")
+
+_STOP = object()
+
+
+class SQLiteHistoryStore:
+    """Durable connection history backed by SQLite in WAL mode.
+
+    Request handlers call ``enqueue`` which never touches the database; a single
+    writer thread drains the queue and commits in batches of up to
+    ``batch_size`` rows or every ``batch_interval_ms`` milliseconds, whichever
+    comes first. Reads go through a small pool of read-only connections so they
+    never wait on the writer.
+    """
+
+    def __init__(self, path: str, batch_interval_ms: int = 200, batch_size: int = 500,
+                 reader_pool_size: int = 4):
+        self.path = path
+        self.batch_interval = batch_interval_ms / 1000.0
+        self.batch_size = batch_size
+        self.reader_pool_size = reader_pool_size
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._readers: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+
+    def start(self):
+        conn = self._open()
+        conn.executescript(_SCHEMA)
+        conn.commit()
+        for _ in range(self.reader_pool_size):
+            reader = self._open()
+            reader.execute("PRAGMA query_only=ON")
+            self._readers.put(reader)
+        self._writer = threading.Thread(target=self._write_loop, args=(conn,),
+                                        name="history-writer", daemon=True)
+        self._writer.start()
+
+    def close(self):
+        if self._writer is not None:
+            self._queue.put(_STOP)
+            self._writer.join()
+            self._writer = None
+        while not self._readers.empty():
+            self._readers.get_nowait().close()
+
+    def enqueue(self, record: dict):
+        """Queue a connection record for the writer thread (non-blocking)."""
+        self._queue.put(tuple(record[c] for c in _COLUMNS))
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _write_loop(self, conn: sqlite3.Connection):
+        stopping = False
+        while not stopping:
+            batch = []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.batch_interval
+            while True:
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    conn.executemany(_INSERT, batch)
+                    conn.commit()
+                except sqlite3.Error as e:
+                    logger.error(f"Failed to persist {len(batch)} history records: {e}")
+                    conn.rollback()
+        conn.close()
+
+    @contextmanager
+    def reader(self):
+        conn = self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
+
+    def query(self, user_id: Optional[str] = None, action: Optional[str] = None,
+              since: Optional[str] = None, until: Optional[str] = None,
+              limit: int = 100) -> List[dict]:
+        """Return the most recent matching records, newest first."""
+        clauses, params = [], []
+        if user_id is not None:
+            clauses.append("user_id = ?")
+            params.append(user_id)
+        if action is not None:
+            clauses.append("action = ?")
+            params.append(action)
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        sql = f"SELECT {', '.join(_COLUMNS)} FROM connection_events"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+        params.append(limit)
+        with self.reader() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [dict(zip(_COLUMNS, row)) for row in rows]
+
+    def count(self) -> int:
+        with self.reader() as conn:
+            return conn.execute("SELECT COUNT(*) FROM connection_events").fetchone()[0]
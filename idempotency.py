@@ -0,0 +1,56 @@
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyConflict(Exception):
+    """The key was already used for a request with a different payload"""
+
+
+class IdempotencyCache:
+    """Recent results by (endpoint, client key), kept for ``ttl`` seconds.
+
+    Every entry gets the same TTL, so insertion order is expiry order and
+    expired entries are dropped from the front of an ordered dict; at most
+    ``max_entries`` are kept (oldest evicted first). Lookups and stores are
+    O(1) amortized. A key reused with a different request fingerprint
+    raises ``IdempotencyConflict`` rather than returning a stale result.
+    """
+
+    def __init__(self, ttl: float = 600.0, max_entries: int = 100000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.replayed = 0
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, endpoint: str, key: str, fingerprint: Hashable, now: Optional[float] = None):
+        """The stored result for a retry of the same request, or None"""
+        now = time.monotonic() if now is None else now
+        self._expire(now)
+        entry = self._entries.get((endpoint, key))
+        if entry is None:
+            return None
+        expires, stored_fingerprint, result = entry
+        if stored_fingerprint != fingerprint:
+            raise IdempotencyConflict(f"Idempotency key {key!r} was already used with a different request")
+        self.replayed += 1
+        return result
+
+    def put(self, endpoint: str, key: str, fingerprint: Hashable, result, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        self._entries[(endpoint, key)] = (now + self.ttl, fingerprint, result)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _expire(self, now: float):
+        entries = self._entries
+        while entries:
+            key, (expires, _, _) = next(iter(entries.items()))
+            if expires > now:
+                return
+            del entries[key]
@@ -1,30 +1,77 @@
-import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox, filedialog
-import threading
 import time
+_STARTUP_T0 = time.perf_counter()  # taken before other imports so they are counted
+
+import tkinter as tk
+from tkinter import ttk, scrolledtext, messagebox, filedialog, simpledialog
 import json
 import webbrowser
 from datetime import datetime, timezone
-import socketio
 import logging
 import sys
 import os
+import queue
+import threading
 from typing import Dict, List, Any, Optional
-import requests
+import dashboard_client
+from dashboard_client import DashboardSocketClient
+from concurrent.futures import ThreadPoolExecutor
+from attachment_cache import AttachmentCache
+from attachment_store import is_valid_hash
+from federation import DEFAULT_REGION, FederatedModel, make_key, parse_regions, split_key
+from dashboard_snapshot import load_snapshot, save_snapshot
+from sos_lifecycle import SOSLifecycleEngine, InvalidTransition, RESOLVED
+from sos_triage import SEVERITY_LABELS, TriageQueue
+from alert_manager import AlertThrottle
+from map_view import MapView
+from charts_view import ChartsView, summarize
+from structured_logging import event, parse_sample_rates, setup_logging
 
-# Set up logging with UTF-8 encoding
-logging.basicConfig(
-    level=logging.INFO, 
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("improved_dashboard.log", encoding='utf-8'),
-        logging.StreamHandler(sys.stdout)
-    ]
+# JSON logs written by a background thread (the Tk thread only enqueues),
+# rotated by size; periodic socket updates are sampled
+DASHBOARD_SAMPLE_RATES = {"users_update": 10, "sos_update": 5, "stats_update": 20, "latency": 50}
+setup_logging(
+    "improved_dashboard.log",
+    max_bytes=int(os.environ.get("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+    sample_rates={**DASHBOARD_SAMPLE_RATES, **parse_sample_rates(os.environ.get("LOG_SAMPLE_RATES", ""))},
 )
 logger = logging.getLogger(__name__)
 
+# One scheduler tick drives every SOS ETA
+SOS_TICK_MS = 5000
+# Only the most urgent open SOS are shown, in triage order
+SOS_DISPLAY_LIMIT = 200
+# How often the Tk thread drains socket updates, and redraws relative times
+UPDATE_POLL_MS = 100
+AUTO_REFRESH_MS = 5000
+
+# SOS alerts: repeats from one aadhaar_id within the dedupe window are folded,
+# bursts become one summary, and at most ALERT_MAX_PER_MINUTE notifications fire
+ALERT_DEDUPE_SECONDS = float(os.environ.get("ALERT_DEDUPE_SECONDS", "60"))
+ALERT_BURST_SECONDS = float(os.environ.get("ALERT_BURST_SECONDS", "2"))
+ALERT_MAX_PER_MINUTE = int(os.environ.get("ALERT_MAX_PER_MINUTE", "6"))
+ALERT_FLUSH_MS = 500
+ALERT_PANEL_ROWS = 200
+
+# Last known state, shown (marked stale) until live data arrives
+SNAPSHOT_PATH = "dashboard_snapshot.json"
+SNAPSHOT_SAVE_MS = 30000
+
+# Attachments (SOS images, E-FIR files) are fetched by hash on selection
+ATTACHMENT_SERVER_URL = os.environ.get("ATTACHMENT_SERVER_URL", "http://localhost:8000")
+ATTACHMENT_CACHE_DIR = "attachment_cache"
+
+# Charts, analytics and reports read the aggregates from server.py's /stats/timeseries
+STATS_SERVER_URL = os.environ.get("STATS_SERVER_URL", ATTACHMENT_SERVER_URL)
+
+DASHBOARD_IDENTITY = {
+    'aadhaar_id': 'improved_dashboard',
+    'client_type': 'dashboard',
+    'name': 'Improved Monitoring Dashboard',
+    'version': '3.0'
+}
+
 class ImprovedDashboardUI:
-    def __init__(self, root, server_url="http://localhost:3000"):
+    def __init__(self, root, server_url="http://localhost:3000", snapshot_path=SNAPSHOT_PATH, regions=None):
         self.root = root
         self.root.title("🚨 Enhanced Tourist Safety Dashboard - Real-time Monitoring")
         self.root.geometry("1600x1000")
@@ -35,50 +82,79 @@ class ImprovedDashboardUI:
         style.theme_use('clam')
         
         self.server_url = server_url
-        self.sio = socketio.Client(
-            reconnection=True, 
-            reconnection_attempts=5, 
-            reconnection_delay=2,
-            reconnection_delay_max=10,
-            logger=False,
-            engineio_logger=False
-        )
+        self.snapshot_path = snapshot_path
+        
+        # One socket client (own connection and loop) per regional server,
+        # all feeding a single update queue
+        self.regions = regions or {DEFAULT_REGION: server_url}
+        self.federation = FederatedModel(self.regions)
+        self.updates = queue.SimpleQueue()
+        self.clients = {
+            region: DashboardSocketClient(url, DASHBOARD_IDENTITY, region=region, updates=self.updates)
+            for region, url in self.regions.items()
+        }
         
-        # Data storage
+        # Data storage (merged across regions)
         self.connected_users = []
         self.sos_signals = []
         self.efir_reports = []
         self.connection_stats = {}
         self.places_data = {}
+        self.attachment_cache = AttachmentCache(ATTACHMENT_SERVER_URL, ATTACHMENT_CACHE_DIR)
+        self.attachment_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="attachments")
+        self.preview_hashes = {}  # preview target -> hash currently wanted there
+        self.sos_engine = SOSLifecycleEngine(on_update=self.on_sos_lifecycle_update)
+        self.triage = TriageQueue()
+        self.danger_zones = {}  # region -> zones from its /danger-zones
+        self.sos_rows = {}  # iid -> values currently shown in the SOS tree
+        self.alerts = AlertThrottle(ALERT_DEDUPE_SECONDS, ALERT_BURST_SECONDS,
+                                    max_per_minute=ALERT_MAX_PER_MINUTE)
+        self.alert_keys = []  # SOS key per alert panel row, newest first
+        self.map_view = None
+        self.map_sources = None  # data lists last pushed to the map
+        self.charts_view = None
         
         # Connection state
         self.connected = False
-        self.heartbeat_interval = None
         self.last_update = None
         self.auto_refresh = True
-        
-        # Setup Socket.IO event handlers
-        self.setup_socket_handlers()
+        self.stale_datasets = set()
+        self.snapshot_dirty = False
+        self.startup_timings = {}
+        
+        # Model update handlers (run on the Tk thread)
+        self.update_handlers = {
+            dashboard_client.STATUS: self.on_status_update,
+            dashboard_client.USERS: self.on_users_update,
+            dashboard_client.SOS: self.on_sos_update,
+            dashboard_client.STATS: self.on_stats_update,
+            dashboard_client.SOS_ALERT: self.on_new_sos_alert,
+            dashboard_client.EFIR: self.on_new_efir,
+            dashboard_client.CONNECT_FAILED: self.on_connect_failed,
+            dashboard_client.LATENCY: self.on_latency_update,
+            dashboard_client.ATTACHMENT: self.on_attachment_ready,
+            dashboard_client.DANGER_ZONES: self.on_danger_zones,
+            dashboard_client.TIMESERIES: self.on_timeseries,
+        }
         
         self.create_widgets()
         self.update_status("🔴 Not Connected", "red")
+        self.load_local_snapshot()
+        self.update_display()
         
         # Handle window close event
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
         
-        # Auto-refresh timer
-        self.start_auto_refresh()
-        
-    def setup_socket_handlers(self):
-        self.sio.on('connect', self.on_connect)
-        self.sio.on('disconnect', self.on_disconnect)
-        self.sio.on('connect_error', self.on_connect_error)
-        self.sio.on('users_update', self.on_users_update)
-        self.sio.on('sos_update', self.on_sos_update)
-        self.sio.on('stats_update', self.on_stats_update)
-        self.sio.on('new_sos_alert', self.on_new_sos_alert)
-        self.sio.on('new_efir', self.on_new_efir)
-        self.sio.on('heartbeat_ack', self.on_heartbeat_ack)
+        # Socket client loops, update pump, auto-refresh and SOS scheduler
+        for client in self.clients.values():
+            client.start()
+        for region, url in self.regions.items():
+            threading.Thread(target=self.fetch_danger_zones, args=(region, url), daemon=True).start()
+        self.root.after(UPDATE_POLL_MS, self.drain_updates)
+        self.root.after(AUTO_REFRESH_MS, self.auto_refresh_tick)
+        self.root.after(SOS_TICK_MS, self.sos_tick)
+        self.root.after(ALERT_FLUSH_MS, self.alert_tick)
+        self.root.after(SNAPSHOT_SAVE_MS, self.snapshot_tick)
         
     def create_widgets(self):
         # Main container
@@ -157,9 +233,18 @@ class ImprovedDashboardUI:
         self.efir_count_label = ttk.Label(stats_row, text="📋 E-FIR: 0", font=("Arial", 10), foreground="orange")
         self.efir_count_label.grid(row=0, column=3, padx=(0, 15))
         
+        # Per-region health and lag
+        regions_row = ttk.Frame(status_frame)
+        regions_row.grid(row=2, column=0, sticky=(tk.W, tk.E), pady=(0, 10))
+        ttk.Label(regions_row, text="Regions:", font=("Arial", 10, "bold")).grid(row=0, column=0, padx=(0, 5))
+        self.region_labels = {}
+        for i, region in enumerate(self.regions, start=1):
+            self.region_labels[region] = ttk.Label(regions_row, text=f"🔴 {region}", font=("Arial", 10))
+            self.region_labels[region].grid(row=0, column=i, padx=(0, 15))
+        
         # Control buttons row
         controls_row = ttk.Frame(status_frame)
-        controls_row.grid(row=2, column=0, sticky=(tk.W, tk.E))
+        controls_row.grid(row=3, column=0, sticky=(tk.W, tk.E))
         
         # Styled buttons
         self.connect_button = ttk.Button(controls_row, text="🔌 Connect", command=self.toggle_connection)
@@ -171,6 +256,18 @@ class ImprovedDashboardUI:
         ttk.Button(controls_row, text="📈 Analytics", command=self.show_analytics).grid(row=0, column=4, padx=(0, 10))
         ttk.Button(controls_row, text="⚙️ Settings", command=self.show_settings).grid(row=0, column=5, padx=(0, 10))
         
+        # Non-modal alert panel (double-click an alert to jump to its SOS)
+        alerts_row = ttk.Frame(status_frame)
+        alerts_row.grid(row=4, column=0, sticky=(tk.W, tk.E), pady=(10, 0))
+        alerts_row.columnconfigure(0, weight=1)
+        self.alert_banner = tk.Label(alerts_row, text="No new alerts", font=("Arial", 10, "bold"), anchor=tk.W)
+        self.alert_banner.grid(row=0, column=0, sticky=(tk.W, tk.E))
+        ttk.Button(alerts_row, text="Acknowledge", command=self.acknowledge_alerts).grid(row=0, column=1, padx=(10, 0))
+        self.alert_list = tk.Listbox(alerts_row, height=3)
+        self.alert_list.grid(row=1, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(5, 0))
+        self.alert_list.bind('<Double-Button-1>', self.on_alert_activate)
+        self.alert_banner_bg = self.alert_banner.cget('bg')
+        
     def create_main_content(self, parent):
         # Notebook for tabs with better styling
         self.notebook = ttk.Notebook(parent)
@@ -199,7 +296,7 @@ class ImprovedDashboardUI:
         sos_list_frame.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
         
         # Enhanced SOS tree
-        sos_columns = ('priority', 'name', 'location', 'help_type', 'time', 'eta', 'status', 'phone')
+        sos_columns = ('priority', 'name', 'location', 'help_type', 'time', 'eta', 'status', 'phone', 'region')
         self.sos_tree = ttk.Treeview(sos_list_frame, columns=sos_columns, show='headings', height=12)
         
         # Define headings with better names
@@ -211,7 +308,8 @@ class ImprovedDashboardUI:
             'time': '⏰ Time',
             'eta': '⏱️ ETA',
             'status': '📊 Status',
-            'phone': '📞 Phone'
+            'phone': '📞 Phone',
+            'region': '🌏 Region'
         }
         
         for col, heading in headings.items():
@@ -235,6 +333,13 @@ class ImprovedDashboardUI:
         ttk.Button(sos_actions, text="📞 Contact User", command=self.contact_user).grid(row=0, column=3, padx=(0, 10))
         ttk.Button(sos_actions, text="🗑️ Clear All", command=self.clear_sos).grid(row=0, column=4)
         
+        # Attachment preview for the selected SOS
+        sos_preview_frame = ttk.LabelFrame(sos_frame, text="Attachment", padding="5")
+        sos_preview_frame.grid(row=3, column=0, sticky=(tk.W, tk.E), pady=(10, 0))
+        self.sos_preview = ttk.Label(sos_preview_frame, text="Select an SOS to view its attachment")
+        self.sos_preview.grid(row=0, column=0, sticky=tk.W)
+        self.sos_tree.bind('<<TreeviewSelect>>', self.on_sos_select)
+        
         # Configure grid weights
         sos_frame.columnconfigure(0, weight=1)
         sos_frame.rowconfigure(1, weight=1)
@@ -256,7 +361,7 @@ class ImprovedDashboardUI:
         users_list_frame = ttk.LabelFrame(users_frame, text="Active Users", padding="5")
         users_list_frame.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
-        user_columns = ('status_icon', 'name', 'type', 'location', 'language', 'connected_time', 'tracking', 'sos_status')
+        user_columns = ('status_icon', 'name', 'type', 'location', 'language', 'connected_time', 'tracking', 'sos_status', 'region')
         self.users_tree = ttk.Treeview(users_list_frame, columns=user_columns, show='headings', height=15)
         
         user_headings = {
@@ -267,7 +372,8 @@ class ImprovedDashboardUI:
             'language': '🌐 Language',
             'connected_time': '⏰ Connected',
             'tracking': '📍 Tracking',
-            'sos_status': '🚨 SOS Status'
+            'sos_status': '🚨 SOS Status',
+            'region': '🌏 Region'
         }
         
         for col, heading in user_headings.items():
@@ -301,7 +407,7 @@ class ImprovedDashboardUI:
         efir_list_frame = ttk.LabelFrame(efir_frame, text="Filed Reports", padding="5")
         efir_list_frame.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
         
-        efir_columns = ('priority', 'user_name', 'incident_type', 'location', 'time', 'status', 'reference')
+        efir_columns = ('priority', 'user_name', 'incident_type', 'location', 'time', 'status', 'reference', 'region')
         self.efir_tree = ttk.Treeview(efir_list_frame, columns=efir_columns, show='headings', height=10)
         
         efir_headings = {
@@ -311,7 +417,8 @@ class ImprovedDashboardUI:
             'location': '📍 Location',
             'time': '⏰ Filed Time',
             'status': '📊 Status',
-            'reference': '🔢 Reference'
+            'reference': '🔢 Reference',
+            'region': '🌏 Region'
         }
         
         for col, heading in efir_headings.items():
@@ -330,6 +437,8 @@ class ImprovedDashboardUI:
         
         self.efir_details = scrolledtext.ScrolledText(details_frame, height=8, width=100, font=("Consolas", 10))
         self.efir_details.grid(row=0, column=0, sticky=(tk.W, tk.E))
+        self.efir_preview = ttk.Label(details_frame, text="")
+        self.efir_preview.grid(row=0, column=1, sticky=(tk.N, tk.W), padx=(10, 0))
         
         # Bind selection event
         self.efir_tree.bind('<<TreeviewSelect>>', self.on_efir_select)
@@ -356,7 +465,7 @@ class ImprovedDashboardUI:
         tracking_list_frame = ttk.LabelFrame(tracking_frame, text="User Locations", padding="5")
         tracking_list_frame.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
-        tracking_columns = ('status', 'name', 'location', 'coordinates', 'last_update', 'tracking_enabled', 'movement')
+        tracking_columns = ('status', 'name', 'location', 'coordinates', 'last_update', 'tracking_enabled', 'movement', 'region')
         self.tracking_tree = ttk.Treeview(tracking_list_frame, columns=tracking_columns, show='headings', height=18)
         
         tracking_headings = {
@@ -366,7 +475,8 @@ class ImprovedDashboardUI:
             'coordinates': '🗺️ Coordinates',
             'last_update': '⏰ Last Update',
             'tracking_enabled': '📍 Tracking',
-            'movement': '🚶 Movement'
+            'movement': '🚶 Movement',
+            'region': '🌏 Region'
         }
         
         for col, heading in tracking_headings.items():
@@ -411,77 +521,251 @@ class ImprovedDashboardUI:
         analytics_content.columnconfigure(0, weight=1)
         analytics_content.rowconfigure(0, weight=1)
         
-    # Event handlers
-    def on_connect(self):
-        logger.info("Dashboard connected to server")
-        self.root.after(0, lambda: self.update_status("🟢 Connected", "green"))
-        self.sio.emit('user_connect', {
-            'aadhaar_id': 'improved_dashboard',
-            'client_type': 'dashboard',
-            'name': 'Improved Monitoring Dashboard',
-            'version': '3.0'
-        })
-        self.start_heartbeat()
-        self.root.after(0, self.update_display)
-    
-    def on_disconnect(self, reason=None):
-        logger.warning(f"Dashboard disconnected: {reason}")
-        self.root.after(0, lambda: self.update_status("🔴 Disconnected", "red"))
-        self.stop_heartbeat()
-        self.root.after(0, self.update_display)
-    
-    def on_connect_error(self, data):
-        logger.error(f"Connection error: {data}")
-        self.root.after(0, lambda: self.update_status("🔴 Connection Error", "red"))
-    
-    def on_users_update(self, data):
-        logger.info(f"Received users update: {len(data)} users")
-        self.connected_users = data
-        self.last_update = datetime.now()
-        self.root.after(0, self.update_display)
-    
-    def on_sos_update(self, data):
-        logger.info(f"Received SOS update: {len(data)} signals")
-        self.sos_signals = data
-        self.last_update = datetime.now()
-        self.root.after(0, self.update_display)
-    
-    def on_stats_update(self, data):
-        logger.info(f"Received stats update: {data}")
-        self.connection_stats = data
-        self.last_update = datetime.now()
-        self.root.after(0, self.update_display)
-    
-    def on_new_sos_alert(self, data):
-        logger.warning(f"🚨 NEW SOS ALERT: {data.get('name', 'Unknown')} at {data.get('location', 'Unknown')}")
-        def show_alert():
-            messagebox.showwarning(
-                "🚨 EMERGENCY SOS ALERT", 
-                f"New SOS Emergency!\n\n"
-                f"👤 User: {data.get('name', 'Unknown')}\n"
-                f"📍 Location: {data.get('location', 'Unknown')}\n"
-                f"🚑 Help Type: {data.get('help_type', 'General')}\n"
-                f"⏱️ ETA: {data.get('eta', 'Unknown')} minutes\n"
-                f"📞 Phone: {data.get('phone', 'N/A')}\n\n"
-                f"⚠️ Immediate action required!"
-            )
-        self.root.after(0, show_alert)
-        
-        # Play alert sound
+    # Model updates from the socket client
+    def drain_updates(self):
+        """Apply every queued model update, then redraw at most once"""
+        redraw = False
+        try:
+            while True:
+                update = self.updates.get_nowait()
+                try:
+                    redraw = self.update_handlers[update.kind](update) or redraw
+                except Exception as e:
+                    logger.error(f"Error applying {update.kind} update: {e}")
+        except queue.Empty:
+            pass
+        if redraw:
+            self.update_display()
+        self.root.after(UPDATE_POLL_MS, self.drain_updates)
+    
+    def on_status_update(self, update):
+        text, color, connected = update.payload
+        health = self.federation.health[update.region]
+        health.status = text
+        health.connected = connected
+        if len(self.regions) == 1:
+            self.update_status(text, color, connected)
+        else:
+            online = sum(1 for h in self.federation.health.values() if h.connected)
+            color = "green" if online == len(self.regions) else ("orange" if online else "red")
+            self.update_status(f"{'🟢' if online else '🔴'} {online}/{len(self.regions)} regions connected",
+                               color, online > 0)
+        return True
+    
+    def on_latency_update(self, update):
+        self.federation.health[update.region].rtt_ms = update.payload
+        self.federation.touch(update.region, update.received_at)
+        logger.info(f"Heartbeat RTT from {update.region}: {update.payload:.0f} ms",
+                    extra=event("latency", region=update.region, rtt_ms=round(update.payload, 1)))
+        return False
+    
+    def on_connect_failed(self, update):
+        messagebox.showerror(
+            "Connection Error", 
+            f"Could not establish connection to {update.region} server:\n{update.payload}\n\n"
+            "The dashboard will keep retrying in the background."
+        )
+        return False
+    
+    def mark_live(self, dataset, update):
+        """Record fresh server data, replacing any cached snapshot data"""
+        self.stale_datasets.discard((update.region, dataset))
+        self.federation.touch(update.region, update.received_at)
+        self.snapshot_dirty = True
+        self.last_update = update.received_at
+        if 'first_live_data' not in self.startup_timings:
+            self.startup_timings['first_live_data'] = time.perf_counter() - _STARTUP_T0
+            logger.info(f"First live data after {self.startup_timings['first_live_data'] * 1000:.0f} ms")
+    
+    def on_users_update(self, update):
+        logger.info(f"Received users update from {update.region}: {len(update.payload)} users",
+                    extra=event("users_update", region=update.region, count=len(update.payload)))
+        self.federation.set_users(update.region, update.payload)
+        self.connected_users = self.federation.merged_users()
+        self.mark_live('users', update)
+        return True
+    
+    def on_sos_update(self, update):
+        logger.info(f"Received SOS update from {update.region}: {len(update.payload)} signals",
+                    extra=event("sos_update", region=update.region, count=len(update.payload)))
+        self.federation.set_sos(update.region, update.payload)
+        self.sos_signals = self.federation.merged_sos()
+        self.sos_engine.sync(self.sos_signals, key='key')
+        self.sync_triage()
+        self.mark_live('sos', update)
+        return True
+    
+    def on_danger_zones(self, update):
+        self.danger_zones[update.region] = update.payload
+        self.triage.set_danger_zones([zone for zones in self.danger_zones.values() for zone in zones])
+        return True
+    
+    def fetch_danger_zones(self, region, url):
+        """Runs on a worker thread; danger zones feed the triage proximity score"""
+        import requests
+        try:
+            response = requests.get(f"{url}/danger-zones", timeout=5)
+            response.raise_for_status()
+            zones = [zone for zone in response.json() if 'lat' in zone and 'lng' in zone]
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.warning(f"Could not load danger zones from {region}: {e}")
+            return
+        self.updates.put(dashboard_client.ModelUpdate(dashboard_client.DANGER_ZONES, zones, region=region))
+    
+    def sync_triage(self):
+        """Add new and drop resolved SOS from the triage queue"""
+        self.triage.sync(
+            signal for signal in self.sos_signals
+            if getattr(self.sos_engine.get(signal.get('key')), 'state', None) != RESOLVED
+        )
+    
+    def on_stats_update(self, update):
+        logger.info(f"Received stats update from {update.region}",
+                    extra=event("stats_update", region=update.region,
+                                **{name: update.payload.get(name) for name in ('activeConnections', 'totalConnections', 'totalSOS')}))
+        self.federation.set_stats(update.region, update.payload)
+        self.connection_stats = self.federation.merged_stats()
+        self.mark_live('stats', update)
+        return True
+    
+    def on_new_sos_alert(self, update):
+        data = update.payload
+        logger.warning(f"🚨 NEW SOS ALERT: {data.get('name', 'Unknown')} at {data.get('location', 'Unknown')}",
+                       extra=event("sos_alert", region=update.region, sos_id=data.get('sos_id'),
+                                   help_type=data.get('help_type')))
+        sender = data.get('aadhaar_id') or data.get('sos_id') or 'unknown'
+        alert = self.alerts.offer(
+            sender,
+            f"{data.get('name', 'Unknown')} at {data.get('location', 'Unknown')}",
+            f"{data.get('help_type', 'General')} · ETA {data.get('eta', '?')} min · 📞 {data.get('phone', 'N/A')}",
+        )
+        if alert is None:
+            return False
+        # The panel row appears at once; the banner/sound waits for the throttle
+        self.alert_list.insert(0, f"{datetime.now().strftime('%H:%M:%S')}  🚨 {alert.title} ({alert.detail})")
+        self.alert_keys.insert(0, make_key(update.region, str(data.get('sos_id'))))
+        if len(self.alert_keys) > ALERT_PANEL_ROWS:
+            self.alert_list.delete(ALERT_PANEL_ROWS, tk.END)
+            del self.alert_keys[ALERT_PANEL_ROWS:]
+        return False
+    
+    def alert_tick(self):
+        try:
+            notification = self.alerts.flush()
+            if notification is not None:
+                self.show_notification(notification)
+        except Exception as e:
+            logger.error(f"Alert flush failed: {e}")
+        self.root.after(ALERT_FLUSH_MS, self.alert_tick)
+    
+    def show_notification(self, notification):
+        if notification.is_summary:
+            names = ", ".join(alert.title.split(" at ")[0] for alert in notification.alerts[:3])
+            more = len(notification.alerts) - 3
+            text = f"🚨 {len(notification.alerts)} NEW SOS: {names}" + (f" and {more} more" if more > 0 else "")
+        else:
+            text = f"🚨 NEW SOS: {notification.title}"
+        if self.alerts.suppressed:
+            text += f"  ({self.alerts.suppressed} repeats folded)"
+        self.alert_banner.config(text=text, bg="#fecaca", fg="#991b1b")
+        
+        # Play alert sound (asynchronous, never blocks the Tk thread)
         if sys.platform == "win32":
             try:
                 import winsound
                 winsound.MessageBeep(winsound.MB_ICONEXCLAMATION)
             except:
                 pass
+        else:
+            self.root.bell()
+    
+    def acknowledge_alerts(self):
+        self.alert_banner.config(text="No new alerts", bg=self.alert_banner_bg, fg="black")
     
-    def on_new_efir(self, data):
-        logger.info(f"New E-FIR: {data.get('incident_type', 'Unknown')} by {data.get('user_name', 'Unknown')}")
-        self.efir_reports.append(data)
-        self.root.after(0, self.update_display)
+    def on_alert_activate(self, event):
+        selection = self.alert_list.curselection()
+        if not selection:
+            return
+        key = self.alert_keys[selection[0]]
+        if self.sos_tree.exists(key):
+            self.notebook.select(0)
+            self.sos_tree.selection_set(key)
+            self.sos_tree.see(key)
     
-    def on_heartbeat_ack(self, data):
-        pass  # Heartbeat acknowledged
+    def on_new_efir(self, update):
+        data = update.payload
+        logger.info(f"New E-FIR: {data.get('incident_type', 'Unknown')} by {data.get('user_name', 'Unknown')}",
+                    extra=event("efir", region=update.region, efir_id=data.get('efir_id')))
+        self.federation.add_efir(update.region, data)
+        self.efir_reports = self.federation.efir
+        self.snapshot_dirty = True
+        return True
+    
+    # Local state snapshot
+    def load_local_snapshot(self):
+        started = time.perf_counter()
+        state = load_snapshot(self.snapshot_path)
+        self.startup_timings['snapshot_load'] = time.perf_counter() - started
+        if state is None:
+            return
+        self.federation.load(
+            state.get('connected_users', []),
+            state.get('sos_signals', []),
+            state.get('efir_reports', []),
+            state.get('connection_stats', {}),
+        )
+        self.connected_users = self.federation.merged_users()
+        self.sos_signals = self.federation.merged_sos()
+        self.efir_reports = self.federation.efir
+        self.connection_stats = self.federation.merged_stats()
+        self.sos_engine.sync(self.sos_signals, key='key')
+        self.sync_triage()
+        self.last_update = self.parse_datetime(state.get('saved_at'))
+        self.stale_datasets = {(region, dataset) for region in self.regions for dataset in ('users', 'sos', 'stats')}
+        logger.info(
+            f"Loaded snapshot from {state.get('saved_at')}: {len(self.connected_users)} users, "
+            f"{len(self.sos_signals)} SOS, {len(self.efir_reports)} E-FIR"
+        )
+    
+    def save_local_snapshot(self):
+        try:
+            save_snapshot(self.snapshot_path, self.connected_users, self.sos_signals,
+                          self.efir_reports, self.connection_stats)
+            self.snapshot_dirty = False
+        except OSError as e:
+            logger.error(f"Failed to save dashboard snapshot: {e}")
+    
+    def snapshot_tick(self):
+        if self.snapshot_dirty:
+            self.save_local_snapshot()
+        self.root.after(SNAPSHOT_SAVE_MS, self.snapshot_tick)
+    
+    def report_first_paint(self):
+        self.startup_timings['first_paint'] = time.perf_counter() - _STARTUP_T0
+        logger.info(
+            f"Startup: window ready in {self.startup_timings['first_paint'] * 1000:.0f} ms "
+            f"(snapshot load {self.startup_timings.get('snapshot_load', 0) * 1000:.1f} ms)"
+        )
+    
+    # SOS lifecycle (runs on the Tk thread)
+    def sos_tick(self):
+        try:
+            self.sos_engine.tick()
+        except Exception as e:
+            logger.error(f"SOS lifecycle tick failed: {e}")
+        self.root.after(SOS_TICK_MS, self.sos_tick)
+    
+    def on_sos_lifecycle_update(self, changes):
+        # One coalesced redraw per tick, however many ETAs moved
+        self.update_sos_display()
+    
+    def emit_sos_status(self, case):
+        # Cases are keyed region/sos_id; send the raw id to the owning server
+        region, sos_id = split_key(case.sos_id)
+        payload = case.to_update()
+        payload['sos_id'] = sos_id
+        if region in self.clients:
+            self.clients[region].emit('sos_status', payload)
     
     # Connection management
     def toggle_connection(self):
@@ -491,54 +775,28 @@ class ImprovedDashboardUI:
             self.connect()
     
     def connect(self):
-        try:
-            self.sio.connect(self.server_url)
-            return True
-        except Exception as e:
-            logger.error(f"Cannot connect to server: {e}")
-            messagebox.showerror("Connection Error", f"Cannot connect to server:\n{e}")
-            return False
+        self.update_status("🟡 Connecting...", "orange", False)
+        for client in self.clients.values():
+            client.connect()
     
     def disconnect(self):
-        self.stop_heartbeat()
-        try:
-            if self.sio.connected:
-                self.sio.disconnect()
-        except Exception as e:
-            logger.error(f"Error during disconnect: {e}")
-    
-    def start_heartbeat(self):
-        def send_heartbeat():
-            while self.connected:
-                try:
-                    self.sio.emit('heartbeat', {'type': 'dashboard', 'timestamp': datetime.now().isoformat()})
-                    time.sleep(10)
-                except Exception as e:
-                    logger.error(f"Heartbeat error: {e}")
-                    break
-        self.heartbeat_interval = threading.Thread(target=send_heartbeat, daemon=True)
-        self.heartbeat_interval.start()
-        
-    def stop_heartbeat(self):
-        self.connected = False
+        for client in self.clients.values():
+            client.disconnect()
     
-    # Auto-refresh functionality
-    def start_auto_refresh(self):
-        def auto_refresh_loop():
-            while True:
-                if self.auto_refresh and self.connected:
-                    self.root.after(0, self.update_display)
-                time.sleep(5)  # Refresh every 5 seconds
-        threading.Thread(target=auto_refresh_loop, daemon=True).start()
+    # Auto-refresh functionality (keeps relative times current)
+    def auto_refresh_tick(self):
+        if self.auto_refresh and self.connected:
+            self.update_display()
+        self.root.after(AUTO_REFRESH_MS, self.auto_refresh_tick)
     
     def toggle_auto_refresh(self):
         self.auto_refresh = self.auto_refresh_var.get()
         logger.info(f"Auto-refresh {'enabled' if self.auto_refresh else 'disabled'}")
     
     # Display update methods
-    def update_status(self, status, color="black"):
+    def update_status(self, status, color="black", connected=False):
         self.status_label.config(text=status, foreground=color)
-        self.connected = "Connected" in status
+        self.connected = connected
         if self.connected:
             self.connect_button.config(text="🔌 Disconnect")
         else:
@@ -547,8 +805,19 @@ class ImprovedDashboardUI:
     def update_display(self):
         try:
             # Update timestamp
+            # Region health and lag indicators
+            for region, label in self.region_labels.items():
+                health = self.federation.health[region]
+                label.config(text=health.summary(), foreground="green" if health.connected else "red")
+            
             if self.last_update:
-                self.update_label.config(text=self.last_update.strftime('%H:%M:%S'))
+                if self.stale_datasets:
+                    self.update_label.config(
+                        text=f"{self.last_update.strftime('%H:%M:%S')} (cached snapshot, stale)",
+                        foreground="orange"
+                    )
+                else:
+                    self.update_label.config(text=self.last_update.strftime('%H:%M:%S'), foreground="black")
             
             # Update statistics
             if self.connection_stats:
@@ -576,57 +845,80 @@ class ImprovedDashboardUI:
             # Update analytics
             self.update_analytics_display()
             
+            # Update the density map if it is open
+            self.refresh_map()
+            
         except Exception as e:
             logger.error(f"Error updating display: {e}")
     
     def update_sos_display(self):
-        # Clear existing items
-        for item in self.sos_tree.get_children():
-            self.sos_tree.delete(item)
+        """Show the top open SOS in triage order, moving only rows that changed"""
+        keys = self.triage.top(SOS_DISPLAY_LIMIT)
         
         # Update summary
-        sos_count = len(self.sos_signals)
+        sos_count = len(self.triage)
         if sos_count == 0:
             self.sos_summary_label.config(text="✅ No active SOS signals", foreground="green")
         else:
-            self.sos_summary_label.config(text=f"🚨 {sos_count} ACTIVE SOS SIGNALS - IMMEDIATE ATTENTION REQUIRED!", foreground="red")
-        
-        # Add SOS signals
-        for i, signal in enumerate(self.sos_signals):
-            # Determine priority
-            help_type = signal.get('help_type', 'general')
-            if help_type in ['ambulance', 'fire']:
-                priority = "🔴 CRITICAL"
-            elif help_type == 'police':
-                priority = "🟠 HIGH"
+            shown = f" (top {len(keys)} by urgency)" if sos_count > len(keys) else ""
+            self.sos_summary_label.config(text=f"🚨 {sos_count} ACTIVE SOS SIGNALS{shown} - IMMEDIATE ATTENTION REQUIRED!", foreground="red")
+        
+        wanted = set(keys)
+        for item in self.sos_tree.get_children():
+            if item not in wanted:
+                self.sos_tree.delete(item)
+                self.sos_rows.pop(item, None)
+        current = list(self.sos_tree.get_children())
+        
+        for index, key in enumerate(keys):
+            values = self.sos_row_values(key)
+            if index < len(current) and current[index] == key:
+                pass
+            elif key in self.sos_rows:
+                self.sos_tree.move(key, '', index)
+                current.remove(key)
+                current.insert(index, key)
             else:
-                priority = "🟡 MEDIUM"
-            
-            # Format time
-            sos_time = self.parse_datetime(signal.get('sos_time'))
-            time_ago = self.format_timedelta(sos_time)
-            
-            # Format ETA
+                # Rows are keyed by region/sos_id so actions can find the case
+                self.sos_tree.insert('', index, iid=key, values=values)
+                current.insert(index, key)
+                self.sos_rows[key] = values
+                continue
+            if self.sos_rows[key] != values:
+                self.sos_tree.item(key, values=values)
+                self.sos_rows[key] = values
+    
+    def sos_row_values(self, key):
+        signal = self.triage.signal(key)
+        case = self.sos_engine.get(key)
+        priority = SEVERITY_LABELS[self.triage.severity(signal)]
+        if self.triage.near_danger(key):
+            priority += " ⚠️"
+        
+        # Format time
+        sos_time = self.parse_datetime(signal.get('sos_time'))
+        time_ago = self.format_timedelta(sos_time)
+        
+        # ETA and status come from the lifecycle engine when it tracks the SOS
+        if case is not None:
+            eta = case.eta_minutes if case.eta_minutes is not None else 'N/A'
+            status = case.state
+        else:
             eta = signal.get('eta', 'N/A')
-            eta_text = f"{eta} min" if eta != 'N/A' else 'N/A'
-            
-            # Insert row
-            item = self.sos_tree.insert('', 'end', values=(
-                priority,
-                signal.get('name', 'Unknown'),
-                signal.get('location', 'Unknown'),
-                signal.get('help_type', 'General').title(),
-                time_ago,
-                eta_text,
-                signal.get('status', 'Active').upper(),
-                signal.get('phone', 'N/A')
-            ))
-            
-            # Color coding
-            if help_type in ['ambulance', 'fire']:
-                self.sos_tree.set(item, 'priority', '🔴 CRITICAL')
-            elif help_type == 'police':
-                self.sos_tree.set(item, 'priority', '🟠 HIGH')
+            status = signal.get('status', 'Active')
+        eta_text = f"{eta} min" if eta != 'N/A' else 'N/A'
+        
+        return (
+            priority,
+            signal.get('name', 'Unknown'),
+            signal.get('location', 'Unknown'),
+            signal.get('help_type', 'General').title(),
+            time_ago,
+            eta_text,
+            status.upper(),
+            signal.get('phone', 'N/A'),
+            signal.get('region', DEFAULT_REGION)
+        )
     
     def update_users_display(self):
         # Clear existing items
@@ -670,7 +962,8 @@ class ImprovedDashboardUI:
                 user.get('language', 'en').upper(),
                 uptime,
                 tracking_text,
-                sos_status
+                sos_status,
+                user.get('region', DEFAULT_REGION)
             ))
     
     def update_efir_display(self):
@@ -707,7 +1000,8 @@ class ImprovedDashboardUI:
                 efir.get('location', 'Unknown'),
                 time_ago,
                 efir.get('status', 'Filed').upper(),
-                efir.get('efir_id', 'N/A')[:8] + "..."  # Shortened ID
+                efir.get('efir_id', 'N/A')[:8] + "...",  # Shortened ID
+                efir.get('region', DEFAULT_REGION)
             ))
     
     def update_tracking_display(self):
@@ -744,7 +1038,8 @@ class ImprovedDashboardUI:
                     coord_text,
                     last_update,
                     tracking_text,
-                    movement
+                    movement,
+                    user.get('region', DEFAULT_REGION)
                 ))
     
     def update_analytics_display(self):
@@ -773,6 +1068,12 @@ Users with Tracking: {len([u for u in self.connected_users if u.get('real_time_t
 Active SOS Signals: {len(self.sos_signals)}
 """
         
+        # Add startup timings
+        if self.startup_timings:
+            analytics_text += "\n⏱️ STARTUP TIMINGS:\n"
+            for name, seconds in self.startup_timings.items():
+                analytics_text += f"  {name.replace('_', ' ').title()}: {seconds * 1000:.1f} ms\n"
+        
         # Add SOS breakdown
         if self.sos_signals:
             analytics_text += "\n🚑 SOS BREAKDOWN BY TYPE:\n"
@@ -851,26 +1152,52 @@ Active SOS Signals: {len(self.sos_signals)}
         self.update_display()
         messagebox.showinfo("Refresh", "Dashboard data refreshed successfully!")
     
+    def apply_sos_action(self, action, selection):
+        """Run a lifecycle action on each selected SOS; returns the failures"""
+        failures = []
+        for sos_id in selection:
+            try:
+                case = action(sos_id)
+                if case.state == RESOLVED:
+                    self.triage.remove(sos_id)
+                self.emit_sos_status(case)
+            except (KeyError, InvalidTransition) as e:
+                failures.append(f"{sos_id[:8]}...: {e}")
+        self.update_sos_display()
+        return failures
+    
     def resolve_sos(self):
         selection = self.sos_tree.selection()
         if selection:
-            messagebox.showinfo("SOS Resolved", "✅ Selected SOS has been marked as resolved")
+            failures = self.apply_sos_action(self.sos_engine.resolve, selection)
+            if failures:
+                messagebox.showwarning("Resolve Failed", "\n".join(failures))
+            else:
+                messagebox.showinfo("SOS Resolved", "✅ Selected SOS has been marked as resolved")
         else:
             messagebox.showwarning("No Selection", "Please select an SOS signal to resolve")
     
     def dispatch_help(self):
         selection = self.sos_tree.selection()
         if selection:
-            messagebox.showinfo("Help Dispatched", "🚑 Emergency help has been dispatched to the location")
+            failures = self.apply_sos_action(self.sos_engine.dispatch, selection)
+            if failures:
+                messagebox.showwarning("Dispatch Failed", "\n".join(failures))
+            else:
+                messagebox.showinfo("Help Dispatched", "🚑 Emergency help has been dispatched to the location")
         else:
             messagebox.showwarning("No Selection", "Please select an SOS signal to dispatch help")
     
     def update_eta(self):
         selection = self.sos_tree.selection()
         if selection:
-            new_eta = tk.simpledialog.askinteger("Update ETA", "Enter new ETA in minutes:", minvalue=1, maxvalue=120)
+            new_eta = simpledialog.askinteger("Update ETA", "Enter new ETA in minutes:", minvalue=1, maxvalue=120)
             if new_eta:
-                messagebox.showinfo("ETA Updated", f"⏱️ ETA updated to {new_eta} minutes")
+                failures = self.apply_sos_action(lambda sos_id: self.sos_engine.set_eta(sos_id, new_eta), selection)
+                if failures:
+                    messagebox.showwarning("ETA Update Failed", "\n".join(failures))
+                else:
+                    messagebox.showinfo("ETA Updated", f"⏱️ ETA updated to {new_eta} minutes")
     
     def contact_user(self):
         selection = self.sos_tree.selection()
@@ -883,6 +1210,7 @@ Active SOS Signals: {len(self.sos_signals)}
         if messagebox.askyesno("Clear SOS", "Are you sure you want to clear all SOS signals?"):
             for item in self.sos_tree.get_children():
                 self.sos_tree.delete(item)
+            self.sos_rows.clear()
             messagebox.showinfo("Cleared", "🗑️ All SOS signals cleared from display")
     
     def export_data(self):
@@ -906,10 +1234,10 @@ Active SOS Signals: {len(self.sos_signals)}
                 messagebox.showerror("Export Error", f"Failed to export data:\n{e}")
     
     def show_map(self):
-        messagebox.showinfo("Map View", "🗺️ Interactive map would open here showing user locations and SOS signals")
+        self.open_map('sos')
     
     def show_analytics(self):
-        messagebox.showinfo("Analytics", "📈 Advanced analytics charts would be displayed here")
+        self.request_timeseries('analytics', 'hour', 24)
     
     def show_settings(self):
         messagebox.showinfo("Settings", "⚙️ Dashboard settings and configuration panel would open here")
@@ -919,13 +1247,124 @@ Active SOS Signals: {len(self.sos_signals)}
         messagebox.showinfo("Tracking Refreshed", "📍 Location tracking data has been refreshed")
     
     def show_tracking_map(self):
-        messagebox.showinfo("Tracking Map", "🗺️ Real-time tracking map would open here")
+        self.open_map('users')
+    
+    def open_map(self, layer):
+        if self.map_view is not None and self.map_view.alive():
+            self.map_view.set_layer(layer)
+            self.map_view.window.lift()
+            return
+        self.map_view = MapView(self.root, layer, on_close=self.on_map_closed)
+        self.map_sources = None
+        self.refresh_map()
+    
+    def on_map_closed(self):
+        self.map_view = None
+    
+    def refresh_map(self):
+        """Push data to the map only when the underlying lists were replaced"""
+        if self.map_view is None:
+            return
+        sources = (self.connected_users, self.sos_signals, len(self.triage), len(self.danger_zones))
+        previous = self.map_sources
+        if (previous is not None and previous[0] is sources[0] and previous[1] is sources[1]
+                and previous[2:] == sources[2:]):
+            return
+        self.map_sources = sources
+        markers = [self.triage.signal(key) for key in self.triage.top(SOS_DISPLAY_LIMIT)]
+        zones = [zone for zones in self.danger_zones.values() for zone in zones]
+        self.map_view.set_data(self.connected_users, self.sos_signals, markers, zones)
     
     def generate_report(self):
-        messagebox.showinfo("Report Generated", "📊 Comprehensive system report has been generated")
+        self.request_timeseries('report', 'hour', 24)
     
     def show_charts(self):
-        messagebox.showinfo("Charts", "📈 Statistical charts and graphs would be displayed here")
+        if self.charts_view is not None and self.charts_view.alive():
+            self.charts_view.window.lift()
+            self.charts_view.refresh()
+            return
+        self.charts_view = ChartsView(
+            self.root, lambda resolution, buckets: self.request_timeseries('charts', resolution, buckets),
+            on_close=self.on_charts_closed,
+        )
+    
+    def on_charts_closed(self):
+        self.charts_view = None
+    
+    def request_timeseries(self, purpose, resolution, buckets):
+        threading.Thread(target=self.fetch_timeseries, args=(purpose, resolution, buckets), daemon=True).start()
+    
+    def fetch_timeseries(self, purpose, resolution, buckets):
+        """Runs on a worker thread; the server returns precomputed per-bucket arrays"""
+        import requests
+        result = {'purpose': purpose, 'series': None, 'error': None}
+        try:
+            response = requests.get(f"{STATS_SERVER_URL}/stats/timeseries",
+                                    params={'resolution': resolution, 'buckets': buckets}, timeout=5)
+            response.raise_for_status()
+            result['series'] = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.warning(f"Could not load connection statistics: {e}")
+            result['error'] = str(e)
+        self.updates.put(dashboard_client.ModelUpdate(dashboard_client.TIMESERIES, result))
+    
+    def on_timeseries(self, update):
+        result = update.payload
+        purpose, series, error = result['purpose'], result['series'], result['error']
+        if purpose == 'charts':
+            if self.charts_view is not None and self.charts_view.alive():
+                if error:
+                    self.charts_view.set_error(error)
+                else:
+                    self.charts_view.set_series(series)
+            return False
+        if error:
+            messagebox.showerror("Statistics Unavailable", f"❌ Could not load connection statistics:\n{error}")
+            return False
+        if purpose == 'analytics':
+            messagebox.showinfo("Analytics", self.format_analytics_summary(summarize(series)))
+        elif purpose == 'report':
+            self.save_report(series)
+        return False
+    
+    def format_analytics_summary(self, summary):
+        peak = (datetime.fromtimestamp(summary['peak_at']).strftime('%H:00')
+                if summary['peak_at'] is not None else "—")
+        return (
+            "📈 Last 24 hours\n\n"
+            f"Connects: {summary['connects']}\n"
+            f"Disconnects: {summary['disconnects']}\n"
+            f"Unique users: ≈{summary['unique_users']}\n"
+            f"Busiest hour: {peak} ({summary['peak_connects']} connects)\n\n"
+            f"Online now: {summary['active_connections']}\n"
+            f"Dashboard users: {len(self.connected_users)}\n"
+            f"Open SOS: {len(self.triage)} of {len(self.sos_signals)}\n"
+            f"E-FIR reports: {len(self.efir_reports)}"
+        )
+    
+    def save_report(self, series):
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            initialfile=f"system_report_{datetime.now():%Y%m%d_%H%M}.json",
+            filetypes=[("JSON files", "*.json"), ("All files", "*.*")]
+        )
+        if not filename:
+            return
+        report = {
+            'generated_at': datetime.now().isoformat(),
+            'summary_24h': summarize(series),
+            'hourly': series,
+            'connection_stats': self.connection_stats,
+            'connected_users': len(self.connected_users),
+            'sos_signals': len(self.sos_signals),
+            'efir_reports': len(self.efir_reports),
+        }
+        try:
+            with open(filename, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+            messagebox.showinfo("Report Generated", f"📊 System report saved to:\n{filename}")
+        except OSError as e:
+            messagebox.showerror("Report Failed", f"❌ Could not save report: {e}")
     
     def on_efir_select(self, event):
         selection = self.efir_tree.selection()
@@ -957,42 +1396,121 @@ Active SOS Signals: {len(self.sos_signals)}
 {'='*50}
                         """
                         
+                        hashes = self.attachment_hashes(efir.get('attachments'))
+                        if hashes:
+                            details += "\n📎 ATTACHMENTS:\n" + "\n".join(f"  {h}" for h in hashes)
+                        
                         self.efir_details.delete(1.0, tk.END)
                         self.efir_details.insert(1.0, details.strip())
+                        self.request_attachment_preview('efir', self.efir_preview, hashes[0] if hashes else None)
                         break
     
+    # Attachments (fetched lazily through the on-disk LRU cache)
+    @staticmethod
+    def attachment_hashes(attachments):
+        hashes = []
+        for attachment in attachments or []:
+            digest = attachment.get('hash') if isinstance(attachment, dict) else attachment
+            if isinstance(digest, str) and is_valid_hash(digest):
+                hashes.append(digest)
+        return hashes
+    
+    def on_sos_select(self, event):
+        selection = self.sos_tree.selection()
+        if not selection:
+            return
+        signal = next((s for s in self.sos_signals if s.get('key') == selection[0]), None)
+        if signal is None:
+            return
+        digest = signal.get('image_hash')
+        if digest:
+            self.request_attachment_preview('sos', self.sos_preview, digest)
+        else:
+            self.preview_hashes.pop('sos', None)
+            text = "Inline image (legacy payload)" if signal.get('image') else "No attachment"
+            self.sos_preview.config(image='', text=text)
+    
+    def request_attachment_preview(self, target, label, digest):
+        if not digest:
+            self.preview_hashes.pop(target, None)
+            label.config(image='', text="")
+            return
+        self.preview_hashes[target] = digest
+        label.config(image='', text=f"⏳ Loading attachment {digest[:12]}...")
+        self.attachment_executor.submit(self.fetch_attachment, target, digest)
+    
+    def fetch_attachment(self, target, digest):
+        """Runs on a worker thread; hands the result to the Tk thread via the update queue"""
+        result = {'target': target, 'hash': digest, 'path': None, 'thumbnail': None, 'error': None}
+        try:
+            result['path'] = self.attachment_cache.get(digest)
+            result['thumbnail'] = self.attachment_cache.thumbnail(digest)
+            result['content_type'] = self.attachment_cache.content_type(digest)
+        except Exception as e:
+            result['error'] = str(e)
+        self.updates.put(dashboard_client.ModelUpdate(dashboard_client.ATTACHMENT, result))
+    
+    def on_attachment_ready(self, update):
+        result = update.payload
+        # Ignore results for a selection the operator has already moved away from
+        if self.preview_hashes.get(result['target']) != result['hash']:
+            return False
+        label = self.sos_preview if result['target'] == 'sos' else self.efir_preview
+        if result['error']:
+            label.config(image='', text=f"⚠️ Attachment unavailable: {result['error']}")
+            return False
+        image = None
+        try:
+            if result['thumbnail']:
+                image = tk.PhotoImage(file=result['thumbnail'])
+            elif result.get('content_type') in ('image/png', 'image/gif'):
+                image = tk.PhotoImage(file=result['path'])
+                factor = max(1, -(-max(image.width(), image.height()) // 240))
+                image = image.subsample(factor, factor)
+        except tk.TclError:
+            image = None
+        if image is not None:
+            label.image = image  # keep a reference so Tk doesn't drop it
+            label.config(image=image, text="")
+        else:
+            label.config(image='', text=f"📎 Saved to {result['path']}")
+        return False
+    
     def on_closing(self):
         logger.info("Dashboard closing...")
-        self.disconnect()
+        self.save_local_snapshot()
+        self.attachment_executor.shutdown(wait=False)
+        for client in self.clients.values():
+            client.stop()
         self.root.destroy()
     
     def run(self):
         logger.info("Starting Improved Tourist Safety Dashboard...")
-        
-        def try_connect():
-            time.sleep(1)
-            if not self.connect():
-                logger.error("Failed to connect to server.")
-                self.root.after(0, lambda: messagebox.showerror(
-                    "Connection Error", 
-                    "Could not establish connection to server.\n\nPlease ensure the server is running and try again."
-                ))
-        
-        threading.Thread(target=try_connect, daemon=True).start()
+        self.root.after_idle(self.report_first_paint)
+        self.connect()
         self.root.mainloop()
 
-def main():
+def probe_server_health(server_url):
+    """Report server health; runs in the background alongside the socket connect"""
+    import requests
     try:
-        response = requests.get("http://localhost:3000/health", timeout=5)
+        response = requests.get(f"{server_url}/health", timeout=5)
         if response.status_code == 200:
-            print("✅ Enhanced server is running. Starting improved dashboard...")
+            print(f"✅ Enhanced server at {server_url} is running.")
         else:
-            print("⚠️ Server returned error. Starting dashboard anyway...")
+            print(f"⚠️ Server at {server_url} returned error. Dashboard will keep retrying...")
     except requests.exceptions.RequestException:
-        print("⚠️ Warning: Cannot reach server. Starting dashboard in offline mode...")
+        print(f"⚠️ Warning: Cannot reach {server_url}. Showing cached data until it is available...")
+
+def main():
+    server_url = "http://localhost:3000"
+    # Regional deployments: DASHBOARD_SERVERS="mumbai=http://host-a:3000,delhi=http://host-b:3000"
+    regions = parse_regions(os.environ.get("DASHBOARD_SERVERS", "")) or {DEFAULT_REGION: server_url}
+    for url in regions.values():
+        threading.Thread(target=probe_server_health, args=(url,), daemon=True).start()
     
     root = tk.Tk()
-    app = ImprovedDashboardUI(root)
+    app = ImprovedDashboardUI(root, server_url, regions=regions)
     app.run()
 
 if __name__ == "__main__":
@@ -0,0 +1,190 @@
+"""Run server.py as N user-sharded workers sharing one port.
+
+    python launcher.py [--workers 4] [--host 0.0.0.0] [--port 8000]
+
+Each worker binds the public port with SO_REUSEPORT (the kernel spreads
+connections across them) plus a private Unix socket used for shard-to-shard
+forwarding and scatter-gather (see sharding.py). uvicorn picks uvloop and
+httptools when they are installed.
+
+Signals to the launcher:
+  SIGTERM / SIGINT  drain every worker (finish in-flight requests) and exit
+  SIGHUP            rolling restart: start each replacement, then drain the old worker
+
+State is in-process: a restarted shard starts empty and refills as its
+users reconnect (heartbeats for unknown users get 404). Set HISTORY_DB_PATH
+for durable history. Per-worker LOG_PATH / TRAFFIC_CAPTURE_PATH get a
+``.<index>`` suffix so workers do not share a rotating file.
+"""
+import argparse
+import os
+import secrets
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sharding import socket_path
+
+READY_TIMEOUT = 30.0
+RESPAWN_DELAY = 1.0
+
+
+def _suffixed(name: str, index: int) -> str:
+    root, ext = os.path.splitext(name)
+    if ext == ".gz":  # capture.jsonl.gz -> capture.0.jsonl.gz
+        root, inner = os.path.splitext(root)
+        ext = inner + ext
+    return f"{root}.{index}{ext}"
+
+
+def run_worker(index: int, host: str, port: int, socket_dir: str, graceful_timeout: float):
+    import uvicorn
+
+    public = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    public.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    public.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    public.bind((host, port))
+
+    # Bind under a temporary name and rename once serving, so peers switch
+    # from the draining predecessor to this worker atomically
+    final_path = socket_path(socket_dir, index)
+    staging_path = f"{final_path}.{os.getpid()}"
+    private = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    private.bind(staging_path)
+    os.chmod(staging_path, 0o600)
+
+    server = uvicorn.Server(uvicorn.Config("server:app", timeout_graceful_shutdown=graceful_timeout))
+
+    def publish_when_started():
+        while not server.started and not server.should_exit:
+            time.sleep(0.05)
+        if server.started:
+            os.replace(staging_path, final_path)
+    threading.Thread(target=publish_when_started, daemon=True).start()
+    server.run(sockets=[public, private])
+
+
+class Launcher:
+    def __init__(self, args):
+        self.args = args
+        self.socket_dir = args.socket_dir or tempfile.mkdtemp(prefix="server-shards-")
+        # Authenticates shard-to-shard requests; shared by old and new workers during a rolling restart
+        self.secret = secrets.token_hex(16)
+        self.workers: Dict[int, subprocess.Popen] = {}
+        self.draining: List[subprocess.Popen] = []
+        self.stopping = False
+        self.restart_requested = False
+
+    def spawn(self, index: int) -> subprocess.Popen:
+        env = dict(os.environ, SHARD_INDEX=str(index), SHARD_COUNT=str(self.args.workers),
+                   SHARD_SOCKET_DIR=self.socket_dir, SHARD_SECRET=self.secret)
+        env["LOG_PATH"] = _suffixed(os.environ.get("LOG_PATH", "server.log"), index)
+        if os.environ.get("TRAFFIC_CAPTURE_PATH"):
+            env["TRAFFIC_CAPTURE_PATH"] = _suffixed(os.environ["TRAFFIC_CAPTURE_PATH"], index)
+        return subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--worker", str(index), "--workers", str(self.args.workers),
+             "--host", self.args.host, "--port", str(self.args.port), "--socket-dir", self.socket_dir,
+             "--graceful-timeout", str(self.args.graceful_timeout)],
+            env=env,
+        )
+
+    def _socket_inode(self, index: int) -> Optional[int]:
+        try:
+            return os.stat(socket_path(self.socket_dir, index)).st_ino
+        except FileNotFoundError:
+            return None
+
+    def wait_ready(self, index: int, process: subprocess.Popen, previous_inode: Optional[int]) -> bool:
+        """Wait until the worker has published its own socket at the shard's path"""
+        deadline = time.monotonic() + READY_TIMEOUT
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                return False
+            inode = self._socket_inode(index)
+            if inode is not None and inode != previous_inode:
+                return True
+            time.sleep(0.05)
+        return False
+
+    def drain(self, process: subprocess.Popen):
+        if process.poll() is None:
+            process.send_signal(signal.SIGTERM)
+        self.draining.append(process)
+
+    def rolling_restart(self):
+        print(f"[launcher] Rolling restart of {len(self.workers)} workers", flush=True)
+        for index in sorted(self.workers):
+            old = self.workers[index]
+            previous_inode = self._socket_inode(index)
+            new = self.spawn(index)
+            if not self.wait_ready(index, new, previous_inode):
+                print(f"[launcher] Worker {index} replacement failed to start; keeping the old one", flush=True)
+                self.drain(new)
+                continue
+            self.workers[index] = new
+            self.drain(old)
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_hup)
+        for index in range(self.args.workers):
+            self.workers[index] = self.spawn(index)
+        for index, process in self.workers.items():
+            if not self.wait_ready(index, process, None):
+                print(f"[launcher] Worker {index} failed to start", flush=True)
+        print(f"[launcher] {self.args.workers} workers on {self.args.host}:{self.args.port} "
+              f"(shard sockets in {self.socket_dir})", flush=True)
+        try:
+            while not self.stopping:
+                if self.restart_requested:
+                    self.restart_requested = False
+                    self.rolling_restart()
+                for index, process in list(self.workers.items()):
+                    if process.poll() is not None and not self.stopping:
+                        print(f"[launcher] Worker {index} exited with {process.returncode}; restarting", flush=True)
+                        time.sleep(RESPAWN_DELAY)
+                        self.workers[index] = self.spawn(index)
+                self.draining = [process for process in self.draining if process.poll() is None]
+                time.sleep(0.2)
+        finally:
+            for process in self.workers.values():
+                self.drain(process)
+            for process in self.draining:
+                try:
+                    process.wait(timeout=self.args.graceful_timeout + 5)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+            if not self.args.socket_dir:
+                shutil.rmtree(self.socket_dir, ignore_errors=True)
+
+    def _on_stop(self, signum, frame):
+        self.stopping = True
+
+    def _on_hup(self, signum, frame):
+        self.restart_requested = True
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--socket-dir", default=None, help="directory for the workers' Unix sockets (default: temporary)")
+    parser.add_argument("--graceful-timeout", type=float, default=30.0, help="seconds a draining worker may take")
+    parser.add_argument("--worker", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.worker is not None:
+        run_worker(args.worker, args.host, args.port, args.socket_dir, args.graceful_timeout)
+        return
+    Launcher(args).run()
+
+
+if __name__ == "__main__":
+    main()
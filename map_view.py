@@ -0,0 +1,240 @@
+import math
+import time
+import tkinter as tk
+from tkinter import ttk
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from heatmap_tiles import TILE_SIZE, DensityTiles, project, unproject
+
+MIN_ZOOM, MAX_ZOOM = 2, 17
+DEFAULT_CENTER = (20.5937, 78.9629)  # India
+DEFAULT_ZOOM = 5
+BACKGROUND = "#0f172a"
+EARTH_CIRCUMFERENCE_M = 40075016.686
+MAX_MARKERS = 500
+MAX_CACHED_TILES = 512  # per layer; tiles at other zooms are dropped first
+
+
+def _palette(start: str, end: str, levels: int) -> List[str]:
+    """Level 0 is the background; 1..levels-1 blend from start to end"""
+    a = [int(start[i:i + 2], 16) for i in (1, 3, 5)]
+    b = [int(end[i:i + 2], 16) for i in (1, 3, 5)]
+    colours = [BACKGROUND]
+    for level in range(1, levels):
+        t = (level - 1) / max(1, levels - 2)
+        colours.append("#" + "".join(f"{round(x + (y - x) * t):02x}" for x, y in zip(a, b)))
+    return colours
+
+
+def coordinates(records: List[dict]) -> Tuple[List[float], List[float]]:
+    lats, lngs = [], []
+    for record in records:
+        coords = record.get('coordinates') or {}
+        lat, lng = coords.get('lat'), coords.get('lng')
+        if isinstance(lat, (int, float)) and isinstance(lng, (int, float)):
+            lats.append(lat)
+            lngs.append(lng)
+    return lats, lngs
+
+
+class MapView:
+    """Offline density map of users or SOS signals in its own window.
+
+    No basemap tiles are fetched: each layer is a ``DensityTiles`` heatmap
+    rendered into one cached ``PhotoImage`` per (zoom, tile). When the data
+    changes only the cells reported dirty are repainted in cached tiles, so
+    panning, zooming and live updates redraw by placing cached images.
+    """
+
+    LAYERS = {
+        'users': ("👥 Users", _palette("#1e40af", "#67e8f9", 16)),
+        'sos': ("🚨 SOS", _palette("#9a3412", "#fde047", 16)),
+    }
+
+    def __init__(self, root, layer: str = 'users', on_close: Optional[Callable[[], None]] = None):
+        self.on_close = on_close
+        self.window = tk.Toplevel(root)
+        self.window.title("🗺️ Density Map")
+        self.window.geometry("1000x720")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        self.tiles = {name: DensityTiles(levels=len(palette)) for name, (_, palette) in self.LAYERS.items()}
+        self.photos: Dict[str, Dict[Tuple[int, int, int], tk.PhotoImage]] = {name: {} for name in self.LAYERS}
+        self.markers: List[Tuple[float, float, str]] = []
+        self.zones: List[dict] = []
+        self.zoom = DEFAULT_ZOOM
+        x, y = project(np.array([DEFAULT_CENTER[0]]), np.array([DEFAULT_CENTER[1]]))
+        self.center = (float(x[0]), float(y[0]))
+        self._drag_from = None
+        self._fitted = False
+
+        toolbar = ttk.Frame(self.window, padding="5")
+        toolbar.pack(fill=tk.X)
+        self.layer = tk.StringVar(value=layer)
+        for i, (name, (title, _)) in enumerate(self.LAYERS.items()):
+            ttk.Radiobutton(toolbar, text=title, value=name, variable=self.layer,
+                            command=self.redraw).grid(row=0, column=i, padx=(0, 10))
+        ttk.Button(toolbar, text="➕", width=3, command=lambda: self.zoom_by(1)).grid(row=0, column=2)
+        ttk.Button(toolbar, text="➖", width=3, command=lambda: self.zoom_by(-1)).grid(row=0, column=3, padx=(0, 10))
+        ttk.Button(toolbar, text="🎯 Fit", command=self.fit).grid(row=0, column=4, padx=(0, 10))
+        self.status = ttk.Label(toolbar, text="")
+        self.status.grid(row=0, column=5, sticky=tk.W)
+
+        self.canvas = tk.Canvas(self.window, bg=BACKGROUND, highlightthickness=0)
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+        self.canvas.bind('<Configure>', lambda e: self.redraw())
+        self.canvas.bind('<ButtonPress-1>', self.on_press)
+        self.canvas.bind('<B1-Motion>', self.on_drag)
+        self.canvas.bind('<ButtonRelease-1>', self.on_release)
+        self.canvas.bind('<MouseWheel>', lambda e: self.zoom_by(1 if e.delta > 0 else -1, e.x, e.y))
+        self.canvas.bind('<Button-4>', lambda e: self.zoom_by(1, e.x, e.y))
+        self.canvas.bind('<Button-5>', lambda e: self.zoom_by(-1, e.x, e.y))
+
+    def alive(self) -> bool:
+        return self.window is not None and bool(self.window.winfo_exists())
+
+    def close(self):
+        self.window.destroy()
+        self.window = None
+        if self.on_close:
+            self.on_close()
+
+    def set_layer(self, layer: str):
+        self.layer.set(layer)
+        self.redraw()
+
+    def set_data(self, users: List[dict], sos: List[dict], markers: List[dict], zones: List[dict]):
+        """Rebin both layers and repaint only the cells whose level changed"""
+        for name, records in (('users', users), ('sos', sos)):
+            self._patch(name, self.tiles[name].set_points(*coordinates(records)))
+        self.markers = [
+            (m['coordinates']['lat'], m['coordinates']['lng'], m.get('name', 'Unknown'))
+            for m in markers[:MAX_MARKERS]
+            if isinstance((m.get('coordinates') or {}).get('lat'), (int, float))
+        ]
+        self.zones = zones
+        if not self._fitted:
+            self.fit()
+        else:
+            self.redraw()
+
+    def fit(self):
+        bounds = self.tiles[self.layer.get()].bounds() or self.tiles['users'].bounds()
+        if bounds is None:
+            self.redraw()
+            return
+        self._fitted = True
+        x0, y0, x1, y1 = bounds
+        self.center = ((x0 + x1) / 2, (y0 + y1) / 2)
+        width, height = self._size()
+        span = max(x1 - x0, y1 - y0, 1e-9)
+        self.zoom = int(max(MIN_ZOOM, min(MAX_ZOOM, math.log2(min(width, height) / (span * TILE_SIZE)))))
+        self.redraw()
+
+    def zoom_by(self, step: int, x: Optional[int] = None, y: Optional[int] = None):
+        zoom = max(MIN_ZOOM, min(MAX_ZOOM, self.zoom + step))
+        if zoom == self.zoom:
+            return
+        width, height = self._size()
+        if x is not None:
+            # Keep the point under the cursor fixed
+            scale = TILE_SIZE * (1 << self.zoom)
+            px = self.center[0] + (x - width / 2) / scale
+            py = self.center[1] + (y - height / 2) / scale
+            new_scale = TILE_SIZE * (1 << zoom)
+            self.center = (px - (x - width / 2) / new_scale, py - (y - height / 2) / new_scale)
+        self.zoom = zoom
+        self.redraw()
+
+    def on_press(self, event):
+        self._drag_from = (event.x, event.y)
+
+    def on_drag(self, event):
+        if self._drag_from is None:
+            return
+        dx, dy = event.x - self._drag_from[0], event.y - self._drag_from[1]
+        self.canvas.move('all', dx, dy)
+        scale = TILE_SIZE * (1 << self.zoom)
+        self.center = (self.center[0] - dx / scale, self.center[1] - dy / scale)
+        self._drag_from = (event.x, event.y)
+
+    def on_release(self, event):
+        self._drag_from = None
+        self.redraw()
+
+    def redraw(self):
+        if not self.alive():
+            return
+        started = time.perf_counter()
+        layer = self.layer.get()
+        palette = self.LAYERS[layer][1]
+        width, height = self._size()
+        side = 1 << self.zoom
+        scale = TILE_SIZE * side
+        left = self.center[0] * scale - width / 2
+        top = self.center[1] * scale - height / 2
+
+        self.canvas.delete('all')
+        for ty in range(max(0, int(top // TILE_SIZE)), min(side, int((top + height) // TILE_SIZE) + 1)):
+            for tx in range(max(0, int(left // TILE_SIZE)), min(side, int((left + width) // TILE_SIZE) + 1)):
+                photo = self._tile_photo(layer, palette, tx, ty)
+                if photo is not None:
+                    self.canvas.create_image(tx * TILE_SIZE - left, ty * TILE_SIZE - top, image=photo, anchor=tk.NW)
+
+        def to_canvas(lat, lng):
+            x, y = project(np.array([lat]), np.array([lng]))
+            return float(x[0]) * scale - left, float(y[0]) * scale - top
+
+        for zone in self.zones:
+            cx, cy = to_canvas(zone['lat'], zone['lng'])
+            metres_per_pixel = EARTH_CIRCUMFERENCE_M * math.cos(math.radians(zone['lat'])) / scale
+            r = (zone.get('radius') or 1) * 1000 / metres_per_pixel
+            self.canvas.create_oval(cx - r, cy - r, cx + r, cy + r, outline="#ef4444", dash=(4, 2), width=2)
+            self.canvas.create_text(cx, cy - r - 8, text=zone.get('name', 'Danger zone'), fill="#fca5a5")
+        for lat, lng, name in self.markers:
+            cx, cy = to_canvas(lat, lng)
+            if -10 <= cx <= width + 10 and -10 <= cy <= height + 10:
+                self.canvas.create_oval(cx - 4, cy - 4, cx + 4, cy + 4, fill="#dc2626", outline="white")
+
+        lat, lng = unproject(*self.center)
+        self.status.config(text=(
+            f"{len(self.tiles[layer])} points · zoom {self.zoom} · {lat:.4f}, {lng:.4f} · "
+            f"drawn in {(time.perf_counter() - started) * 1000:.1f} ms"
+        ))
+
+    def _size(self) -> Tuple[int, int]:
+        return max(self.canvas.winfo_width(), 1), max(self.canvas.winfo_height(), 1)
+
+    def _tile_photo(self, layer: str, palette: List[str], tx: int, ty: int) -> Optional[tk.PhotoImage]:
+        key = (self.zoom, tx, ty)
+        photo = self.photos[layer].get(key)
+        if photo is not None:
+            return photo
+        grid = self.tiles[layer].tile(self.zoom, tx, ty)
+        if not grid.any():
+            return None  # empty tiles show the canvas background
+        if len(self.photos[layer]) >= MAX_CACHED_TILES:
+            self.photos[layer] = {k: v for k, v in self.photos[layer].items() if k[0] == self.zoom}
+        photo = tk.PhotoImage(width=TILE_SIZE, height=TILE_SIZE)
+        photo.put(BACKGROUND, to=(0, 0, TILE_SIZE, TILE_SIZE))
+        cell = TILE_SIZE // grid.shape[0]
+        for row, col in np.argwhere(grid):
+            photo.put(palette[grid[row, col]], to=(col * cell, row * cell, (col + 1) * cell, (row + 1) * cell))
+        self.photos[layer][key] = photo
+        return photo
+
+    def _patch(self, layer: str, dirty: Dict[int, Dict[Tuple[int, int], np.ndarray]]):
+        palette = self.LAYERS[layer][1]
+        tiles = self.tiles[layer]
+        for zoom, changed in dirty.items():
+            for (tx, ty), cells in changed.items():
+                photo = self.photos[layer].get((zoom, tx, ty))
+                if photo is None:
+                    continue  # built fresh from current counts when next shown
+                grid = tiles.tile(zoom, tx, ty)
+                size = TILE_SIZE // tiles.cells
+                for cell in cells:
+                    row, col = divmod(int(cell), tiles.cells)
+                    photo.put(palette[grid[row, col]], to=(col * size, row * size, (col + 1) * size, (row + 1) * size))
@@ -0,0 +1,56 @@
+from typing import List
+
+import pandas as pd
+
+ACTION_CATEGORIES = ["connect", "disconnect"]
+ACTION_LABELS = {"connect": "🟢 connect", "disconnect": "🔴 disconnect"}
+HISTORY_COLUMNS = ["connection_id", "user_id", "user_name", "action", "timestamp"]
+
+
+def empty_history_frame() -> pd.DataFrame:
+    return to_typed_frame([])
+
+
+def to_typed_frame(records: List[dict]) -> pd.DataFrame:
+    """Build a typed frame (categorical action, datetime64 timestamp) from records."""
+    frame = pd.DataFrame.from_records(records, columns=HISTORY_COLUMNS)
+    frame["action"] = pd.Categorical(frame["action"], categories=ACTION_CATEGORIES)
+    frame["timestamp"] = pd.to_datetime(frame["timestamp"], format="ISO8601")
+    return frame
+
+
+class HistoryFrame:
+    """Append-only typed history frame that only ever parses new rows.
+
+    Each ``append`` converts just the incoming records and concatenates them
+    onto the retained frame, trimming to ``max_rows`` so memory and render cost
+    stay bounded as history grows. The frame returned by ``append`` is never
+    mutated afterwards, so it can be shared by every session.
+    """
+
+    def __init__(self, max_rows: int = 10000):
+        self.max_rows = max_rows
+        self.frame = empty_history_frame()
+
+    def reset(self, records: List[dict]) -> pd.DataFrame:
+        self.frame = to_typed_frame(records[-self.max_rows:])
+        return self.frame
+
+    def append(self, records: List[dict]) -> pd.DataFrame:
+        if not records:
+            return self.frame
+        chunk = to_typed_frame(records)
+        if self.frame.empty:
+            frame = chunk
+        else:
+            frame = pd.concat([self.frame, chunk], ignore_index=True)
+        if len(frame) > self.max_rows:
+            frame = frame.iloc[-self.max_rows:].reset_index(drop=True)
+        self.frame = frame
+        return frame
+
+
+def history_view(frame: pd.DataFrame, limit: int) -> pd.DataFrame:
+    """Newest ``limit`` rows ready to render, coloured via category labels."""
+    view = frame.iloc[-limit:][["user_name", "action", "timestamp"]].iloc[::-1]
+    return view.assign(action=view["action"].cat.rename_categories(ACTION_LABELS))
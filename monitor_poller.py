@@ -0,0 +1,166 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional, Union
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+import wire_codec
+from monitor_frames import HistoryFrame, empty_history_frame, to_typed_frame
+
+
+@dataclass
+class MonitorSnapshot:
+    """Latest server state shared by every monitor session."""
+    version: int = 0
+    cursor: Optional[Union[int, str]] = None
+    active_connections: List[dict] = field(default_factory=list)
+    connection_history: List[dict] = field(default_factory=list)
+    active_frame: pd.DataFrame = field(default_factory=empty_history_frame)
+    history_frame: pd.DataFrame = field(default_factory=empty_history_frame)
+    fetched_at: Optional[datetime] = None
+    error: Optional[str] = None
+
+
+class UpstreamPoller:
+    """Single background poller fanning server state out to all sessions.
+
+    One instance lives per Streamlit server process. It probes the cheap
+    ``/cursor`` endpoint every ``interval`` seconds and only downloads active
+    connections and history (concurrently) when the cursor moved, so upstream
+    load is one poll loop no matter how many officers have the monitor open.
+    History is fetched incrementally (``after=<cursor>``) and appended to a
+    typed ``HistoryFrame`` so sessions never rebuild frames from raw JSON;
+    a full page may have skipped events and replaces the frame instead.
+    Polling pauses once no session has read a snapshot for ``idle_timeout``
+    seconds and resumes on the next read.
+    """
+
+    def __init__(self, server_url: str, interval: float = 2.0, history_limit: int = 50,
+                 timeout=(3.05, 10), idle_timeout: float = 60.0, max_history_rows: int = 10000):
+        self.server_url = server_url
+        self.interval = interval
+        self.history_limit = history_limit
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=4)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # Prefer the compact binary encoding when msgpack is installed
+        self.codec = wire_codec.default_codec()
+        if self.codec is not None:
+            self.session.headers["Accept"] = f"{wire_codec.MEDIA_TYPE}, application/json;q=0.9"
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="monitor-fetch")
+
+        self._history = HistoryFrame(max_rows=max_history_rows)
+        self._snapshot = MonitorSnapshot()
+        self._changed = threading.Condition()
+        self._wake = threading.Event()
+        self._last_read = time.monotonic()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_running(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="monitor-poller", daemon=True)
+                self._thread.start()
+
+    def snapshot(self) -> MonitorSnapshot:
+        """Return the latest shared snapshot (never blocks on the network)."""
+        self._last_read = time.monotonic()
+        self._ensure_running()
+        return self._snapshot
+
+    def request_refresh(self):
+        """Ask for an immediate poll instead of waiting for the next interval."""
+        self._last_read = time.monotonic()
+        self._ensure_running()
+        self._wake.set()
+
+    def wait_for_update(self, version: int, timeout: float) -> MonitorSnapshot:
+        """Block until the snapshot version moves past ``version`` or timeout."""
+        self._last_read = time.monotonic()
+        self._ensure_running()
+        with self._changed:
+            self._changed.wait_for(lambda: self._snapshot.version != version, timeout=timeout)
+        return self._snapshot
+
+    def _get_json(self, path):
+        response = self.session.get(f"{self.server_url}{path}", timeout=self.timeout)
+        response.raise_for_status()
+        if self.codec is not None and response.headers.get("content-type", "").startswith(wire_codec.MEDIA_TYPE):
+            return self.codec.decode(response.content)
+        return response.json()
+
+    def _poll_once(self):
+        current = self._snapshot
+        try:
+            cursor = self._get_json("/cursor").get("cursor")
+            if cursor is not None and cursor == current.cursor and current.error is None:
+                return
+            # Only ask for events past our cursor unless the server restarted. Sharded
+            # servers (launcher.py) return an opaque string cursor and handle restarts themselves
+            incremental = current.cursor is not None and cursor is not None and (
+                isinstance(cursor, str) or cursor >= current.cursor)
+            history_path = f"/connection-history?limit={self.history_limit}"
+            if incremental:
+                history_path += f"&after={current.cursor}"
+            active_future = self._executor.submit(self._get_json, "/active-connections")
+            history_future = self._executor.submit(self._get_json, history_path)
+            active = active_future.result().get("active_connections", [])
+            history_data = history_future.result()
+            new_history = history_data.get("connection_history", [])
+            # The history response's cursor is the one matching the rows we got
+            cursor = history_data.get("cursor", cursor)
+            # A full page means events between the cursors may have been skipped;
+            # its rows are then the latest history_limit events, so start over from them
+            if incremental and len(new_history) >= self.history_limit:
+                incremental = False
+            if incremental:
+                history = (current.connection_history + new_history)[-self.history_limit:]
+                history_frame = self._history.append(new_history)
+            else:
+                history = new_history
+                history_frame = self._history.reset(new_history)
+            snapshot = MonitorSnapshot(
+                version=current.version + 1,
+                cursor=cursor,
+                active_connections=active,
+                connection_history=history,
+                active_frame=to_typed_frame(active),
+                history_frame=history_frame,
+                fetched_at=datetime.now(),
+            )
+        except (requests.exceptions.RequestException, ValueError) as e:
+            if current.error == str(e):
+                return
+            snapshot = MonitorSnapshot(
+                version=current.version + 1,
+                cursor=current.cursor,
+                active_connections=current.active_connections,
+                connection_history=current.connection_history,
+                active_frame=current.active_frame,
+                history_frame=current.history_frame,
+                fetched_at=current.fetched_at,
+                error=str(e),
+            )
+        with self._changed:
+            self._snapshot = snapshot
+            self._changed.notify_all()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if time.monotonic() - self._last_read >= self.idle_timeout:
+                    self._thread = None
+                    return
+            self._poll_once()
+            self._wake.wait(self.interval)
+            self._wake.clear()
@@ -0,0 +1,331 @@
+import contextvars
+import functools
+import inspect
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+
+from structured_logging import event
+
+logger = logging.getLogger(__name__)
+
+
+def _label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ",")
+
+
+class SamplingProfiler:
+    """Wall-clock sampling profiler producing collapsed stacks (flamegraph.pl / speedscope input).
+
+    A daemon thread snapshots every other thread's stack with
+    ``sys._current_frames()`` each ``interval`` seconds until the duration
+    runs out or ``stop`` is called; nothing is hooked into the profiled
+    code, so the cost is the sampling thread alone and is zero when idle.
+    Stacks are keyed by function (not line) and capped at ``max_stacks``
+    distinct entries; samples beyond that are counted as dropped.
+    """
+
+    def __init__(self, max_stacks: int = 20000):
+        self.max_stacks = max_stacks
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.dropped = 0
+        self.started: Optional[float] = None
+        self.stopped: Optional[float] = None
+        self.duration = 0.0
+        self.interval = 0.0
+        self._labels: Dict[object, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration: float, interval: float) -> bool:
+        """Begin a new profile (discarding the previous one); False if one is already running"""
+        with self._lock:
+            if self.running:
+                return False
+            self.stacks = Counter()
+            self.samples = self.dropped = 0
+            self.started, self.stopped = time.time(), None
+            self.duration, self.interval = duration, interval
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self):
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def collapsed(self) -> str:
+        """One ``frame;frame;frame count`` line per distinct stack, root (thread name) first"""
+        with self._lock:
+            stacks = self.stacks.most_common()
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def status(self) -> dict:
+        return {
+            "running": self.running,
+            "started": datetime.fromtimestamp(self.started).isoformat() if self.started else None,
+            "stopped": datetime.fromtimestamp(self.stopped).isoformat() if self.stopped else None,
+            "duration_seconds": self.duration,
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "stacks": len(self.stacks),
+            "dropped_samples": self.dropped,
+        }
+
+    def _run(self):
+        deadline = time.monotonic() + self.duration
+        own = threading.get_ident()
+        try:
+            while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+                self._sample(own)
+        finally:
+            self.stopped = time.time()
+
+    def _sample(self, own: int):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        labels = self._labels
+        with self._lock:
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    label = labels.get(code)
+                    if label is None:
+                        label = labels[code] = _label(code)
+                    frames.append(label)
+                    frame = frame.f_back
+                frames.append(names.get(ident, f"thread-{ident}").replace(";", ","))
+                stack = ";".join(reversed(frames))
+                if stack in self.stacks or len(self.stacks) < self.max_stacks:
+                    self.stacks[stack] += 1
+                else:
+                    self.dropped += 1
+            self.samples += 1
+
+
+class LoopWatchdog:
+    """Event-loop lag history and slow-callback reports.
+
+    ``observe`` is called on the loop by the load shedder's lag monitor
+    (see ``LoadShedder.monitor_loop_lag``) after every wake-up. A watchdog
+    thread notices when the next wake-up is more than ``slow_threshold``
+    late and grabs the loop thread's stack at that moment - the code that
+    is blocking the loop - which is reported with the stall's duration
+    once the loop wakes up again. Stalls shorter than the watchdog's check
+    interval are still reported, without a stack.
+    """
+
+    def __init__(self, expected_interval: float, slow_threshold: float = 0.1,
+                 max_reports: int = 50, history: int = 600):
+        self.expected_interval = expected_interval
+        self.slow_threshold = slow_threshold
+        self.slow_callbacks = 0
+        self.max_lag = 0.0
+        self.lags: deque = deque(maxlen=history)
+        self.reports: deque = deque(maxlen=max_reports)
+        self._last_wakeup: Optional[float] = None
+        self._loop_thread: Optional[int] = None
+        self._stall: Optional[dict] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def observe(self, lag: float):
+        self.lags.append(lag)
+        self.max_lag = max(self.max_lag, lag)
+        with self._lock:
+            self._last_wakeup = time.monotonic()
+            self._loop_thread = threading.get_ident()
+            stall, self._stall = self._stall, None
+        if lag < self.slow_threshold:
+            return
+        self.slow_callbacks += 1
+        report = {
+            "at": datetime.now().isoformat(),
+            "lag_ms": round(lag * 1000, 1),
+            "stack": stall["stack"] if stall else None,
+        }
+        self.reports.append(report)
+        where = f" in {report['stack'][-1]}" if report["stack"] else ""
+        logger.warning(f"Event loop blocked for {report['lag_ms']} ms{where}",
+                       extra=event("slow_callback", lag_ms=report["lag_ms"], stack=report["stack"]))
+
+    def summary(self) -> dict:
+        lags = sorted(self.lags)
+
+        def percentile(q: float) -> Optional[float]:
+            return round(lags[min(len(lags) - 1, int(q * len(lags)))] * 1000, 2) if lags else None
+        return {
+            "interval_ms": self.expected_interval * 1000,
+            "slow_threshold_ms": self.slow_threshold * 1000,
+            "samples": len(lags),
+            "lag_ms": {"p50": percentile(0.5), "p99": percentile(0.99), "max_recent": percentile(1.0),
+                       "max": round(self.max_lag * 1000, 2)},
+            "slow_callbacks": self.slow_callbacks,
+            "recent_slow_callbacks": list(self.reports),
+        }
+
+    def _watch(self):
+        check = max(0.01, self.slow_threshold / 2)
+        while not self._stop.wait(check):
+            with self._lock:
+                if self._last_wakeup is None or self._stall is not None:
+                    continue
+                late = time.monotonic() - self._last_wakeup - self.expected_interval
+                if late < self.slow_threshold:
+                    continue
+                frame = sys._current_frames().get(self._loop_thread)
+                stack = []
+                while frame is not None:
+                    stack.append(f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno} {frame.f_code.co_name}")
+                    frame = frame.f_back
+                self._stall = {"stack": stack[::-1] or None}
+
+
+class _Phases:
+    __slots__ = ("start", "handler_start", "handler_end")
+
+    def __init__(self, start: float):
+        self.start = start
+        self.handler_start: Optional[float] = None
+        self.handler_end: Optional[float] = None
+
+
+_current_phases: contextvars.ContextVar = contextvars.ContextVar("current_phases")
+
+
+class EndpointTimings:
+    """Per-route time split: validation (reading and validating the request), handler, serialization.
+
+    Sums and maxima only, updated on the event loop, so recording costs a
+    few clock reads per request. Time spent in middlewares is not included.
+    """
+
+    PHASES = ("validation", "handler", "serialization")
+
+    def __init__(self):
+        self._stats: Dict[str, list] = {}
+
+    def add(self, route: str, phases: _Phases, end: float, failed: bool):
+        stats = self._stats.get(route)
+        if stats is None:
+            # count, validation, handler, serialization, total, max total, errors, rejected before the handler
+            stats = self._stats[route] = [0, 0.0, 0.0, 0.0, 0.0, 0.0, 0, 0]
+        handler_start = phases.handler_start if phases.handler_start is not None else end
+        handler_end = phases.handler_end if phases.handler_end is not None else end
+        total = end - phases.start
+        stats[0] += 1
+        stats[1] += handler_start - phases.start
+        stats[2] += handler_end - handler_start
+        stats[3] += end - handler_end
+        stats[4] += total
+        stats[5] = max(stats[5], total)
+        stats[6] += failed
+        stats[7] += phases.handler_start is None
+
+    def reset(self):
+        self._stats = {}
+
+    def summary(self) -> List[dict]:
+        rows = []
+        for route, (count, *sums, total, max_total, errors, rejected) in self._stats.items():
+            rows.append({
+                "route": route,
+                "count": count,
+                "errors": errors,
+                "rejected_before_handler": rejected,
+                "total_ms": round(total * 1000, 2),
+                "mean_ms": {phase: round(value / count * 1000, 3)
+                            for phase, value in zip(self.PHASES + ("total",), sums + [total])},
+                "share": {phase: round(value / total, 3) if total else 0.0 for phase, value in zip(self.PHASES, sums)},
+                "max_ms": round(max_total * 1000, 3),
+            })
+        return sorted(rows, key=lambda row: row["total_ms"], reverse=True)
+
+
+def _timed_endpoint(endpoint):
+    """Wrap an endpoint so the route can tell validation and serialization from the handler"""
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def timed(*args, **kwargs):
+            phases = _current_phases.get(None)
+            if phases is not None:
+                phases.handler_start = time.perf_counter()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                if phases is not None:
+                    phases.handler_end = time.perf_counter()
+        return timed
+
+    @functools.wraps(endpoint)
+    def timed(*args, **kwargs):  # runs in the threadpool, which copies the request's context
+        phases = _current_phases.get(None)
+        if phases is not None:
+            phases.handler_start = time.perf_counter()
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            if phases is not None:
+                phases.handler_end = time.perf_counter()
+    return timed
+
+
+def timed_route_class(timings: EndpointTimings):
+    """APIRoute subclass recording into ``timings``; set as ``app.router.route_class`` before declaring routes"""
+
+    class TimedRoute(APIRoute):
+        def __init__(self, path: str, endpoint, **kwargs):
+            super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+        def get_route_handler(self):
+            handler = super().get_route_handler()
+            route = f"{','.join(sorted(self.methods))} {self.path}"
+
+            async def timed_handler(request):
+                phases = _Phases(time.perf_counter())
+                token = _current_phases.set(phases)
+                failed = False
+                try:
+                    response = await handler(request)
+                    failed = response.status_code >= 500
+                    return response
+                except Exception as e:  # HTTPException carries its status; 422s are counted as rejected
+                    failed = not isinstance(e, RequestValidationError) and getattr(e, "status_code", 500) >= 500
+                    raise
+                finally:
+                    _current_phases.reset(token)
+                    timings.add(route, phases, time.perf_counter(), failed)
+            return timed_handler
+
+    return TimedRoute
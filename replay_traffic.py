@@ -0,0 +1,165 @@
+"""Replay a server.py traffic capture at 1x-100x speed and report drift.
+
+    python replay_traffic.py capture.jsonl.gz [--target http://localhost:8000] [--speed 10]
+
+Each request is sent at its captured offset divided by ``--speed``, so the
+inter-arrival distribution (and with it the concurrency) is preserved, only
+compressed in time. Captured latency is the server's own handling time while
+replay latency is the client round trip, so compare them per path rather
+than in absolute terms.
+"""
+import argparse
+import asyncio
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import aiohttp
+
+from traffic_capture import decode_body, read_capture
+
+MAX_SPEED = 100
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def peak_overlap(intervals) -> int:
+    """Largest number of (start, end) intervals open at the same instant"""
+    edges = sorted([(start, 1) for start, _ in intervals] + [(end, -1) for _, end in intervals])
+    peak = current = 0
+    for _, step in edges:
+        current += step
+        peak = max(peak, current)
+    return peak
+
+
+def path_of(target: str) -> str:
+    return target.split("?", 1)[0]
+
+
+class ReplayResult:
+    __slots__ = ("path", "captured_status", "captured_latency_ms", "status", "latency_ms", "lag_ms", "started", "finished")
+
+    def __init__(self, path, captured_status, captured_latency_ms):
+        self.path = path
+        self.captured_status = captured_status
+        self.captured_latency_ms = captured_latency_ms
+        self.status: Optional[int] = None  # None: connection error / timeout
+        self.latency_ms = 0.0
+        self.lag_ms = 0.0
+        self.started = self.finished = 0.0
+
+
+async def replay(entries, target: str, speed: float, concurrency: Optional[int], timeout: float) -> List[ReplayResult]:
+    results: List[ReplayResult] = []
+    limit = asyncio.Semaphore(concurrency) if concurrency else None
+    connector = aiohttp.TCPConnector(limit=concurrency or 0)
+    async with aiohttp.ClientSession(connector=connector,
+                                     timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+
+        async def send(entry, result, due):
+            offset_us, method, path, content_type, body, status, latency_us = entry
+            if limit is not None:
+                await limit.acquire()
+            try:
+                result.started = loop.time()
+                result.lag_ms = (result.started - due) * 1000
+                headers = {"Content-Type": content_type} if content_type else None
+                try:
+                    async with session.request(method, target + path, data=decode_body(body),
+                                               headers=headers) as response:
+                        await response.read()
+                        result.status = response.status
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    pass
+                result.finished = loop.time()
+                result.latency_ms = (result.finished - result.started) * 1000
+            finally:
+                if limit is not None:
+                    limit.release()
+
+        tasks = []
+        for entry in entries:
+            offset_us, method, path, content_type, body, status, latency_us = entry
+            if decode_body(body) is None:
+                continue  # body was too large to capture; replaying it empty would only add errors
+            due = start + offset_us / 1e6 / speed
+            delay = due - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            result = ReplayResult(path_of(path), status, latency_us / 1000)
+            results.append(result)
+            tasks.append(asyncio.ensure_future(send(entry, result, due)))
+        if tasks:
+            await asyncio.gather(*tasks)
+    return results
+
+
+def is_error(status: Optional[int]) -> bool:
+    return status is None or status >= 500
+
+
+def report(results: List[ReplayResult], captured_intervals, speed: float, wall: float):
+    by_path: Dict[str, List[ReplayResult]] = defaultdict(list)
+    for result in results:
+        by_path[result.path].append(result)
+
+    print(f"\nReplayed {len(results)} requests at {speed:g}x in {wall:.1f}s")
+    print(f"{'path':<28} {'count':>6} {'cap p50':>8} {'cap p99':>8} {'rep p50':>8} {'rep p95':>8} "
+          f"{'rep p99':>8} {'cap err':>8} {'rep err':>8} {'status≠':>8}")
+    for path, rows in sorted(by_path.items(), key=lambda item: -len(item[1])):
+        captured = [r.captured_latency_ms for r in rows]
+        replayed = [r.latency_ms for r in rows]
+        captured_errors = sum(is_error(r.captured_status) for r in rows) / len(rows)
+        replay_errors = sum(is_error(r.status) for r in rows) / len(rows)
+        mismatched = sum(r.status != r.captured_status for r in rows)
+        print(f"{path[:28]:<28} {len(rows):>6} {percentile(captured, 0.5):>8.1f} {percentile(captured, 0.99):>8.1f} "
+              f"{percentile(replayed, 0.5):>8.1f} {percentile(replayed, 0.95):>8.1f} {percentile(replayed, 0.99):>8.1f} "
+              f"{captured_errors:>8.1%} {replay_errors:>8.1%} {mismatched:>8}")
+
+    lags = [r.lag_ms for r in results]
+    print(f"\nScheduling lag: p50 {percentile(lags, 0.5):.1f} ms, p99 {percentile(lags, 0.99):.1f} ms, "
+          f"max {max(lags, default=0):.1f} ms")
+    print(f"Peak in-flight: captured {peak_overlap(captured_intervals)} (time-scaled), "
+          f"replay {peak_overlap([(r.started, r.finished) for r in results])}")
+    failed = sum(r.status is None for r in results)
+    if failed:
+        print(f"Connection errors / timeouts: {failed}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("capture")
+    parser.add_argument("--target", default="http://localhost:8000")
+    parser.add_argument("--speed", type=float, default=1.0, help=f"time compression, 1-{MAX_SPEED}")
+    parser.add_argument("--concurrency", type=int, default=None, help="cap on requests in flight (default: none)")
+    parser.add_argument("--limit", type=int, default=None, help="replay only the first N requests")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+    if not 1 <= args.speed <= MAX_SPEED:
+        parser.error(f"--speed must be between 1 and {MAX_SPEED}")
+
+    header, entries = read_capture(args.capture)
+    entries = list(entries)[:args.limit]
+    # Captured requests as they would overlap when compressed by --speed:
+    # arrivals move closer together, server handling time does not
+    captured_intervals = [(offset_us / 1e6 / args.speed, offset_us / 1e6 / args.speed + latency_us / 1e6)
+                          for offset_us, *_, latency_us in entries]
+    skipped = sum(decode_body(entry[4]) is None for entry in entries)
+    print(f"Capture started {time.ctime(header['started_at'])}: {len(entries)} requests"
+          + (f", {skipped} skipped (body not captured)" if skipped else ""))
+
+    started = time.monotonic()
+    results = asyncio.run(replay(entries, args.target.rstrip("/"), args.speed, args.concurrency, args.timeout))
+    report(results, captured_intervals, args.speed, time.monotonic() - started)
+
+
+if __name__ == "__main__":
+    main()
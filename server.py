@@ -1,21 +1,152 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, UploadFile, File, Request, Header, Depends
+from fastapi.responses import FileResponse, JSONResponse, Response
 from pydantic import BaseModel
-from typing import List, Dict
-import uuid
-from datetime import datetime
+from typing import Optional
+import asyncio
+import hmac
+import logging
+from functools import partial
+import os
+import time
 import requests
+from connection_records import CONNECT, DISCONNECT, ActiveConnections, ConnectionLog, ConnectionRecord, now_us
+from attachment_store import AttachmentTooLarge, ContentAddressedStore, is_valid_hash
+from history_store import SQLiteHistoryStore
+from timing_wheel import HierarchicalTimingWheel
+from timeseries_stats import ConnectionTimeSeries
+from flap_detector import FlapDetector
+from session_index import SessionIndex, parse_time_us
+from traffic_capture import CaptureMiddleware, TrafficRecorder
+from admission_control import AdmissionMiddleware, LoadShedder, TokenBucketLimiter
+from idempotency import MAX_KEY_LENGTH, IdempotencyCache, IdempotencyConflict
+from sharding import ShardPeers, ShardRouter, is_internal
+from profiling import EndpointTimings, LoopWatchdog, SamplingProfiler, timed_route_class
+import wire_codec
+from structured_logging import event, parse_sample_rates, setup_logging
+
+# JSON logs through a background queue, rotated by size; LOG_SAMPLE_RATES
+# ("event=N,...") keeps 1 in N records of chatty events
+setup_logging(
+    os.environ.get("LOG_PATH", "server.log"),
+    max_bytes=int(os.environ.get("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+    sample_rates=parse_sample_rates(os.environ.get("LOG_SAMPLE_RATES", "")),
+)
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="User Connection Tracking Server")
+# Every route records its validation / handler / serialization time (/admin/endpoints)
+endpoint_timings = EndpointTimings()
+app.router.route_class = timed_route_class(endpoint_timings)
+
+# In-memory storage (in production, use a database). History is a columnar
+# log of compact records; active connections point at their connect row.
+# Records become the JSON dict shape only when they leave the process.
+connection_history = ConnectionLog()
+active_connections = ActiveConnections(connection_history)
+# Connects paired with their disconnects, indexed by time (/sessions/...)
+sessions = SessionIndex(connection_history)
+
+# Rolling per-minute/per-hour aggregates for charts (/stats/timeseries);
+# unique users are HyperLogLog sketches, so memory is fixed per bucket
+connection_stats = ConnectionTimeSeries(
+    minute_buckets=int(os.environ.get("STATS_MINUTE_BUCKETS", str(24 * 60))),
+    hour_buckets=int(os.environ.get("STATS_HOUR_BUCKETS", str(7 * 24))),
+)
+
+# Optional durable history (set HISTORY_DB_PATH to enable the SQLite backend)
+HISTORY_DB_PATH = os.environ.get("HISTORY_DB_PATH")
+HISTORY_BATCH_MS = int(os.environ.get("HISTORY_BATCH_MS", "200"))
+HISTORY_BATCH_ROWS = int(os.environ.get("HISTORY_BATCH_ROWS", "500"))
+history_store: Optional[SQLiteHistoryStore] = None
+
+# Idle session expiry (opt-in): with SESSION_TTL_SECONDS > 0, sessions without a
+# /heartbeat for that long are disconnected by the reaper, which ticks every
+# SESSION_TICK_SECONDS. Off by default, as clients that never heartbeat would be dropped.
+SESSION_TTL_SECONDS = float(os.environ.get("SESSION_TTL_SECONDS", "0"))
+SESSION_TICK_SECONDS = float(os.environ.get("SESSION_TICK_SECONDS", "1"))
+session_wheel = HierarchicalTimingWheel(tick=SESSION_TICK_SECONDS, now=time.monotonic())
+session_reaper: Optional[asyncio.Task] = None
+
+# Flapping users (more than FLAP_THRESHOLD connects/disconnects per FLAP_WINDOW_SECONDS)
+# get one coalesced police notification once they settle instead of one per event
+FLAP_WINDOW_SECONDS = float(os.environ.get("FLAP_WINDOW_SECONDS", "60"))
+FLAP_THRESHOLD = int(os.environ.get("FLAP_THRESHOLD", "6"))
+FLAP_CLEAR_THRESHOLD = int(os.environ.get("FLAP_CLEAR_THRESHOLD", "2"))
+flap_detector = FlapDetector(FLAP_WINDOW_SECONDS, FLAP_THRESHOLD, FLAP_CLEAR_THRESHOLD, now=time.monotonic())
+
+# Retried /connect and /disconnect calls carrying the same Idempotency-Key
+# header get the original response back, with no new record or notification
+IDEMPOTENCY_TTL_SECONDS = float(os.environ.get("IDEMPOTENCY_TTL_SECONDS", "600"))
+IDEMPOTENCY_MAX_KEYS = int(os.environ.get("IDEMPOTENCY_MAX_KEYS", "100000"))
+idempotency_cache = IdempotencyCache(IDEMPOTENCY_TTL_SECONDS, IDEMPOTENCY_MAX_KEYS)
+
+# Content-addressed attachments (SOS images, E-FIR files); records carry only the hash
+ATTACHMENT_DIR = os.environ.get("ATTACHMENT_DIR", "attachments")
+MAX_ATTACHMENT_BYTES = int(os.environ.get("MAX_ATTACHMENT_BYTES", str(10 * 1024 * 1024)))
+attachment_store = ContentAddressedStore(ATTACHMENT_DIR, max_bytes=MAX_ATTACHMENT_BYTES)
 
-# In-memory storage (in production, use a database)
-active_connections: Dict[str, dict] = {}
-connection_history: List[dict] = []
+# Admission control: token buckets per source IP and per user_id (rate 0
+# disables), and 503 + Retry-After for everything but heartbeats and admin
+# diagnostics while the notification backlog or event-loop lag is over its limit. Set
+# RATE_LIMIT_TRUST_PROXY=1 behind a reverse proxy to key on X-Forwarded-For.
+RATE_LIMIT_IP_RATE = float(os.environ.get("RATE_LIMIT_IP_RATE", "20"))
+RATE_LIMIT_IP_BURST = float(os.environ.get("RATE_LIMIT_IP_BURST", "100"))
+RATE_LIMIT_USER_RATE = float(os.environ.get("RATE_LIMIT_USER_RATE", "1"))
+RATE_LIMIT_USER_BURST = float(os.environ.get("RATE_LIMIT_USER_BURST", "10"))
+RATE_LIMIT_MAX_KEYS = int(os.environ.get("RATE_LIMIT_MAX_KEYS", "100000"))
+SHED_MAX_PENDING_NOTIFICATIONS = int(os.environ.get("SHED_MAX_PENDING_NOTIFICATIONS", "1000"))
+SHED_MAX_LOOP_LAG_MS = float(os.environ.get("SHED_MAX_LOOP_LAG_MS", "250"))
+RATE_LIMIT_TRUST_PROXY = os.environ.get("RATE_LIMIT_TRUST_PROXY") == "1"
+load_shedder = LoadShedder(SHED_MAX_PENDING_NOTIFICATIONS, SHED_MAX_LOOP_LAG_MS / 1000)
+ip_limiter = (TokenBucketLimiter(RATE_LIMIT_IP_RATE, RATE_LIMIT_IP_BURST, RATE_LIMIT_MAX_KEYS)
+              if RATE_LIMIT_IP_RATE > 0 else None)
+user_limiter = (TokenBucketLimiter(RATE_LIMIT_USER_RATE, RATE_LIMIT_USER_BURST, RATE_LIMIT_MAX_KEYS)
+                if RATE_LIMIT_USER_RATE > 0 else None)
+app.add_middleware(
+    AdmissionMiddleware, shedder=load_shedder, ip_limiter=ip_limiter, user_limiter=user_limiter,
+    exempt_from_shedding={"/heartbeat", "/admin/"}, trust_forwarded=RATE_LIMIT_TRUST_PROXY,
+)
+loop_lag_monitor: Optional[asyncio.Task] = None
+
+# Admin diagnostics: on-demand sampling profiler (collapsed stacks), event-loop
+# lag with the stack of any callback blocking the loop for SLOW_CALLBACK_MS,
+# and the per-endpoint time split. The /admin endpoints return 404 unless
+# ADMIN_TOKEN is set and need it in an X-Admin-Token header. Under
+# launcher.py each worker reports on itself (see "pid"); reach a specific one
+# through its Unix socket (curl --unix-socket <SHARD_SOCKET_DIR>/worker-N.sock).
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+PROFILE_MAX_SECONDS = float(os.environ.get("PROFILE_MAX_SECONDS", "300"))
+SLOW_CALLBACK_MS = float(os.environ.get("SLOW_CALLBACK_MS", "100"))
+profiler = SamplingProfiler()
+loop_watchdog = LoopWatchdog(load_shedder.lag_interval, SLOW_CALLBACK_MS / 1000)
+
+# User-sharded workers (started by launcher.py): each worker owns the users
+# that hash to SHARD_INDEX, forwards other users' requests to their owner and
+# merges cross-user reads from all workers over SHARD_SOCKET_DIR; their
+# requests to each other are authenticated with SHARD_SECRET
+SHARD_COUNT = int(os.environ.get("SHARD_COUNT", "1"))
+shard_peers: Optional[ShardPeers] = None
+if SHARD_COUNT > 1:
+    shard_peers = ShardPeers(os.environ["SHARD_SOCKET_DIR"], SHARD_COUNT, int(os.environ["SHARD_INDEX"]),
+                             os.environ["SHARD_SECRET"])
+    app.add_middleware(ShardRouter, peers=shard_peers, trust_forwarded=RATE_LIMIT_TRUST_PROXY)
+
+# Optional traffic capture for replay_traffic.py (set TRAFFIC_CAPTURE_PATH, e.g. capture.jsonl.gz)
+TRAFFIC_CAPTURE_PATH = os.environ.get("TRAFFIC_CAPTURE_PATH")
+traffic_recorder: Optional[TrafficRecorder] = None
+if TRAFFIC_CAPTURE_PATH:
+    traffic_recorder = TrafficRecorder(TRAFFIC_CAPTURE_PATH)
+    app.add_middleware(CaptureMiddleware, recorder=traffic_recorder,
+                       internal=partial(is_internal, secret=shard_peers.secret) if shard_peers else None)
 
 class UserConnection(BaseModel):
     user_id: str
     user_name: str
     action: str  # "connect" or "disconnect"
 
+class Heartbeat(BaseModel):
+    user_id: str
+
 # Webhook URL for police notifications (would be set in your environment)
 POLICE_WEBHOOK_URL = "https://dadusecurity-2.onrender.com/notify"
 
@@ -23,8 +154,14 @@ def notify_police(user_data: dict):
     """Send notification to police monitor about user connection"""
     try:
         # In a real implementation, this would send to your webhook URL
-        # For now, we'll just print and store the notification
-        print(f"POLICE NOTIFICATION: {user_data['user_name']} {user_data['action']}ed")
+        # For now, we'll just log the notification
+        flaps = user_data.get('flap_events')
+        logger.info(
+            f"POLICE NOTIFICATION: {user_data['user_name']} {user_data['action']}ed"
+            + (f" (settled after {flaps} connection changes)" if flaps else ""),
+            extra=event("police_notification", user_id=user_data['user_id'], action=user_data['action'],
+                        connection_id=user_data.get('connection_id'), flap_events=flaps),
+        )
         
         # This is where you would send the actual HTTP request:
         # response = requests.post(
@@ -33,80 +170,400 @@ def notify_police(user_data: dict):
         #     headers={"Content-Type": "application/json"}
         # )
     except Exception as e:
-        print(f"Failed to notify police: {e}")
+        logger.error(f"Failed to notify police: {e}", extra=event("police_notification_failed"))
+
+@app.on_event("startup")
+def open_history_store():
+    global history_store
+    if HISTORY_DB_PATH:
+        history_store = SQLiteHistoryStore(
+            HISTORY_DB_PATH,
+            batch_interval_ms=HISTORY_BATCH_MS,
+            batch_size=HISTORY_BATCH_ROWS,
+        )
+        history_store.start()
+
+@app.on_event("shutdown")
+def close_history_store():
+    global history_store
+    if history_store is not None:
+        history_store.close()
+        history_store = None
+
+def record_event(connection_record: ConnectionRecord) -> int:
+    """Append a connection record to history (and the durable store if enabled); returns its row"""
+    row = connection_history.append(connection_record)
+    sessions.add(connection_record, row)
+    connection_stats.add(connection_record.timestamp_us / 1e6, connection_record.user_id,
+                         connection_record.action == CONNECT)
+    if history_store is not None:
+        history_store.enqueue(connection_record.to_dict())
+    return row
+
+def send_notification(user_data: dict):
+    """notify_police, counted in the load shedder's backlog until it finishes"""
+    try:
+        notify_police(user_data)
+    finally:
+        load_shedder.notification_done()
+
+def queue_notification(schedule, user_data: dict):
+    """Hand a notification to ``schedule`` (add_task or run_in_executor) and count it as pending"""
+    load_shedder.notification_queued()
+    schedule(send_notification, user_data)
+
+def should_notify(connection_record: ConnectionRecord) -> bool:
+    """False while the user is flapping; the reaper sends one coalesced notification when they settle"""
+    return flap_detector.record(connection_record, time.monotonic())
+
+def touch_session(user_id: str):
+    if SESSION_TTL_SECONDS <= 0:
+        return
+    session_wheel.schedule(user_id, time.monotonic() + SESSION_TTL_SECONDS)
+
+async def expire_idle_sessions():
+    """Disconnect sessions whose TTL lapsed (emitting synthetic disconnect records) and flush settled flap notifications"""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(SESSION_TICK_SECONDS)
+        for user_id in session_wheel.advance(time.monotonic()):
+            connection = active_connections.pop(user_id, None)
+            if connection is None:
+                continue
+            connection_record = ConnectionRecord.new(user_id, connection.user_name, DISCONNECT,
+                                                     connection_id=connection.connection_id)
+            record_event(connection_record)
+            if should_notify(connection_record):
+                queue_notification(partial(loop.run_in_executor, None), connection_record.to_dict())
+        for summary in flap_detector.advance(time.monotonic()):
+            queue_notification(partial(loop.run_in_executor, None), summary)
+
+@app.on_event("startup")
+def start_traffic_capture():
+    if traffic_recorder is not None:
+        traffic_recorder.start()
+
+@app.on_event("shutdown")
+def stop_traffic_capture():
+    if traffic_recorder is not None:
+        traffic_recorder.close()
+
+@app.on_event("startup")
+async def start_loop_lag_monitor():
+    global loop_lag_monitor
+    loop_watchdog.start()
+    loop_lag_monitor = asyncio.create_task(load_shedder.monitor_loop_lag(on_lag=loop_watchdog.observe))
+
+@app.on_event("shutdown")
+async def stop_loop_lag_monitor():
+    global loop_lag_monitor
+    if loop_lag_monitor is not None:
+        loop_lag_monitor.cancel()
+        loop_lag_monitor = None
+    loop_watchdog.stop()
+    profiler.stop()
+
+@app.on_event("shutdown")
+async def close_shard_peers():
+    if shard_peers is not None:
+        await shard_peers.close()
+
+@app.on_event("startup")
+async def start_session_reaper():
+    global session_reaper
+    session_reaper = asyncio.create_task(expire_idle_sessions())
+
+@app.on_event("shutdown")
+async def stop_session_reaper():
+    global session_reaper
+    if session_reaper is not None:
+        session_reaper.cancel()
+        session_reaper = None
+
+def require_history_store() -> SQLiteHistoryStore:
+    if history_store is None:
+        raise HTTPException(status_code=503, detail="Persistent history is not enabled")
+    return history_store
+
+def idempotent_replay(endpoint: str, key: Optional[str], user_data: UserConnection, response: Response) -> Optional[dict]:
+    """The original response if ``key`` was already used for this request"""
+    if key is None:
+        return None
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+    try:
+        result = idempotency_cache.get(endpoint, key, (user_data.user_id, user_data.user_name, user_data.action))
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if result is not None:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
+
+def remember_result(endpoint: str, key: Optional[str], user_data: UserConnection, result: dict) -> dict:
+    if key is not None:
+        idempotency_cache.put(endpoint, key, (user_data.user_id, user_data.user_name, user_data.action), result)
+    return result
 
 @app.post("/connect")
-async def user_connect(user_data: UserConnection, background_tasks: BackgroundTasks):
+async def user_connect(user_data: UserConnection, background_tasks: BackgroundTasks, response: Response,
+                       idempotency_key: Optional[str] = Header(None)):
     """Endpoint for users to connect"""
+    replayed = idempotent_replay("connect", idempotency_key, user_data, response)
+    if replayed is not None:
+        return replayed
     try:
-        connection_id = str(uuid.uuid4())
-        timestamp = datetime.now().isoformat()
-        
-        connection_record = {
-            "connection_id": connection_id,
-            "user_id": user_data.user_id,
-            "user_name": user_data.user_name,
-            "action": "connect",
-            "timestamp": timestamp
-        }
+        connection_record = ConnectionRecord.new(user_data.user_id, user_data.user_name, CONNECT)
         
         # Store the connection
-        active_connections[user_data.user_id] = connection_record
-        connection_history.append(connection_record)
+        active_connections[connection_record.user_id] = record_event(connection_record)
+        touch_session(user_data.user_id)
         
         # Notify police in the background
-        background_tasks.add_task(notify_police, connection_record)
+        if should_notify(connection_record):
+            queue_notification(background_tasks.add_task, connection_record.to_dict())
         
-        return {"status": "success", "message": f"User {user_data.user_name} connected", "connection_id": connection_id}
+        return remember_result("connect", idempotency_key, user_data, {
+            "status": "success", "message": f"User {user_data.user_name} connected",
+            "connection_id": connection_record.connection_uuid,
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/disconnect")
-async def user_disconnect(user_data: UserConnection, background_tasks: BackgroundTasks):
+async def user_disconnect(user_data: UserConnection, background_tasks: BackgroundTasks, response: Response,
+                          idempotency_key: Optional[str] = Header(None)):
     """Endpoint for users to disconnect"""
+    replayed = idempotent_replay("disconnect", idempotency_key, user_data, response)
+    if replayed is not None:
+        return replayed
     try:
         if user_data.user_id not in active_connections:
             raise HTTPException(status_code=404, detail="User not found in active connections")
         
-        timestamp = datetime.now().isoformat()
-        
-        connection_record = {
-            "connection_id": active_connections[user_data.user_id]["connection_id"],
-            "user_id": user_data.user_id,
-            "user_name": user_data.user_name,
-            "action": "disconnect",
-            "timestamp": timestamp
-        }
+        connection_record = ConnectionRecord.new(
+            user_data.user_id, user_data.user_name, DISCONNECT,
+            connection_id=active_connections[user_data.user_id].connection_id,
+        )
         
         # Remove from active connections and add to history
         del active_connections[user_data.user_id]
-        connection_history.append(connection_record)
+        session_wheel.cancel(user_data.user_id)
+        record_event(connection_record)
         
         # Notify police in the background
-        background_tasks.add_task(notify_police, connection_record)
+        if should_notify(connection_record):
+            queue_notification(background_tasks.add_task, connection_record.to_dict())
         
-        return {"status": "success", "message": f"User {user_data.user_name} disconnected"}
+        return remember_result("disconnect", idempotency_key, user_data,
+                               {"status": "success", "message": f"User {user_data.user_name} disconnected"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/heartbeat")
+async def user_heartbeat(heartbeat: Heartbeat):
+    """Keep an active session alive for another SESSION_TTL_SECONDS (when expiry is enabled)"""
+    if heartbeat.user_id not in active_connections:
+        raise HTTPException(status_code=404, detail="User not found in active connections")
+    touch_session(heartbeat.user_id)
+    return {"status": "alive", "expires_in": SESSION_TTL_SECONDS if SESSION_TTL_SECONDS > 0 else None}
+
+def negotiated(request: Request, payload: dict):
+    """Send MessagePack to clients that accept it (see wire_codec), JSON otherwise"""
+    codec = wire_codec.default_codec()
+    headers = {"Vary": "Accept"}  # caches must not serve one format to clients asking for the other
+    if codec is not None and wire_codec.MEDIA_TYPE in request.headers.get("accept", ""):
+        return Response(codec.encode(payload), media_type=wire_codec.MEDIA_TYPE, headers=headers)
+    return JSONResponse(payload, headers=headers)
+
+@app.get("/cursor")
+async def get_cursor():
+    """Get the current state cursor (number of events recorded so far)"""
+    return {"cursor": len(connection_history)}
+
 @app.get("/active-connections")
-async def get_active_connections():
+async def get_active_connections(request: Request):
     """Get all currently active connections"""
-    return {"active_connections": list(active_connections.values())}
+    return negotiated(request, {
+        "active_connections": [record.to_dict() for record in active_connections.values()],
+        "cursor": len(connection_history),
+    })
 
 @app.get("/connection-history")
-async def get_connection_history(limit: int = 100):
-    """Get connection history"""
-    return {"connection_history": connection_history[-limit:]}
+async def get_connection_history(request: Request, limit: int = 100, after: Optional[int] = None):
+    """Get connection history (only events past cursor ``after`` when given)"""
+    # Same slicing as before, applied to positions so only returned rows are built
+    positions = range(len(connection_history))
+    positions = (positions[after:] if after is not None else positions)[-limit:]
+    records = connection_history[positions.start:positions.stop] if positions else []
+    return negotiated(request, {
+        "connection_history": [record.to_dict() for record in records],
+        "cursor": len(connection_history),
+    })
+
+@app.get("/flapping")
+async def get_flapping_users():
+    """Users currently flapping, with how many notifications were held back for each"""
+    return {
+        "flapping_users": flap_detector.flapping(time.monotonic()),
+        "suppressed_notifications": flap_detector.suppressed_total,
+        "window_seconds": FLAP_WINDOW_SECONDS,
+        "threshold": FLAP_THRESHOLD,
+    }
+
+@app.get("/stats/timeseries")
+def get_timeseries(request: Request, resolution: str = "minute", buckets: int = 60):
+    """Connects, disconnects and unique users per minute or hour for the last ``buckets`` buckets"""
+    if resolution not in ConnectionTimeSeries.RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"resolution must be one of {', '.join(ConnectionTimeSeries.RESOLUTIONS)}")
+    return negotiated(request, {
+        **connection_stats.series(resolution, buckets, time.time()),
+        "active_connections": len(active_connections),
+    })
+
+def time_param(name: str, value: Optional[str], default: int) -> int:
+    if value is None:
+        return default
+    try:
+        return parse_time_us(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be epoch seconds or an ISO timestamp")
+
+@app.get("/sessions/online")
+async def get_online_sessions(request: Request, at: Optional[str] = None, limit: int = 1000):
+    """Sessions in progress at ``at`` (default: now)"""
+    now = now_us()
+    found = sessions.online_at(time_param("at", at, now), limit)
+    return negotiated(request, {"sessions": [sessions.session(i, now) for i in found]})
+
+@app.get("/sessions/overlap")
+async def get_overlapping_sessions(request: Request, since: str, until: Optional[str] = None, limit: int = 1000):
+    """Sessions that were open at any point in [since, until)"""
+    now = now_us()
+    start, end = time_param("since", since, now), time_param("until", until, now)
+    if end < start:
+        raise HTTPException(status_code=400, detail="until must not be before since")
+    found = sessions.overlapping(start, max(end, start + 1), limit)
+    return negotiated(request, {"sessions": [sessions.session(i, now) for i in found]})
+
+@app.get("/sessions/user/{user_id}")
+async def get_user_sessions(request: Request, user_id: str, limit: int = 100):
+    """A user's most recent sessions and their total connected time"""
+    now = now_us()
+    user_sessions = [sessions.session(i, now) for i in sessions.for_user(user_id)]
+    return negotiated(request, {
+        "user_id": user_id,
+        "session_count": len(user_sessions),
+        "total_connected_seconds": round(sum(s["duration_seconds"] for s in user_sessions), 3),
+        "sessions": user_sessions[-limit:] if limit > 0 else [],
+    })
+
+@app.get("/history/user/{user_id}")
+def get_user_history(user_id: str, since: Optional[str] = None, until: Optional[str] = None, limit: int = 100):
+    """Get persisted connection history for a single user"""
+    store = require_history_store()
+    return {"connection_history": store.query(user_id=user_id, since=since, until=until, limit=limit)}
+
+@app.get("/history/search")
+def search_history(action: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None, limit: int = 100):
+    """Query persisted connection history by action and time range"""
+    store = require_history_store()
+    return {"connection_history": store.query(action=action, since=since, until=until, limit=limit)}
+
+@app.post("/attachments")
+def upload_attachment(file: UploadFile = File(...)):
+    """Store an attachment and return its content hash"""
+    try:
+        digest, size, created = attachment_store.put(file.file)
+    except AttachmentTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    return {"hash": digest, "size": size, "created": created, "url": f"/attachments/{digest}"}
+
+@app.get("/attachments/{digest}")
+def download_attachment(digest: str):
+    """Serve an attachment by hash (immutable, so clients may cache it forever)"""
+    if not is_valid_hash(digest):
+        raise HTTPException(status_code=400, detail="Invalid attachment hash")
+    if not attachment_store.exists(digest):
+        raise HTTPException(status_code=404, detail="Attachment not found")
+    return FileResponse(
+        attachment_store.path(digest),
+        media_type=attachment_store.content_type(digest),
+        headers={"ETag": f'"{digest}"', "Cache-Control": "public, max-age=31536000, immutable"},
+    )
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+def profile_response() -> Response:
+    """The current or last profile as a collapsed-stack file (flamegraph.pl, speedscope)"""
+    if profiler.started is None:
+        raise HTTPException(status_code=404, detail="No profile has been recorded")
+    started = time.strftime("%Y%m%d-%H%M%S", time.localtime(profiler.started))
+    return Response(profiler.collapsed(), media_type="text/plain", headers={
+        "Content-Disposition": f'attachment; filename="profile-{os.getpid()}-{started}.folded"',
+        "X-Profile-Samples": str(profiler.samples),
+        "X-Profile-Running": "true" if profiler.running else "false",
+    })
+
+@app.post("/admin/profile/start", dependencies=[Depends(require_admin)])
+def start_profile(seconds: float = 30, interval_ms: float = 10):
+    """Sample every thread's stack each ``interval_ms`` for ``seconds``; download it from /admin/profile"""
+    if not 0 < seconds <= PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be in (0, {PROFILE_MAX_SECONDS:g}]")
+    if not 1 <= interval_ms <= 1000:
+        raise HTTPException(status_code=400, detail="interval_ms must be between 1 and 1000")
+    if not profiler.start(seconds, interval_ms / 1000):
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    return {**profiler.status(), "pid": os.getpid()}
+
+@app.post("/admin/profile/stop", dependencies=[Depends(require_admin)])
+def stop_profile():
+    """Stop the running profile early and return it"""
+    profiler.stop()
+    return profile_response()
+
+@app.get("/admin/profile", dependencies=[Depends(require_admin)])
+def get_profile():
+    """Collapsed stacks recorded so far by the current or last profile"""
+    return profile_response()
+
+@app.get("/admin/profile/status", dependencies=[Depends(require_admin)])
+def get_profile_status():
+    return {**profiler.status(), "pid": os.getpid()}
+
+@app.get("/admin/loop", dependencies=[Depends(require_admin)])
+async def get_loop_stats():
+    """Event-loop lag percentiles and recent slow callbacks with the stack that blocked the loop"""
+    return {
+        **loop_watchdog.summary(),
+        "current_lag_ms": round(load_shedder.loop_lag * 1000, 2),
+        "pending_notifications": load_shedder.pending_notifications,
+        "pid": os.getpid(),
+    }
+
+@app.get("/admin/endpoints", dependencies=[Depends(require_admin)])
+async def get_endpoint_timings(reset: bool = False):
+    """Per-route request time split into validation, handler and serialization"""
+    endpoints = endpoint_timings.summary()
+    if reset:
+        endpoint_timings.reset()
+    return {"endpoints": endpoints, "pid": os.getpid()}
 
 @app.post("/notify")
 async def police_notification(user_data: UserConnection):
     """Endpoint for police to receive notifications (webhook)"""
     # In a real implementation, this would process notifications from your server
     # For this demo, we'll just acknowledge receipt
-    print(f"Received police notification: {user_data.user_name} {user_data.action}")
+    logger.info(
+        f"Received police notification: {user_data.user_name} {user_data.action}",
+        extra=event("notification_received", user_id=user_data.user_id, action=user_data.action),
+    )
     return {"status": "notification received"}
 
 if __name__ == "__main__":
+    # Single worker; use launcher.py to run one worker per core
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
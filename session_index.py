@@ -0,0 +1,156 @@
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+from connection_records import CONNECT, ConnectionLog, ConnectionRecord, now_us
+
+OPEN = (1 << 63) - 1  # end of a session still in progress
+
+
+def parse_time_us(value: str) -> int:
+    """Epoch seconds or an ISO timestamp (naive = local time, as in the history) -> epoch microseconds"""
+    try:
+        seconds = float(value)
+    except ValueError:
+        pass
+    else:
+        if not math.isfinite(seconds):
+            raise ValueError(f"Not a finite timestamp: {value}")
+        return int(seconds * 1_000_000)
+    parsed = datetime.fromisoformat(value)
+    return int(parsed.timestamp() * 1_000_000)
+
+
+class SessionIndex:
+    """Sessions (connect paired with its disconnect) built incrementally from the connection log.
+
+    A session is two rows of the ``ConnectionLog`` - its connect and the
+    event that ended it - so the table adds a few integers per session.
+    A connect for a user who is still connected ends their previous
+    session ("replaced"). Sessions are kept in start order with a max-end
+    segment tree over them, so "online at t" and "overlapping [a, b)" are a
+    binary search for the last session starting before the window plus a
+    descent into subtrees whose latest end falls inside it:
+    O(log n + results). Closing a session is one O(log n) tree update.
+    """
+
+    def __init__(self, log: ConnectionLog):
+        self.log = log
+        self._starts = array("q")  # non-decreasing start keys (clamped if the clock steps back)
+        self._ends = array("q")
+        self._start_rows = array("q")
+        self._end_rows = array("q")  # -1 while open
+        self._open: Dict[bytes, int] = {}  # connection_id -> session
+        self._open_by_user: Dict[str, int] = {}
+        self._by_user: Dict[str, array] = {}
+        self._capacity = 1
+        self._tree = array("q", [-1, -1])
+
+    def __len__(self):
+        return len(self._starts)
+
+    def add(self, record: ConnectionRecord, row: int):
+        """Fold one logged event (``row`` in the log) into the session table"""
+        if record.action == CONNECT:
+            previous = self._open_by_user.get(record.user_id)
+            if previous is not None:
+                self._close(previous, record.timestamp_us, row)
+            self._open_session(record, row)
+            return
+        session = self._open.get(record.connection_id)
+        if session is not None:
+            self._close(session, record.timestamp_us, row)
+
+    def online_at(self, at_us: int, limit: int = 1000) -> List[int]:
+        """Sessions in progress at ``at_us``"""
+        return list(self._overlapping(bisect_right(self._starts, at_us), at_us, limit))
+
+    def overlapping(self, start_us: int, end_us: int, limit: int = 1000) -> List[int]:
+        """Sessions overlapping [start_us, end_us)"""
+        return list(self._overlapping(bisect_left(self._starts, end_us), start_us, limit))
+
+    def for_user(self, user_id: str) -> List[int]:
+        return list(self._by_user.get(user_id, ()))
+
+    def session(self, index: int, now: Optional[int] = None) -> dict:
+        start = self.log[self._start_rows[index]]
+        end_row = self._end_rows[index]
+        end = self.log[end_row] if end_row >= 0 else None
+        end_us = end.timestamp_us if end is not None else (now or now_us())
+        return {
+            "connection_id": start.connection_uuid,
+            "user_id": start.user_id,
+            "user_name": start.user_name,
+            "start": start.timestamp,
+            "end": end.timestamp if end is not None else None,
+            "duration_seconds": round(max(0, end_us - start.timestamp_us) / 1e6, 3),
+            "open": end is None,
+            "ended_by": None if end is None else ("replaced" if end.action == CONNECT else "disconnect"),
+        }
+
+    def _open_session(self, record: ConnectionRecord, row: int):
+        index = len(self._starts)
+        start = record.timestamp_us
+        if self._starts and start < self._starts[-1]:
+            start = self._starts[-1]
+        self._starts.append(start)
+        self._ends.append(OPEN)
+        self._start_rows.append(row)
+        self._end_rows.append(-1)
+        self._open[record.connection_id] = index
+        self._open_by_user[record.user_id] = index
+        self._by_user.setdefault(record.user_id, array("I")).append(index)
+        if index >= self._capacity:
+            self._grow()
+        else:
+            self._set_end(index, OPEN)
+
+    def _close(self, index: int, end_us: int, row: int):
+        start = self.log[self._start_rows[index]]
+        self._open.pop(start.connection_id, None)
+        if self._open_by_user.get(start.user_id) == index:
+            del self._open_by_user[start.user_id]
+        self._end_rows[index] = row
+        self._ends[index] = max(end_us, self._starts[index])
+        self._set_end(index, self._ends[index])
+
+    def _grow(self):
+        while self._capacity <= len(self._ends):
+            self._capacity *= 2
+        tree = array("q", [-1]) * (2 * self._capacity)
+        tree[self._capacity:self._capacity + len(self._ends)] = self._ends
+        for node in range(self._capacity - 1, 0, -1):
+            tree[node] = max(tree[2 * node], tree[2 * node + 1])
+        self._tree = tree
+
+    def _set_end(self, index: int, end: int):
+        tree = self._tree
+        node = index + self._capacity
+        tree[node] = end
+        node //= 2
+        while node:
+            tree[node] = max(tree[2 * node], tree[2 * node + 1])
+            node //= 2
+
+    def _overlapping(self, count: int, after_us: int, limit: int) -> Iterator[int]:
+        """Sessions among the first ``count`` (by start) that end after ``after_us``, in start order"""
+        if count <= 0 or limit <= 0:
+            return
+        tree, capacity = self._tree, self._capacity
+        stack = [(1, 0, capacity)]
+        found = 0
+        while stack:
+            node, lo, hi = stack.pop()
+            if lo >= count or tree[node] <= after_us:
+                continue
+            if node >= capacity:
+                yield lo
+                found += 1
+                if found >= limit:
+                    return
+                continue
+            mid = (lo + hi) // 2
+            stack.append((2 * node + 1, mid, hi))
+            stack.append((2 * node, lo, mid))
@@ -0,0 +1,328 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+from bisect import bisect
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlencode
+
+import aiohttp
+
+import wire_codec
+from admission_control import body_user_id, client_ip, is_json, read_body_prefix, replay_body
+
+logger = logging.getLogger(__name__)
+
+# Requests for one user go to the shard that owns the user's state
+USER_BODY_ROUTES = {"/connect", "/disconnect", "/heartbeat"}
+USER_PATH_PREFIXES = ("/sessions/user/",)
+
+# Shard-to-shard requests carry the deployment's secret and the address the
+# receiving worker's rate limiter would have used; responses name the process
+SECRET_HEADER = "x-shard-secret"
+CLIENT_HEADER = "x-shard-client"
+INSTANCE_HEADER = "x-shard-instance"
+
+_HOP_HEADERS = {b"host", b"content-length", b"connection", b"transfer-encoding", b"keep-alive"}
+_PRIVATE_HEADERS = {SECRET_HEADER.encode(), CLIENT_HEADER.encode(), INSTANCE_HEADER.encode()}
+_DROPPED_RESPONSE_HEADERS = {"content-length", "connection", "transfer-encoding", "keep-alive", "date", "server",
+                             INSTANCE_HEADER}
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def socket_path(socket_dir: str, index: int) -> str:
+    return os.path.join(socket_dir, f"worker-{index}.sock")
+
+
+def is_internal(scope, secret: str) -> bool:
+    """Requests from another shard carry the deployment's secret (SHARD_SECRET, set by launcher.py)"""
+    value = _header(scope, SECRET_HEADER.encode())
+    return value is not None and hmac.compare_digest(value.encode("latin-1"), secret.encode("latin-1"))
+
+
+def format_cursor(cursors: List[Tuple[int, str]]) -> str:
+    """Opaque merged cursor: per-shard ``cursor-instance`` pairs joined with dots"""
+    return ".".join(f"{cursor}-{instance}" for cursor, instance in cursors)
+
+
+def parse_cursor(value: str, count: int) -> Optional[List[Tuple[int, str]]]:
+    parts = [part.partition("-") for part in value.split(".")]
+    if len(parts) != count or not all(cursor.isdigit() and instance for cursor, _, instance in parts):
+        return None
+    return [(int(cursor), instance) for cursor, _, instance in parts]
+
+
+class ShardRing:
+    """Consistent hash ring: user id -> shard, with ``vnodes`` points per shard"""
+
+    def __init__(self, shards: int, vnodes: int = 64):
+        points = sorted((_hash64(f"shard-{shard}#{v}"), shard) for shard in range(shards) for v in range(vnodes))
+        self._hashes = [h for h, _ in points]
+        self._owners = [shard for _, shard in points]
+
+    def owner(self, key: str) -> int:
+        return self._owners[bisect(self._hashes, _hash64(key)) % len(self._owners)]
+
+
+class ShardPeers:
+    """HTTP over the workers' Unix sockets, one pooled client session per shard"""
+
+    def __init__(self, socket_dir: str, count: int, index: int, secret: str, timeout: float = 10.0):
+        self.socket_dir = socket_dir
+        self.count = count
+        self.index = index
+        self.secret = secret
+        self.timeout = timeout
+        self.ring = ShardRing(count)
+        self._sessions: Dict[int, aiohttp.ClientSession] = {}
+
+    def _session(self, shard: int) -> aiohttp.ClientSession:
+        session = self._sessions.get(shard)
+        if session is None or session.closed:
+            session = self._sessions[shard] = aiohttp.ClientSession(
+                connector=aiohttp.UnixConnector(path=socket_path(self.socket_dir, shard)),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return session
+
+    async def request(self, shard: int, method: str, target: str, headers, body: bytes = b"") -> Tuple[int, list, bytes]:
+        # A restarted peer closes idle pooled connections: retry once where that is safe
+        for attempt in (0, 1):
+            try:
+                async with self._session(shard).request(method, f"http://shard-{shard}{target}",
+                                                        headers=[*headers, (SECRET_HEADER, self.secret)],
+                                                        data=body or None) as response:
+                    return response.status, list(response.headers.items()), await response.read()
+            except aiohttp.ClientConnectorError:
+                if attempt:
+                    raise
+            except aiohttp.ServerDisconnectedError:
+                if attempt or method != "GET":
+                    raise
+        raise AssertionError("unreachable")
+
+    async def close(self):
+        for session in self._sessions.values():
+            await session.close()
+        self._sessions.clear()
+
+
+def _concat(results: List[dict], key: str) -> list:
+    return [item for result in results for item in result.get(key, [])]
+
+
+def _merge_history(results, params):
+    rows = sorted(_concat(results, "connection_history"), key=lambda row: row["timestamp"])
+    return {"connection_history": rows[-int(params.get("limit", 100)):]}
+
+
+def _merge_timeseries(results, params):
+    buckets: Dict[int, List[int]] = {}
+    for result in results:
+        for i, timestamp in enumerate(result["timestamps"]):
+            totals = buckets.setdefault(timestamp, [0, 0, 0])
+            totals[0] += result["connects"][i]
+            totals[1] += result["disconnects"][i]
+            totals[2] += result["unique_users"][i]
+    timestamps = sorted(buckets)[-max(len(result["timestamps"]) for result in results):]
+    return {
+        "resolution": results[0]["resolution"],
+        "bucket_seconds": results[0]["bucket_seconds"],
+        "timestamps": timestamps,
+        "connects": [buckets[t][0] for t in timestamps],
+        "disconnects": [buckets[t][1] for t in timestamps],
+        "unique_users": [buckets[t][2] for t in timestamps],
+        # Shards own disjoint users, so distinct counts add up
+        "unique_users_total": sum(result["unique_users_total"] for result in results),
+        "active_connections": sum(result["active_connections"] for result in results),
+    }
+
+
+def _merge_sessions(results, params):
+    rows = sorted(_concat(results, "sessions"), key=lambda row: row["start"])
+    return {"sessions": rows[:int(params.get("limit", 1000))]}
+
+
+# path -> merge of the per-shard JSON responses (query parameters passed along);
+# per-shard cursors are combined by the router
+GATHER_ROUTES: Dict[str, Callable[[List[dict], dict], dict]] = {
+    "/cursor": lambda results, params: {},
+    "/active-connections": lambda results, params: {"active_connections": _concat(results, "active_connections")},
+    "/connection-history": _merge_history,
+    "/flapping": lambda results, params: {
+        **results[0],
+        "flapping_users": _concat(results, "flapping_users"),
+        "suppressed_notifications": sum(result["suppressed_notifications"] for result in results),
+    },
+    "/stats/timeseries": _merge_timeseries,
+    "/sessions/online": _merge_sessions,
+    "/sessions/overlap": _merge_sessions,
+}
+
+
+class ShardRouter:
+    """ASGI middleware for one worker of a user-sharded deployment.
+
+    Every worker accepts public traffic on the shared port. Requests about
+    one user (``USER_BODY_ROUTES``, ``USER_PATH_PREFIXES``) are handled
+    locally when this worker owns the user and forwarded to the owner's
+    Unix socket otherwise. Reads that span users (``GATHER_ROUTES``) are
+    sent to every shard concurrently and merged; their cursors become a
+    string of per-shard cursors and process instances, split again when
+    passed back as ``after``. Requests from other shards (authenticated
+    by the deployment secret) are never routed again. A client's
+    X-Forwarded-For is only passed on with ``trust_forwarded``; the owner
+    rate limits on the address the receiving worker saw.
+    """
+
+    def __init__(self, app, peers: ShardPeers, trust_forwarded: bool = False):
+        self.app = app
+        self.peers = peers
+        self.trust_forwarded = trust_forwarded
+        self.instance = secrets.token_hex(4)  # changes when the worker restarts
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if is_internal(scope, self.peers.secret):
+            # Rate limits downstream should see the original client
+            client = _header(scope, CLIENT_HEADER.encode())
+            headers = [(name, value) for name, value in scope.get("headers", []) if name not in _PRIVATE_HEADERS]
+            scope = dict(scope, headers=headers, **({"client": (client, 0)} if client else {}))
+            await self.app(scope, receive, self._stamped(send))
+            return
+
+        path, method = scope["path"], scope["method"]
+        if method == "POST" and path in USER_BODY_ROUTES and is_json(scope):
+            body, more_body = await read_body_prefix(receive)
+            user_id = body_user_id(body) if not more_body else None
+            if user_id is not None and self.peers.ring.owner(user_id) != self.peers.index:
+                await self._forward(scope, send, self.peers.ring.owner(user_id), body)
+                return
+            await self.app(scope, replay_body(body, more_body, receive), send)
+            return
+        if method == "GET":
+            for prefix in USER_PATH_PREFIXES:
+                if path.startswith(prefix):
+                    owner = self.peers.ring.owner(unquote(path[len(prefix):]))
+                    if owner != self.peers.index:
+                        await self._forward(scope, send, owner, b"")
+                        return
+            if path in GATHER_ROUTES:
+                await self._gather(scope, send)
+                return
+        await self.app(scope, receive, send)
+
+    def _stamped(self, send):
+        async def stamped_send(message):
+            if message["type"] == "http.response.start":
+                message = dict(message, headers=[*message.get("headers", []),
+                                                 (INSTANCE_HEADER.encode(), self.instance.encode())])
+            await send(message)
+        return stamped_send
+
+    def _headers(self, scope, accept_json: bool = False) -> list:
+        headers = [(name.decode("latin-1"), value.decode("latin-1")) for name, value in scope.get("headers", [])
+                   if name not in _HOP_HEADERS and name not in _PRIVATE_HEADERS
+                   and not (accept_json and name == b"accept")
+                   and not (name == b"x-forwarded-for" and not self.trust_forwarded)]
+        headers.append((CLIENT_HEADER, client_ip(scope, self.trust_forwarded)))
+        if accept_json:
+            headers.append(("accept", "application/json"))
+        return headers
+
+    @staticmethod
+    def _target(scope, query: Optional[str] = None) -> str:
+        query = scope.get("query_string", b"").decode("latin-1") if query is None else query
+        return scope["path"] + (f"?{query}" if query else "")
+
+    async def _forward(self, scope, send, shard: int, body: bytes):
+        try:
+            status, headers, content = await self.peers.request(
+                shard, scope["method"], self._target(scope), self._headers(scope), body)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"Shard {shard} unavailable: {e!r}")
+            await _respond(send, 503, json.dumps({"detail": f"Shard {shard} unavailable"}).encode(),
+                           "application/json", [("retry-after", "1")])
+            return
+        content_type = next((value for name, value in headers if name.lower() == "content-type"), "application/json")
+        extra = [(name, value) for name, value in headers
+                 if name.lower() not in _DROPPED_RESPONSE_HEADERS and name.lower() != "content-type"]
+        await _respond(send, status, content, content_type, extra)
+
+    async def _gather(self, scope, send):
+        params = {name: values[-1] for name, values in
+                  parse_qs(scope.get("query_string", b"").decode("latin-1")).items()}
+        after = None
+        if scope["path"] == "/connection-history" and "after" in params:
+            # A cursor from another deployment (or shard count) means a full fetch
+            after = parse_cursor(params.pop("after"), self.peers.count)
+        queries = ([urlencode({**params, "after": cursor}) for cursor, _ in after] if after is not None
+                   else [urlencode(params)] * self.peers.count)
+        headers = self._headers(scope, accept_json=True)
+        try:
+            replies = await asyncio.gather(*(
+                self.peers.request(shard, "GET", self._target(scope, query), headers)
+                for shard, query in enumerate(queries)
+            ))
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"Scatter-gather {scope['path']} failed: {e!r}")
+            await _respond(send, 503, json.dumps({"detail": "A shard is unavailable"}).encode(),
+                           "application/json", [("retry-after", "1")])
+            return
+        for status, headers_, content in replies:
+            if status != 200:
+                retry = [(name, value) for name, value in headers_ if name.lower() == "retry-after"]
+                await _respond(send, status, content, "application/json", retry)
+                return
+        results = [json.loads(content) for _, _, content in replies]
+        instances = [next((value for name, value in headers_ if name.lower() == INSTANCE_HEADER), "")
+                     for _, headers_, _ in replies]
+        if after is not None:
+            results = await self._refetch_restarted(scope, headers, params, after, results, instances)
+        payload = GATHER_ROUTES[scope["path"]](results, params)
+        if all("cursor" in result for result in results):
+            payload["cursor"] = format_cursor([(result["cursor"], instance)
+                                               for result, instance in zip(results, instances)])
+
+        codec = wire_codec.default_codec()
+        if codec is not None and wire_codec.MEDIA_TYPE in (_header(scope, b"accept") or ""):
+            await _respond(send, 200, codec.encode(payload), wire_codec.MEDIA_TYPE, [("vary", "Accept")])
+        else:
+            await _respond(send, 200, json.dumps(payload).encode(), "application/json", [("vary", "Accept")])
+
+    async def _refetch_restarted(self, scope, headers, params, after, results, instances):
+        """A shard running a different process than the cursor saw restarted: fetch its history from the start"""
+        for shard, result in enumerate(results):
+            cursor, instance = after[shard]
+            if instances[shard] != instance or result.get("cursor", 0) < cursor:
+                status, _, content = await self.peers.request(
+                    shard, "GET", self._target(scope, urlencode(params)), headers)
+                if status == 200:
+                    results[shard] = json.loads(content)
+        return results
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+async def _respond(send, status: int, body: bytes, content_type: str, headers=()):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type.encode("latin-1")),
+                    (b"content-length", str(len(body)).encode())]
+                   + [(name.encode("latin-1"), value.encode("latin-1")) for name, value in headers],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,189 @@
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+ACTIVE = "active"
+DISPATCHED = "dispatched"
+EN_ROUTE = "en_route"
+ARRIVED = "arrived"
+RESOLVED = "resolved"
+
+# Allowed forward transitions; resolving is possible from any open state
+TRANSITIONS = {
+    ACTIVE: {DISPATCHED, RESOLVED},
+    DISPATCHED: {EN_ROUTE, ARRIVED, RESOLVED},
+    EN_ROUTE: {ARRIVED, RESOLVED},
+    ARRIVED: {RESOLVED},
+    RESOLVED: set(),
+}
+
+# Lifecycle order: a server status ahead of the local case wins on sync
+ORDER = {ACTIVE: 0, DISPATCHED: 1, EN_ROUTE: 2, ARRIVED: 3, RESOLVED: 4}
+
+# Same base response times the server uses in generateETA
+BASE_ETA_MINUTES = {
+    "police": 8,
+    "ambulance": 12,
+    "fire": 10,
+    "rescue": 15,
+}
+DEFAULT_ETA_MINUTES = 10
+
+
+class InvalidTransition(ValueError):
+    pass
+
+
+def _epoch(value) -> Optional[float]:
+    """Server timestamps are ISO 8601 (``toISOString``, trailing Z)"""
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+@dataclass
+class SOSCase:
+    sos_id: str
+    help_type: str = "general"
+    state: str = ACTIVE
+    eta_minutes: Optional[int] = None
+    arrival_at: Optional[float] = None  # monotonic deadline once dispatched
+    eta_started: Optional[int] = None  # ETA the current countdown started from
+
+    def to_update(self) -> dict:
+        return {"sos_id": self.sos_id, "status": self.state, "eta_minutes": self.eta_minutes}
+
+
+class SOSLifecycleEngine:
+    """Tracks every SOS through active → dispatched → en route → arrived → resolved.
+
+    Instead of one timer per emergency, the owner calls ``tick`` from a single
+    scheduler; each tick recomputes every open ETA in one pass and hands all
+    cases whose state or displayed ETA changed to ``on_update`` as one list.
+    """
+
+    def __init__(self, on_update: Optional[Callable[[List[dict]], None]] = None,
+                 clock: Callable[[], float] = time.monotonic, wall_clock: Callable[[], float] = time.time):
+        self.on_update = on_update
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self.cases: Dict[str, SOSCase] = {}
+        # Cases with a running ETA, so ticks skip idle and closed ones
+        self._moving: Dict[str, SOSCase] = {}
+
+    def get(self, sos_id: str) -> Optional[SOSCase]:
+        return self.cases.get(sos_id)
+
+    def sync(self, signals: List[dict], key: str = "sos_id"):
+        """Register SOS signals from a server ``sos_update`` payload and apply their changes.
+
+        ``key`` names the field used as the case id, e.g. a federated
+        ``region/sos_id`` key when merging several servers. A server
+        ``status`` ahead of the local case (another operator dispatched or
+        resolved it) is applied and a changed ``eta`` restarts the
+        countdown; a new case counts its ETA from its ``sos_time``.
+        """
+        for signal in signals:
+            sos_id = signal.get(key)
+            if not sos_id:
+                continue
+            case = self.cases.get(sos_id)
+            since = None
+            if case is None:
+                case = self.cases[sos_id] = SOSCase(sos_id=sos_id, help_type=signal.get("help_type", "general"))
+                since = _epoch(signal.get("sos_time"))
+            self._apply_remote(case, signal, since)
+
+    def dispatch(self, sos_id: str, eta_minutes: Optional[int] = None) -> SOSCase:
+        """Dispatch help; a case already on its way only gets its ETA restarted, when one is given"""
+        case = self.cases[sos_id]
+        if case.state in (DISPATCHED, EN_ROUTE):
+            if eta_minutes is not None:
+                self._start_eta(case, eta_minutes)
+            return case
+        case = self._transition(sos_id, DISPATCHED)
+        if eta_minutes is None:
+            eta_minutes = BASE_ETA_MINUTES.get(case.help_type, DEFAULT_ETA_MINUTES)
+        self._start_eta(case, eta_minutes)
+        return case
+
+    def set_eta(self, sos_id: str, eta_minutes: int) -> SOSCase:
+        case = self.cases[sos_id]
+        if case.state == ACTIVE:
+            return self.dispatch(sos_id, eta_minutes)
+        if case.state not in (DISPATCHED, EN_ROUTE):
+            raise InvalidTransition(f"Cannot set ETA for SOS in state {case.state}")
+        self._start_eta(case, eta_minutes)
+        return case
+
+    def resolve(self, sos_id: str) -> SOSCase:
+        case = self._transition(sos_id, RESOLVED)
+        self._stop_eta(case)
+        return case
+
+    def open_cases(self) -> List[SOSCase]:
+        return [case for case in self.cases.values() if case.state != RESOLVED]
+
+    def tick(self) -> List[dict]:
+        """Recompute all running ETAs and emit one coalesced update."""
+        now = self.clock()
+        changes = []
+        for sos_id, case in list(self._moving.items()):
+            remaining = max(0, int(-(-(case.arrival_at - now) // 60)))
+            state = case.state
+            if remaining == 0:
+                state = ARRIVED
+                del self._moving[sos_id]
+            elif state == DISPATCHED:
+                state = EN_ROUTE
+            if state != case.state or remaining != case.eta_minutes:
+                case.state = state
+                case.eta_minutes = remaining
+                changes.append(case.to_update())
+        if changes and self.on_update:
+            self.on_update(changes)
+        return changes
+
+    def _apply_remote(self, case: SOSCase, signal: dict, since: Optional[float]):
+        if case.state == RESOLVED:
+            return
+        status = signal.get("status")
+        if status not in ORDER:
+            status = ACTIVE
+        eta = signal.get("eta")
+        if status == ACTIVE and eta is not None:
+            status = DISPATCHED  # the server dispatches on receipt and reports an initial ETA
+        if ORDER[status] > ORDER[case.state]:
+            case.state = status
+            if status in (ARRIVED, RESOLVED):
+                self._stop_eta(case)
+                case.eta_minutes = 0 if status == ARRIVED else case.eta_minutes
+                return
+        if case.state not in (DISPATCHED, EN_ROUTE):
+            return
+        if eta is not None and int(eta) != case.eta_started:
+            self._start_eta(case, eta, since)
+        elif case.arrival_at is None:
+            self._start_eta(case, BASE_ETA_MINUTES.get(case.help_type, DEFAULT_ETA_MINUTES), since)
+
+    def _start_eta(self, case: SOSCase, eta_minutes: int, since: Optional[float] = None):
+        """Count down ``eta_minutes`` from ``since`` (epoch seconds, default now)"""
+        elapsed = max(0.0, self.wall_clock() - since) if since is not None else 0.0
+        case.eta_minutes = case.eta_started = int(eta_minutes)
+        case.arrival_at = self.clock() + eta_minutes * 60 - elapsed
+        self._moving[case.sos_id] = case
+
+    def _stop_eta(self, case: SOSCase):
+        case.arrival_at = None
+        self._moving.pop(case.sos_id, None)
+
+    def _transition(self, sos_id: str, state: str) -> SOSCase:
+        case = self.cases[sos_id]
+        if state not in TRANSITIONS[case.state]:
+            raise InvalidTransition(f"Cannot move SOS from {case.state} to {state}")
+        case.state = state
+        return case
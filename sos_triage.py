@@ -0,0 +1,160 @@
+import heapq
+import itertools
+import math
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+# Severity levels by help type (matches the dashboard's priority labels)
+SEVERITY = {"ambulance": 3, "fire": 3, "police": 2}
+DEFAULT_SEVERITY = 1
+SEVERITY_LABELS = {3: "🔴 CRITICAL", 2: "🟠 HIGH", 1: "🟡 MEDIUM"}
+
+# Score units are "minutes of waiting": one severity level is worth
+# SEVERITY_WEIGHT minutes, so a medium case waiting 30 minutes overtakes a
+# fresh critical one. Being inside a danger zone is worth PROXIMITY_WEIGHT.
+SEVERITY_WEIGHT = 15.0
+AGING_PER_MINUTE = 1.0
+PROXIMITY_WEIGHT = 10.0
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance, same formula as the server's calculateDistance"""
+    d_lat = math.radians(lat2 - lat1)
+    d_lng = math.radians(lng2 - lng1)
+    a = (math.sin(d_lat / 2) ** 2 +
+         math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(d_lng / 2) ** 2)
+    return 6371 * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def _epoch_minutes(timestamp) -> float:
+    if isinstance(timestamp, str):
+        try:
+            parsed = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+            if parsed.tzinfo is None:
+                parsed = parsed.astimezone()
+            return parsed.timestamp() / 60
+        except ValueError:
+            pass
+    return datetime.now(timezone.utc).timestamp() / 60
+
+
+def _rank_fields(signal: dict):
+    return signal.get('help_type'), signal.get('sos_time'), signal.get('coordinates')
+
+
+class TriageQueue:
+    """Heap of open SOS cases ordered by urgency, with aging.
+
+    Urgency at time t is ``severity + proximity + AGING_PER_MINUTE * (t - arrival)``.
+    Because every case ages at the same rate, the ordering only depends on the
+    time-independent part ``severity + proximity - AGING_PER_MINUTE * arrival``,
+    so aging never forces a re-sort: adds and removals are O(log n) and
+    ``top`` returns the k most urgent cases in O(k log k).
+    """
+
+    def __init__(self, danger_zones: Optional[List[dict]] = None):
+        self.danger_zones = danger_zones or []
+        self._heap: List[list] = []
+        self._entries: Dict[str, list] = {}
+        self._signals: Dict[str, dict] = {}
+        self._proximity: Dict[str, float] = {}
+        self._counter = itertools.count()
+        self._removed = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def severity(self, signal: dict) -> int:
+        return SEVERITY.get(signal.get('help_type', 'general'), DEFAULT_SEVERITY)
+
+    def proximity(self, signal: dict) -> float:
+        """Danger-zone bonus: full inside a zone, fading out at twice its radius"""
+        coords = signal.get('coordinates') or {}
+        lat, lng = coords.get('lat'), coords.get('lng')
+        if lat is None or lng is None or not self.danger_zones:
+            return 0.0
+        best = 0.0
+        for zone in self.danger_zones:
+            radius = zone.get('radius') or 1
+            distance = haversine_km(lat, lng, zone['lat'], zone['lng'])
+            best = max(best, min(1.0, max(0.0, 2 - distance / radius)))
+        return best * PROXIMITY_WEIGHT
+
+    def urgency(self, key: str, now_minutes: Optional[float] = None) -> float:
+        """Current urgency score of a queued case (for display)"""
+        if now_minutes is None:
+            now_minutes = datetime.now(timezone.utc).timestamp() / 60
+        return -self._entries[key][0] + AGING_PER_MINUTE * now_minutes
+
+    def add(self, key: str, signal: dict):
+        if key in self._entries:
+            self.remove(key)
+        proximity = self.proximity(signal)
+        static_key = (SEVERITY_WEIGHT * self.severity(signal) + proximity
+                      - AGING_PER_MINUTE * _epoch_minutes(signal.get('sos_time')))
+        entry = [-static_key, next(self._counter), key, True]
+        self._entries[key] = entry
+        self._signals[key] = signal
+        self._proximity[key] = proximity
+        heapq.heappush(self._heap, entry)
+
+    def remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        del self._signals[key]
+        del self._proximity[key]
+        entry[3] = False  # lazy deletion; skipped by top() and compacted later
+        self._removed += 1
+        if self._removed > len(self._entries):
+            self._heap = [e for e in self._heap if e[3]]
+            heapq.heapify(self._heap)
+            self._removed = 0
+
+    def sync(self, signals: Iterable[dict], key: str = 'key'):
+        """Incrementally match the queue to the given open signals"""
+        current = {}
+        for signal in signals:
+            current[signal.get(key)] = signal
+        for stale in [k for k in self._entries if k not in current]:
+            self.remove(stale)
+        for k, signal in current.items():
+            if k is None:
+                continue
+            previous = self._signals.get(k)
+            if previous is None or _rank_fields(previous) != _rank_fields(signal):
+                self.add(k, signal)
+            else:
+                self._signals[k] = signal  # same rank, fresher display fields
+
+    def set_danger_zones(self, zones: List[dict]):
+        """Replace danger zones and rescore everything (O(n))"""
+        self.danger_zones = zones or []
+        signals = list(self._signals.items())
+        self._heap, self._entries, self._signals, self._proximity = [], {}, {}, {}
+        self._removed = 0
+        for k, signal in signals:
+            self.add(k, signal)
+
+    def top(self, n: int) -> List[str]:
+        """Keys of the ``n`` most urgent cases, most urgent first"""
+        heap = self._heap
+        result = []
+        frontier = [(heap[0], 0)] if heap else []
+        while frontier and len(result) < n:
+            entry, index = heapq.heappop(frontier)
+            if entry[3]:
+                result.append(entry[2])
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+        return result
+
+    def signal(self, key: str) -> dict:
+        return self._signals[key]
+
+    def near_danger(self, key: str) -> bool:
+        return self._proximity.get(key, 0.0) > 0
@@ -0,0 +1,197 @@
+import atexit
+import itertools
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+DEFAULT_QUEUE_SIZE = 10000
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def event(name: str, **fields) -> dict:
+    """``extra=`` for a structured record: ``logger.info("...", extra=event("sos_update", count=3))``"""
+    return {"event": name, "fields": fields}
+
+
+def parse_sample_rates(spec: str) -> Dict[str, int]:
+    """Parse ``"users_update=10,heartbeat=100"`` into {event: keep 1 in N}"""
+    rates = {}
+    for entry in spec.split(","):
+        name, sep, rate = entry.strip().partition("=")
+        if not name:
+            continue
+        if not sep or not rate.strip().isdigit():
+            raise ValueError(f"Invalid sample rate {entry!r}, expected event=N")
+        rates[name.strip()] = int(rate)
+    return rates
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, event, msg plus any fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": getattr(record, "event", None),
+            "msg": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        sampled = getattr(record, "sample_rate", None)
+        if sampled:
+            entry["sample_rate"] = sampled
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps 1 in N records of each high-frequency event.
+
+    Kept records carry ``sample_rate`` so totals can be reconstructed.
+    Warnings and errors are never sampled out.
+    """
+
+    def __init__(self, rates: Dict[str, int]):
+        super().__init__()
+        self.rates = {name: rate for name, rate in rates.items() if rate > 1}
+        self._counters = {name: itertools.count() for name in self.rates}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self.rates.get(getattr(record, "event", None))
+        if rate is None or record.levelno >= logging.WARNING:
+            return True
+        if next(self._counters[record.event]) % rate:
+            return False
+        record.sample_rate = rate
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks the caller: drops records when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Records stay in-process, so skip the stock copy-and-format: only
+        # freeze the message; JSON encoding happens on the listener thread
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(log_path: str, level: int = logging.INFO, max_bytes: int = DEFAULT_MAX_BYTES,
+                  backup_count: int = DEFAULT_BACKUP_COUNT, sample_rates: Optional[Dict[str, int]] = None,
+                  console: bool = True, queue_size: int = DEFAULT_QUEUE_SIZE) -> DroppingQueueHandler:
+    """Route the root logger through a queue to a JSON file (rotated by size) and the console.
+
+    The calling thread only filters and enqueues; formatting and I/O happen
+    on the listener thread. Safe to call more than once (later calls are no-ops).
+    """
+    global _listener
+    root = logging.getLogger()
+    for handler in root.handlers:
+        if isinstance(handler, DroppingQueueHandler):
+            return handler
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+    )
+    file_handler.setFormatter(JsonFormatter())
+    handlers = [file_handler]
+    if console:
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        handlers.append(console_handler)
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    queue_handler = DroppingQueueHandler(log_queue)
+    if sample_rates:
+        queue_handler.addFilter(SamplingFilter(sample_rates))
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return queue_handler
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def measure_overhead(iterations: int = 20000) -> Dict[str, float]:
+    """Caller-side cost in microseconds per event for each logging path"""
+    import os
+    import tempfile
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        def run(name, logger):
+            logger.setLevel(logging.INFO)
+            started = time.perf_counter()
+            for i in range(iterations):
+                logger.info("Received users update", extra=event("users_update", region="local", count=i))
+            results[name] = (time.perf_counter() - started) / iterations * 1e6
+
+        # Baseline: creating the LogRecord at all
+        null_logger = logging.getLogger("overhead.null")
+        null_logger.propagate = False
+        null_logger.addHandler(logging.NullHandler())
+        run("record_only", null_logger)
+
+        # Synchronous JSON file handler (what the hot path used to pay)
+        sync_logger = logging.getLogger("overhead.sync")
+        sync_logger.propagate = False
+        file_handler = logging.FileHandler(os.path.join(tmp, "sync.log"), encoding="utf-8")
+        file_handler.setFormatter(JsonFormatter())
+        sync_logger.addHandler(file_handler)
+        run("sync_file", sync_logger)
+        file_handler.close()
+
+        # Queue handler, with and without sampling
+        for name, rates in (("queued", None), ("queued_sampled_1_in_10", {"users_update": 10})):
+            log_queue = queue.Queue(maxsize=iterations + 1)
+            handler = DroppingQueueHandler(log_queue)
+            if rates:
+                handler.addFilter(SamplingFilter(rates))
+            target = logging.FileHandler(os.path.join(tmp, f"{name}.log"), encoding="utf-8")
+            target.setFormatter(JsonFormatter())
+            listener = logging.handlers.QueueListener(log_queue, target)
+            listener.start()
+            queued_logger = logging.getLogger(f"overhead.{name}")
+            queued_logger.propagate = False
+            queued_logger.addHandler(handler)
+            run(name, queued_logger)
+            listener.stop()
+            target.close()
+    return results
+
+
+if __name__ == "__main__":
+    for path, micros in measure_overhead().items():
+        print(f"{path:>24}: {micros:6.2f} µs/event")
@@ -0,0 +1,162 @@
+import hashlib
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+DEFAULT_PRECISION = 12  # 4096 registers: ~1.6% standard error, 4 KB per sketch
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    """Fixed-size distinct-count sketch; sketches with the same precision merge by register max"""
+
+    __slots__ = ("precision", "registers")
+
+    def __init__(self, precision: int = DEFAULT_PRECISION, registers: Optional[np.ndarray] = None):
+        self.precision = precision
+        self.registers = registers if registers is not None else np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, value: str):
+        self.add_hash(_hash64(value))
+
+    def add_hash(self, h: int):
+        rest_bits = 64 - self.precision
+        index = h >> rest_bits
+        rank = rest_bits - (h & ((1 << rest_bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog"):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    @classmethod
+    def union(cls, sketches: Iterable["HyperLogLog"], precision: int = DEFAULT_PRECISION) -> "HyperLogLog":
+        registers = [sketch.registers for sketch in sketches]
+        if not registers:
+            return cls(precision)
+        return cls(precision, np.maximum.reduce(registers))
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.ldexp(1.0, -self.registers.astype(np.int64)).sum()
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)  # linear counting for small sets
+        return int(round(estimate))
+
+
+class _Bucket:
+    __slots__ = ("connects", "disconnects", "users", "unique")
+
+    def __init__(self):
+        self.connects = 0
+        self.disconnects = 0
+        self.users: Optional[HyperLogLog] = None
+        self.unique: Optional[int] = None  # cached users.count(), reset on add
+
+
+class RollingBuckets:
+    """The last ``retention`` buckets of ``bucket_seconds`` each.
+
+    Buckets are created on first event and dropped once they fall out of
+    the window, so memory is bounded by ``retention`` sketches. Reading a
+    window costs O(buckets) regardless of how many events it covers.
+    """
+
+    def __init__(self, bucket_seconds: int, retention: int, precision: int = DEFAULT_PRECISION):
+        self.bucket_seconds = bucket_seconds
+        self.retention = retention
+        self.precision = precision
+        self._buckets: Dict[int, _Bucket] = {}
+        self._newest = 0
+
+    def add(self, timestamp: float, user_hash: int, connect: bool):
+        index = int(timestamp // self.bucket_seconds)
+        if index > self._newest:
+            self._newest = index
+            cutoff = index - self.retention
+            for old in [i for i in self._buckets if i <= cutoff]:
+                del self._buckets[old]
+        elif index <= self._newest - self.retention:
+            return  # older than the window
+        bucket = self._buckets.get(index)
+        if bucket is None:
+            bucket = self._buckets[index] = _Bucket()
+        if connect:
+            bucket.connects += 1
+        else:
+            bucket.disconnects += 1
+        if bucket.users is None:
+            bucket.users = HyperLogLog(self.precision)
+        bucket.users.add_hash(user_hash)
+        bucket.unique = None
+
+    def series(self, count: int, now: float) -> dict:
+        """Per-bucket arrays for the ``count`` buckets ending with the one holding ``now``"""
+        count = max(1, min(count, self.retention))
+        last = int(now // self.bucket_seconds)
+        first = last - count + 1
+        connects: List[int] = []
+        disconnects: List[int] = []
+        unique: List[int] = []
+        sketches = []
+        for index in range(first, last + 1):
+            bucket = self._buckets.get(index)
+            if bucket is None:
+                connects.append(0)
+                disconnects.append(0)
+                unique.append(0)
+                continue
+            if bucket.unique is None:
+                bucket.unique = bucket.users.count()
+            connects.append(bucket.connects)
+            disconnects.append(bucket.disconnects)
+            unique.append(bucket.unique)
+            sketches.append(bucket.users)
+        return {
+            "bucket_seconds": self.bucket_seconds,
+            "timestamps": [index * self.bucket_seconds for index in range(first, last + 1)],
+            "connects": connects,
+            "disconnects": disconnects,
+            "unique_users": unique,
+            "unique_users_total": HyperLogLog.union(sketches, self.precision).count(),
+        }
+
+
+class ConnectionTimeSeries:
+    """Per-minute and per-hour connect/disconnect counts and unique users.
+
+    Updated on every connection event; both resolutions are kept side by
+    side so an hourly chart merges at most ``hour_buckets`` sketches rather
+    than sixty times as many minute ones. Thread-safe.
+    """
+
+    RESOLUTIONS = ("minute", "hour")
+
+    def __init__(self, minute_buckets: int = 24 * 60, hour_buckets: int = 7 * 24,
+                 precision: int = DEFAULT_PRECISION):
+        self._series = {
+            "minute": RollingBuckets(60, minute_buckets, precision),
+            "hour": RollingBuckets(3600, hour_buckets, precision),
+        }
+        self._lock = threading.Lock()
+
+    def add(self, timestamp: float, user_id: str, connect: bool):
+        user_hash = _hash64(user_id)
+        with self._lock:
+            for buckets in self._series.values():
+                buckets.add(timestamp, user_hash, connect)
+
+    def retention(self, resolution: str) -> int:
+        return self._series[resolution].retention
+
+    def series(self, resolution: str, count: int, now: float) -> dict:
+        if resolution not in self._series:
+            raise ValueError(f"Unknown resolution {resolution!r}, expected one of {self.RESOLUTIONS}")
+        with self._lock:
+            return {"resolution": resolution, **self._series[resolution].series(count, now)}
@@ -0,0 +1,103 @@
+import math
+from typing import Dict, Hashable, List
+
+
+class _Timer:
+    __slots__ = ("key", "expires", "bucket")
+
+    def __init__(self, key, expires):
+        self.key = key
+        self.expires = expires
+        self.bucket = None
+
+
+class HierarchicalTimingWheel:
+    """Hierarchical timing wheel for idle-session expiry.
+
+    Level 0 has ``slots`` buckets of one ``tick`` each; every level above
+    covers ``slots`` times the span of the one below. Scheduling and
+    cancelling are O(1) dict operations, and ``advance`` only touches the
+    bucket for each elapsed tick (plus an occasional cascade of one
+    higher-level bucket), so expiry never scans all sessions.
+    """
+
+    def __init__(self, tick: float = 1.0, slots: int = 64, levels: int = 4, now: float = 0.0):
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self.current_tick = int(now / tick)
+        self._wheels: List[List[Dict[Hashable, _Timer]]] = [
+            [{} for _ in range(slots)] for _ in range(levels)
+        ]
+        self._timers: Dict[Hashable, _Timer] = {}
+
+    def __len__(self):
+        return len(self._timers)
+
+    def __contains__(self, key):
+        return key in self._timers
+
+    def schedule(self, key: Hashable, deadline: float):
+        """(Re)schedule ``key`` to expire at ``deadline`` (same clock as ``advance``)."""
+        self.cancel(key)
+        timer = _Timer(key, math.ceil(deadline / self.tick))
+        self._timers[key] = timer
+        self._place(timer)
+
+    def cancel(self, key: Hashable) -> bool:
+        timer = self._timers.pop(key, None)
+        if timer is None:
+            return False
+        del timer.bucket[key]
+        return True
+
+    def advance(self, now: float) -> List[Hashable]:
+        """Move time forward to ``now`` and return the keys that expired."""
+        expired = []
+        target = int(now / self.tick)
+        while self.current_tick < target:
+            self.current_tick += 1
+            slot = self.current_tick % self.slots
+            if slot == 0:
+                self._cascade()
+            bucket = self._wheels[0][slot]
+            if not bucket:
+                continue
+            self._wheels[0][slot] = {}
+            for key, timer in bucket.items():
+                if timer.expires <= self.current_tick:
+                    del self._timers[key]
+                    expired.append(key)
+                else:
+                    self._place(timer)
+        return expired
+
+    def _place(self, timer: _Timer, cascading: bool = False):
+        # The current tick's level-0 bucket is only still pending mid-cascade
+        expires = max(timer.expires, self.current_tick + (0 if cascading else 1))
+        delta = expires - self.current_tick
+        span = 1
+        for level in range(self.levels):
+            if delta < span * self.slots or level == self.levels - 1:
+                if delta >= span * self.slots:
+                    # Beyond the top level's range: park it in the furthest
+                    # bucket and let it re-cascade until it fits.
+                    expires = self.current_tick + span * self.slots - 1
+                bucket = self._wheels[level][(expires // span) % self.slots]
+                bucket[timer.key] = timer
+                timer.bucket = bucket
+                return
+            span *= self.slots
+
+    def _cascade(self):
+        span = 1
+        for level in range(1, self.levels):
+            span *= self.slots
+            slot = (self.current_tick // span) % self.slots
+            bucket = self._wheels[level][slot]
+            if bucket:
+                self._wheels[level][slot] = {}
+                for timer in bucket.values():
+                    self._place(timer, cascading=True)
+            if slot != 0:
+                break
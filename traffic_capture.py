@@ -0,0 +1,152 @@
+import base64
+import gzip
+import json
+import queue
+import threading
+import time
+from typing import Callable, Iterator, Optional, Tuple
+
+CAPTURE_VERSION = 1
+MAX_CAPTURE_BODY = 64 * 1024  # larger bodies (e.g. attachments) are recorded as omitted
+_STOP = object()
+
+
+def _encode_body(body: Optional[bytes], size: int):
+    if body is None:
+        return {"omitted": size}
+    if not body:
+        return None
+    try:
+        return body.decode("utf-8")
+    except UnicodeDecodeError:
+        return {"b64": base64.b64encode(body).decode("ascii")}
+
+
+def decode_body(value) -> Optional[bytes]:
+    """Body bytes of a captured entry; None if it was too large to record"""
+    if value is None:
+        return b""
+    if isinstance(value, str):
+        return value.encode("utf-8")
+    if "b64" in value:
+        return base64.b64decode(value["b64"])
+    return None
+
+
+class TrafficRecorder:
+    """Appends captured requests to a gzip'd JSON-lines file from a writer thread.
+
+    The first line is a header; each following line is
+    ``[offset_us, method, target, content_type, body, status, latency_us]`` where
+    ``offset_us`` is the arrival time relative to the start of the capture
+    (monotonic clock) and ``latency_us`` the server-side handling time.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.started = time.monotonic()
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._writer: Optional[threading.Thread] = None
+
+    def start(self):
+        self._writer = threading.Thread(target=self._write_loop, name="traffic-capture", daemon=True)
+        self._writer.start()
+
+    def close(self):
+        if self._writer is not None:
+            self._queue.put(_STOP)
+            self._writer.join()
+            self._writer = None
+
+    def record(self, arrived: float, method: str, target: str, content_type: Optional[str],
+               body: Optional[bytes], body_size: int, status: int, finished: float):
+        """Queue one request; ``body`` is None when it exceeded ``MAX_CAPTURE_BODY``"""
+        self._queue.put([
+            int((arrived - self.started) * 1e6), method, target, content_type,
+            _encode_body(body, body_size), status, int((finished - arrived) * 1e6),
+        ])
+
+    def _write_loop(self):
+        with gzip.open(self.path, "wt", encoding="utf-8") as out:
+            out.write(json.dumps({"version": CAPTURE_VERSION, "started_at": time.time()}) + "\n")
+            last_flush = time.monotonic()
+            while True:
+                try:
+                    entry = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    entry = None
+                if entry is _STOP:
+                    break
+                if entry is not None:
+                    out.write(json.dumps(entry, separators=(",", ":")) + "\n")
+                if time.monotonic() - last_flush >= self.flush_interval:
+                    out.flush()
+                    last_flush = time.monotonic()
+
+
+class CaptureMiddleware:
+    """ASGI middleware feeding every HTTP request/response pair to a ``TrafficRecorder``.
+
+    The body is captured as the application reads it, so handlers see the
+    request stream unchanged.
+    """
+
+    def __init__(self, app, recorder: TrafficRecorder, internal: Optional[Callable[[dict], bool]] = None):
+        self.app = app
+        self.recorder = recorder
+        self.internal = internal
+
+    async def __call__(self, scope, receive, send):
+        # Shard-to-shard requests (see sharding.py) were already captured by
+        # the worker that received them
+        if scope["type"] != "http" or (self.internal is not None and self.internal(scope)):
+            await self.app(scope, receive, send)
+            return
+        arrived = time.monotonic()
+        chunks = []
+        size = 0
+        status = 500
+
+        async def capture_receive():
+            nonlocal size
+            message = await receive()
+            if message["type"] == "http.request":
+                chunk = message.get("body", b"")
+                size += len(chunk)
+                if size <= MAX_CAPTURE_BODY:
+                    chunks.append(chunk)
+            return message
+
+        async def capture_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, capture_receive, capture_send)
+        finally:
+            query = scope.get("query_string", b"").decode("latin-1")
+            target = scope["path"] + (f"?{query}" if query else "")
+            content_type = next((value.decode("latin-1") for name, value in scope.get("headers", [])
+                                 if name == b"content-type"), None)
+            body = b"".join(chunks) if size <= MAX_CAPTURE_BODY else None
+            self.recorder.record(arrived, scope["method"], target, content_type, body, size,
+                                 status, time.monotonic())
+
+
+def read_capture(path: str) -> Tuple[dict, Iterator[list]]:
+    """Header and entries of a capture file"""
+    handle = gzip.open(path, "rt", encoding="utf-8")
+    header = json.loads(handle.readline())
+    if header.get("version") != CAPTURE_VERSION:
+        handle.close()
+        raise ValueError(f"Unsupported capture version {header.get('version')!r}")
+
+    def entries():
+        with handle:
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+    return header, entries()
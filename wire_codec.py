@@ -0,0 +1,103 @@
+import zlib
+from typing import Any, Iterable, Optional
+
+try:
+    import msgpack
+except ImportError:  # optional: everything falls back to JSON without it
+    msgpack = None
+
+ENCODING = "msgpack+zlib+dict/1"
+MEDIA_TYPE = "application/x-msgpack"
+
+FLAG_COMPRESSED = 0x01
+FLAG_DICTIONARY = 0x02
+
+# Field names repeated in every record of the dashboard and monitor payloads.
+# Both ends must agree on this list, so the dashboard sends it when it
+# negotiates the encoding; append new names, never reorder.
+FIELDS = (
+    # users_update
+    "socket_id", "aadhaar_id", "name", "location", "phone", "client_type",
+    "connected_at", "last_seen", "version", "language", "coordinates", "lat", "lng",
+    "tracking_enabled", "last_location_update",
+    # sos_update / new_sos_alert
+    "sos_id", "help_type", "sos_time", "status", "eta", "image", "image_hash",
+    "message", "emergency_contacts", "user_id",
+    # stats_update
+    "activeConnections", "totalConnections", "totalSOS",
+    # new_efir
+    "efir_id", "incident_type", "description", "user_name", "timestamp",
+    # server.py connection records
+    "connection_id", "action", "active_connections", "connection_history", "cursor",
+    # server.py sessions
+    "sessions", "start", "end", "duration_seconds", "open", "ended_by",
+)
+
+
+def available() -> bool:
+    return msgpack is not None
+
+
+class WireCodec:
+    """MessagePack with a field-name dictionary and per-message zlib.
+
+    A message is one flags byte followed by the (optionally deflated)
+    MessagePack body. Map keys found in ``fields`` are sent as their index,
+    so a 500-user list no longer repeats every key name 500 times; bodies
+    of at least ``compress_threshold`` bytes are deflated when that helps.
+    Payloads are JSON-shaped: integer map keys are reserved for field codes.
+    """
+
+    def __init__(self, fields: Iterable[str] = FIELDS, compress_threshold: int = 256, level: int = 1):
+        if msgpack is None:
+            raise RuntimeError("msgpack is not installed")
+        self.fields = tuple(fields)
+        self.compress_threshold = compress_threshold
+        self.level = level
+        self._codes = {name: code for code, name in enumerate(self.fields)}
+        names = self.fields
+        self._pairs_hook = lambda pairs: {
+            (names[key] if key.__class__ is int else key): value for key, value in pairs
+        }
+
+    def encode(self, obj: Any) -> bytes:
+        if self._codes:
+            body = msgpack.packb(self._pack_keys(obj), use_bin_type=True)
+            flags = FLAG_DICTIONARY
+        else:
+            body = msgpack.packb(obj, use_bin_type=True)
+            flags = 0
+        if len(body) >= self.compress_threshold:
+            compressed = zlib.compress(body, self.level)
+            if len(compressed) < len(body):
+                body = compressed
+                flags |= FLAG_COMPRESSED
+        return bytes((flags,)) + body
+
+    def decode(self, data: bytes) -> Any:
+        flags = data[0]
+        body = memoryview(data)[1:]
+        if flags & FLAG_COMPRESSED:
+            body = zlib.decompress(body)
+        if flags & FLAG_DICTIONARY:
+            return msgpack.unpackb(body, raw=False, strict_map_key=False, object_pairs_hook=self._pairs_hook)
+        return msgpack.unpackb(body, raw=False)
+
+    def _pack_keys(self, obj: Any) -> Any:
+        if isinstance(obj, dict):
+            codes = self._codes
+            return {codes.get(key, key): self._pack_keys(value) for key, value in obj.items()}
+        if isinstance(obj, (list, tuple)):
+            return [self._pack_keys(value) for value in obj]
+        return obj
+
+
+_default: Optional[WireCodec] = None
+
+
+def default_codec() -> Optional[WireCodec]:
+    """Shared codec with the built-in field list, or None without msgpack"""
+    global _default
+    if _default is None and msgpack is not None:
+        _default = WireCodec()
+    return _default